@@ -0,0 +1,22 @@
+# airbnb_scraper
+"""
+Airbnb search-result scraper.
+
+    from airbnb_scraper import Scraper
+    Scraper(cities=["Lahore"]).run()
+
+or from the shell: `python -m airbnb_scraper scrape --cities Lahore`.
+The package itself imports nothing heavy; Scraper and Config load on first use.
+"""
+
+__all__ = ["Config", "Scraper"]
+
+
+def __getattr__(name):
+    if name == "Scraper":
+        from .scraper import Scraper
+        return Scraper
+    if name == "Config":
+        from .config import Config
+        return Config
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
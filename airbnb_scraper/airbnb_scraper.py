@@ -42,18 +42,24 @@ SCROLL_PAUSE_TIME = 3
 PAGINATION_WAIT_TIME = 5  # Time to wait after clicking next page
 # ----------------------------------------
 
-options = Options()
-if HEADLESS:
-    options.add_argument("--headless=new")
-options.add_argument("--disable-blink-features=AutomationControlled")
-options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-                     "AppleWebKit/537.36 (KHTML, like Gecko) Chrome/115.0 Safari/537.36")
-options.add_argument("--start-maximized")
-options.add_argument("--disable-web-security")
-options.add_argument("--disable-features=VizDisplayCompositor")
+def create_driver():
+    """Start Chrome; only done when the script runs, not on import"""
+    options = Options()
+    if HEADLESS:
+        options.add_argument("--headless=new")
+    options.add_argument("--disable-blink-features=AutomationControlled")
+    options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+                         "AppleWebKit/537.36 (KHTML, like Gecko) Chrome/115.0 Safari/537.36")
+    options.add_argument("--start-maximized")
+    options.add_argument("--disable-web-security")
+    options.add_argument("--disable-features=VizDisplayCompositor")
 
-driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=options)
-driver.set_page_load_timeout(60)
+    driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=options)
+    driver.set_page_load_timeout(60)
+    return driver
+
+
+driver = None  # set when run as a script
 
 # ---------------- helpers ----------------
 def build_city_url_from_template(template_url: str, city: str) -> str:
@@ -194,6 +200,10 @@ def extract_from_card(card):
     if a and a.has_attr("href"):
         href = a["href"]
         listing_url = href if href.startswith("http") else "https://www.airbnb.com" + href
+        # Canonical /rooms/<id>: the query is search context and tracking IDs that change every visit
+        m = re.search(r"/rooms/(?:plus/)?(\d+)", listing_url)
+        if m:
+            listing_url = "https://www.airbnb.com/rooms/" + m.group(1)
 
     return {
         "Title": title,
@@ -367,58 +377,60 @@ def scrape_city_with_pagination(city):
     return city_results
 
 # ---------------- main ----------------
-results = []
+if __name__ == "__main__":
+    driver = create_driver()
+    results = []
 
-try:
-    for city in CITIES:
-        city_results = scrape_city_with_pagination(city)
-        results.extend(city_results)
+    try:
+        for city in CITIES:
+            city_results = scrape_city_with_pagination(city)
+            results.extend(city_results)
         
-        # Save intermediate results after each city
-        if results:
-            df = pd.DataFrame(results)
-            df.to_csv(OUT_CSV.replace('.csv', '_temp.csv'), index=False)
-            print(f"  💾 Intermediate save: {len(results)} total listings so far")
+            # Save intermediate results after each city
+            if results:
+                df = pd.DataFrame(results)
+                df.to_csv(OUT_CSV.replace('.csv', '_temp.csv'), index=False)
+                print(f"  💾 Intermediate save: {len(results)} total listings so far")
         
-        # Polite pause between cities
-        if city != CITIES[-1]:  # Don't sleep after the last city
-            sleep_time = random.uniform(8, 15)
-            print(f"  😴 Sleeping for {sleep_time:.1f} seconds before next city...")
-            time.sleep(sleep_time)
+            # Polite pause between cities
+            if city != CITIES[-1]:  # Don't sleep after the last city
+                sleep_time = random.uniform(8, 15)
+                print(f"  😴 Sleeping for {sleep_time:.1f} seconds before next city...")
+                time.sleep(sleep_time)
 
-except KeyboardInterrupt:
-    print("\n⚠ Interrupted by user — saving what we have...")
+    except KeyboardInterrupt:
+        print("\n⚠ Interrupted by user — saving what we have...")
 
-finally:
-    driver.quit()
+    finally:
+        driver.quit()
 
-# Final save
-os.makedirs("output", exist_ok=True)
-if results:
-    df = pd.DataFrame(results)
-    df.to_csv(OUT_CSV, index=False)
-    with open(OUT_JSON, "w", encoding="utf-8") as f:
-        json.dump(results, f, ensure_ascii=False, indent=2)
+    # Final save
+    os.makedirs("output", exist_ok=True)
+    if results:
+        df = pd.DataFrame(results)
+        df.to_csv(OUT_CSV, index=False)
+        with open(OUT_JSON, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
     
-    # Print summary
-    print(f"\n{'='*60}")
-    print(f"SCRAPING COMPLETED!")
-    print(f"{'='*60}")
-    print(f"Total listings scraped: {len(results)}")
-    print(f"Files saved:")
-    print(f"  📊 CSV: {OUT_CSV}")
-    print(f"  📋 JSON: {OUT_JSON}")
+        # Print summary
+        print(f"\n{'='*60}")
+        print(f"SCRAPING COMPLETED!")
+        print(f"{'='*60}")
+        print(f"Total listings scraped: {len(results)}")
+        print(f"Files saved:")
+        print(f"  📊 CSV: {OUT_CSV}")
+        print(f"  📋 JSON: {OUT_JSON}")
     
-    # City-wise breakdown
-    city_counts = df['City'].value_counts()
-    print(f"\nCity-wise breakdown:")
-    for city, count in city_counts.items():
-        print(f"  {city}: {count} listings")
+        # City-wise breakdown
+        city_counts = df['City'].value_counts()
+        print(f"\nCity-wise breakdown:")
+        for city, count in city_counts.items():
+            print(f"  {city}: {count} listings")
     
-    # Clean up temp file
-    temp_file = OUT_CSV.replace('.csv', '_temp.csv')
-    if os.path.exists(temp_file):
-        os.remove(temp_file)
+        # Clean up temp file
+        temp_file = OUT_CSV.replace('.csv', '_temp.csv')
+        if os.path.exists(temp_file):
+            os.remove(temp_file)
         
-else:
-    print("\n❌ No results scraped.")
\ No newline at end of file
+    else:
+        print("\n❌ No results scraped.")
\ No newline at end of file
@@ -0,0 +1,163 @@
+# archive.py
+"""
+Compressed, deduplicated archive of every fetched search page.
+
+A crawl stores each page snapshot it extracts (see extraction.py) here, so a
+broken selector or price regex costs a `replay` over the archive instead of a
+new crawl:
+
+    python -m airbnb_scraper replay            # rebuild the outputs from the latest run's pages
+
+The layout is WARC-like: payloads (page HTML, captured XHR bodies) are
+appended, compressed with gzip or zstd, to one segment file per run,
+    <root>/segments/<run>.pages
+(each payload is a complete gzip member / zstd frame, so `zcat` reads a gzip
+segment as is), and the index records
+    payloads  content hash -> segment, offset, length   (identical payloads are stored once)
+    captures  run, city, page, URL, fetch time          -> its payloads
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+from pathlib import Path
+
+from .extraction import PageSnapshot
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS payloads (
+    digest  TEXT PRIMARY KEY,
+    segment TEXT NOT NULL,
+    offset  INTEGER NOT NULL,
+    length  INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS captures (
+    id         INTEGER PRIMARY KEY,
+    run        TEXT NOT NULL,
+    city       TEXT,
+    page       INTEGER,
+    url        TEXT,
+    fetched_at TEXT NOT NULL,
+    kind       TEXT NOT NULL,
+    fresh_load INTEGER NOT NULL,
+    codec      TEXT NOT NULL,
+    html       TEXT REFERENCES payloads(digest),
+    blobs      TEXT REFERENCES payloads(digest)
+);
+CREATE INDEX IF NOT EXISTS captures_by_run ON captures(run, city, page);
+"""
+
+
+class PageArchive:
+    """
+    Page snapshots of every run, stored once per distinct content.
+
+    `run` names the captures added through this archive (the scraper uses
+    the run's start time). `kind` tells search pages from "error" pages saved
+    for debugging, which replay skips.
+    """
+
+    def __init__(self, root, run=None):
+        self.root = Path(root)
+        self.segment_dir = self.root / "segments"
+        self.segment_dir.mkdir(parents=True, exist_ok=True)
+        self.run = run
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.root / "index.sqlite"), check_same_thread=False)
+        self._db.executescript(SCHEMA)
+        self._db.commit()
+        self._segment = None  # this run's segment, opened on the first new payload
+        self._readers = {}
+        self.added = 0
+        self.deduplicated = 0
+        self.bytes_written = 0
+
+    # ---------------- writing ----------------
+    def _segment_name(self):
+        return "".join(ch for ch in self.run or "unnamed" if ch.isalnum()) + ".pages"
+
+    def _store(self, payload):
+        """Digest of a compressed payload, appending it to the segment unless it's stored already"""
+        if payload is None:
+            return None
+        digest = hashlib.sha256(payload).hexdigest()
+        if self._db.execute("SELECT 1 FROM payloads WHERE digest = ?", (digest,)).fetchone():
+            self.deduplicated += 1
+            return digest
+        if self._segment is None:
+            self._segment = open(self.segment_dir / self._segment_name(), "ab")
+        offset = self._segment.tell()
+        self._segment.write(payload)
+        self._segment.flush()
+        self._db.execute("INSERT INTO payloads (digest, segment, offset, length) VALUES (?, ?, ?, ?)",
+                         (digest, self._segment_name(), offset, len(payload)))
+        self.bytes_written += len(payload)
+        return digest
+
+    def add(self, snapshot, kind="search"):
+        """Archive a PageSnapshot; returns its capture ID"""
+        with self._lock:
+            html, blobs = self._store(snapshot.html), self._store(snapshot.blobs)
+            cur = self._db.execute(
+                "INSERT INTO captures (run, city, page, url, fetched_at, kind, fresh_load, codec, html, blobs) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (self.run, snapshot.city, snapshot.page, snapshot.url, snapshot.fetched_at, kind,
+                 int(snapshot.fresh_load), snapshot.codec, html, blobs))
+            self._db.commit()
+            self.added += 1
+            return cur.lastrowid
+
+    # ---------------- reading ----------------
+    def runs(self):
+        """[(run, search pages, cities), ...], oldest first"""
+        with self._lock:
+            return self._db.execute(
+                "SELECT run, COUNT(*), COUNT(DISTINCT city) FROM captures WHERE kind = 'search' "
+                "GROUP BY run ORDER BY MIN(id)").fetchall()
+
+    def latest_run(self):
+        runs = self.runs()
+        return runs[-1][0] if runs else None
+
+    def _read(self, digest):
+        if digest is None:
+            return None
+        segment, offset, length = self._db.execute(
+            "SELECT segment, offset, length FROM payloads WHERE digest = ?", (digest,)).fetchone()
+        fh = self._readers.get(segment)
+        if fh is None:
+            fh = self._readers[segment] = open(self.segment_dir / segment, "rb")
+        fh.seek(offset)
+        return fh.read(length)
+
+    def captures(self, runs, cities=None, kind="search"):
+        """PageSnapshots archived by `runs`, in the order they were fetched"""
+        query = (f"SELECT city, page, url, fetched_at, fresh_load, codec, html, blobs FROM captures "
+                 f"WHERE kind = ? AND run IN ({', '.join('?' * len(runs))})")
+        params = [kind, *runs]
+        if cities:
+            query += f" AND city IN ({', '.join('?' * len(cities))})"
+            params += list(cities)
+        with self._lock:
+            rows = self._db.execute(query + " ORDER BY id", params).fetchall()
+        for city, page, url, fetched_at, fresh_load, codec, html, blobs in rows:
+            with self._lock:
+                html, blobs = self._read(html), self._read(blobs)
+            yield PageSnapshot(city, page, url, html=html, blobs=blobs, fresh_load=bool(fresh_load),
+                               codec=codec, fetched_at=fetched_at)
+
+    def stats(self):
+        with self._lock:
+            captures = self._db.execute("SELECT COUNT(*) FROM captures").fetchone()[0]
+            payloads, size = self._db.execute("SELECT COUNT(*), COALESCE(SUM(length), 0) FROM payloads").fetchone()
+        return {"captures": captures, "payloads": payloads, "bytes": size}
+
+    def close(self):
+        with self._lock:
+            if self._segment is not None:
+                self._segment.close()
+                self._segment = None
+            for fh in self._readers.values():
+                fh.close()
+            self._readers = {}
+            self._db.close()
@@ -0,0 +1,433 @@
+# bench_extraction.py
+"""
+Offline extraction benchmark over a corpus of saved search pages.
+
+The corpus lives in fixtures/pages/: real pages saved by the scraper
+(SAVE_PAGES_DIR in config.py, or error_<city>.html dumps copied in with --add)
+and sample pages rebuilt from saved output rows (--make-sample). Every page
+goes through the same pipeline as extract_listings_from_page (embedded JSON
+first, card parsing as fallback) with each installed parser backend, and the
+suite reports
+
+    throughput      pages/s and cards/s per backend
+    stage latency   ms/page for tree building, card lookup and extraction
+    field latency   µs/card spent locating each field
+    allocations     peak Python memory and memory blocks still held per page
+                    (tracemalloc: libxml2/lexbor memory is not included)
+    fill rates      share of rows with each field filled
+
+    python -m airbnb_scraper bench                    # report
+    python -m airbnb_scraper bench --check            # exit 1 on regressions
+    python -m airbnb_scraper bench --update-baseline  # accept the current numbers
+    python -m airbnb_scraper bench --add error_*.html # copy page dumps into the corpus
+    python -m airbnb_scraper bench --make-sample      # rebuild the sample pages
+
+--check compares every page's rows with fixtures/expected.json and the numbers
+with fixtures/baseline.json. Throughput is checked as each backend's speed
+relative to bs4 in the same run, so the baseline holds across machines; every
+backend in the baseline has to be installed for --check to pass.
+
+That ratio is noisy (one run in a few lands at half the usual speedup), so
+--update-baseline records the slowest of BASELINE_RUNS runs, and a backend
+only regresses once it drops below `tolerance` of that and still never below
+the speed of bs4 itself.
+"""
+import argparse
+import base64
+import contextlib
+import glob
+import html
+import io
+import json
+import os
+import shutil
+import sys
+import time
+import tracemalloc
+
+from .embedded_json import extract_listings_from_json, find_embedded_blobs
+from .parsers import PARSERS, PLAN, walk_card
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+PAGES_DIR = os.path.join(FIXTURES_DIR, "pages")
+EXPECTED_PATH = os.path.join(FIXTURES_DIR, "expected.json")
+BASELINE_PATH = os.path.join(FIXTURES_DIR, "baseline.json")
+SAMPLE_ROWS = "output/airbnb_by_template_all_cities.json"
+FIELDS = ["Title", "Price", "Rating", "Reviews", "Image_URL", "Listing_URL", "Listing_ID"]
+REFERENCE_PARSER = "bs4"
+BASELINE_RUNS = 5
+
+CARD_TEMPLATE = """
+<div itemprop="itemListElement" itemscope="" itemtype="http://schema.org/ListItem">
+  <meta itemprop="name" content="{title}">
+  <meta itemprop="position" content="{position}">
+  <div data-testid="card-container" class="c4mnd7m">
+    <a target="listing_{listing_id}" rel="noopener noreferrer nofollow" aria-hidden="true"
+       href="/rooms/{listing_id}?adults=1&amp;search_mode=regular_search"></a>
+    <div class="g1qv1ctd">
+      <div class="cy5jw6o"><picture>
+        <source srcset="{image}?im_w=720 1x">
+        <img class="itu7ddv" data-original-uri="{image}" src="{image}?im_w=720" alt="" loading="lazy">
+      </picture></div>
+      <div data-testid="listing-card-title" class="t1jojoys">{title}</div>
+      <div data-testid="listing-card-subtitle"><span class="a8jt5op">{city}</span></div>
+      <div data-testid="price-availability-row"><span class="_11jcbg2">{price}</span></div>
+      <span aria-hidden="true" class="r4a59j5">{rating} ({reviews})</span>
+      <span class="a8jt5op">{rating} out of 5 average rating, {reviews} reviews</span>
+    </div>
+  </div>
+</div>
+"""
+
+# Older layout: bare room links, no schema.org markup
+LINK_CARD_TEMPLATE = """
+<a href="https://www.airbnb.com/rooms/{listing_id}" class="l1ovpqvx">
+  <img srcset="{image}?im_w=320 1x, {image}?im_w=720 2x" alt="">
+  <h3>{title}</h3>
+  <span aria-label="{price} per night">{price}</span>
+  <span>{rating} · {reviews} reviews</span>
+</a>
+"""
+
+
+# ---------------- corpus ----------------
+def _escaped(row):
+    return {k: html.escape(str(row.get(k) or "")) for k in
+            ("Title", "Price", "Rating", "Reviews", "Image_URL", "Listing_ID", "City")}
+
+
+def sample_page(rows, template=CARD_TEMPLATE, embedded_json=False):
+    """A search page with one Airbnb-style card per row, optionally with the StaysSearch JSON embedded"""
+    cards = []
+    for i, row in enumerate(rows):
+        f = _escaped(row)
+        cards.append(template.format(
+            title=f["Title"], position=i + 1, listing_id=f["Listing_ID"], image=f["Image_URL"],
+            city=f["City"], price=f["Price"], rating=f["Rating"] or "4.9", reviews=f["Reviews"] or "12"))
+    head = "<script>window.__x = {\"a\": 1};</script>"
+    if embedded_json:
+        results = [{
+            "listing": {"id": base64.b64encode(f"DemandStayListing:{row['Listing_ID']}".encode()).decode(),
+                        "title": row.get("Title") or ""},
+            "structuredDisplayPrice": {"primaryLine": {"accessibilityLabel": row.get("Price") or ""}},
+            "contextualPictures": [{"picture": row.get("Image_URL") or ""}],
+            "avgRatingLocalized": f"{row.get('Rating') or '4.9'} ({row.get('Reviews') or '12'})",
+        } for row in rows]
+        state = {"niobeMinimalClientData": [["StaysSearch", {"data": {"presentation": {
+            "staysSearch": {"results": {"searchResults": results}}}}}]]}
+        head += ('<script id="data-deferred-state-0" type="application/json">'
+                 + json.dumps(state).replace("</", "<\\/") + "</script>")
+    return ("<!DOCTYPE html><html><head><title>Airbnb</title>" + head + "</head><body><main>"
+            + "".join(cards) + "</main></body></html>")
+
+
+def make_sample_corpus(rows_path=SAMPLE_ROWS, pages_dir=PAGES_DIR):
+    """Write a handful of sample pages covering each extraction path"""
+    with open(rows_path, encoding="utf-8") as fh:
+        rows = [r for r in json.load(fh) if r.get("Listing_ID")]
+    by_city = {}
+    for row in rows:
+        by_city.setdefault(row.get("City") or "unknown", []).append(row)
+    os.makedirs(pages_dir, exist_ok=True)
+    written = []
+
+    def write(name, page):
+        with open(os.path.join(pages_dir, name), "w", encoding="utf-8") as fh:
+            fh.write(page)
+        written.append(name)
+
+    cities = sorted(by_city)
+    for city in cities[:4]:
+        write(f"sample_{city.lower()}_p1.html", sample_page(by_city[city][:20]))
+    if len(cities) > 4:
+        write(f"sample_{cities[4].lower()}_links.html", sample_page(by_city[cities[4]][:20], LINK_CARD_TEMPLATE))
+    if len(cities) > 5:
+        write(f"sample_{cities[5].lower()}_json.html", sample_page(by_city[cities[5]][:20], embedded_json=True))
+    return written
+
+
+def add_pages(paths, pages_dir=PAGES_DIR):
+    os.makedirs(pages_dir, exist_ok=True)
+    for path in paths:
+        shutil.copy(path, os.path.join(pages_dir, os.path.basename(path)))
+    return [os.path.basename(p) for p in paths]
+
+
+def load_corpus(pages_dir=PAGES_DIR):
+    pages = []
+    for path in sorted(glob.glob(os.path.join(pages_dir, "*.html"))):
+        with open(path, encoding="utf-8") as fh:
+            pages.append((os.path.basename(path), fh.read()))
+    return pages
+
+
+# ---------------- measurements ----------------
+def _quiet():
+    return contextlib.redirect_stdout(io.StringIO())
+
+
+def best_of(repeat, fn, min_time=0.2):
+    """
+    Seconds per call of fn(), best of `repeat` samples.
+
+    Each sample loops fn() for at least about `min_time` so that timer noise
+    doesn't dominate small corpora.
+    """
+    started = time.perf_counter()
+    fn()
+    loops = max(1, int(min_time / max(time.perf_counter() - started, 1e-6)))
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        seconds = (time.perf_counter() - started) / loops
+        best = seconds if best is None else min(best, seconds)
+    return best
+
+
+def json_rows(page):
+    rows, _ = extract_listings_from_json(find_embedded_blobs(page))
+    return rows
+
+
+def bench_json(pages, repeat):
+    seconds = best_of(repeat, lambda: [json_rows(p) for _, p in pages])
+    rows = sum(len(json_rows(p)) for _, p in pages)
+    return {"rows": rows, "seconds": seconds}
+
+
+def bench_backend(parser, pages, repeat):
+    """Throughput, stage latency, per-field latency and allocations of one backend"""
+    with _quiet():
+        trees = [parser.parse(p) for _, p in pages]
+        cards = [parser.find_cards(t) for t in trees]
+        n_cards = sum(len(c) for c in cards)
+
+        total = best_of(repeat, lambda: [parser.parse_cards(p) for _, p in pages])
+        parse = best_of(repeat, lambda: [parser.parse(p) for _, p in pages])
+        lookup = best_of(repeat, lambda: [parser.find_cards(t) for t in trees])
+        extract = best_of(repeat, lambda: [parser.extract_from_card(c) for cs in cards for c in cs])
+
+        # Time locating each field alone, on pre-listed card elements
+        elements = [list(parser.elements(c)) for cs in cards for c in cs]
+        fields = {}
+        for field, matchers in PLAN.items():
+            plan = {field: matchers}
+            seconds = best_of(repeat, lambda: [walk_card(els, plan) for els in elements])
+            fields[field] = seconds / max(1, len(elements)) * 1e6
+
+        del trees, cards, elements
+        tracemalloc.start()
+        blocks = 0
+        peak = 0
+        for _, page in pages:
+            before = sum(s.count for s in tracemalloc.take_snapshot().statistics("filename"))
+            current = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            rows = parser.parse_cards(page)
+            peak += tracemalloc.get_traced_memory()[1] - current
+            after = sum(s.count for s in tracemalloc.take_snapshot().statistics("filename"))
+            blocks += after - before
+            del rows
+        tracemalloc.stop()
+
+    n_pages = len(pages)
+    return {
+        "cards": n_cards,
+        "pages_per_sec": n_pages / total,
+        "cards_per_sec": n_cards / total,
+        "parse_ms": parse / n_pages * 1000,
+        "lookup_ms": lookup / n_pages * 1000,
+        "extract_ms": extract / n_pages * 1000,
+        "field_us": fields,
+        "blocks_per_page": blocks / n_pages,
+        "peak_kb": peak / n_pages / 1024,
+    }
+
+
+def pipeline_rows(parser, page):
+    """Rows as extract_listings_from_page produces them: embedded JSON first, then cards"""
+    rows = json_rows(page)
+    if rows:
+        return {"json": rows, "cards": None}
+    with _quiet():
+        return {"json": [], "cards": parser.parse_cards(page)}
+
+
+def fill_rates(rows):
+    if not rows:
+        return {}
+    return {f: sum(1 for r in rows if r.get(f)) / len(rows) for f in FIELDS}
+
+
+# ---------------- report / checks ----------------
+def run(pages, repeat):
+    report = {"pages": len(pages), "json": bench_json(pages, repeat), "backends": {}, "rows": {}}
+    for name, parser_cls in PARSERS.items():
+        try:
+            parser = parser_cls()
+        except RuntimeError as e:
+            print(f"  ⚠ {name}: {e}")
+            continue
+        report["backends"][name] = bench_backend(parser, pages, repeat)
+        report["rows"][name] = {page_name: pipeline_rows(parser, page) for page_name, page in pages}
+
+    reference = report["rows"].get(REFERENCE_PARSER) or next(iter(report["rows"].values()), {})
+    all_rows = [r for out in reference.values() for r in (out["json"] or out["cards"] or [])]
+    report["fill_rates"] = fill_rates(all_rows)
+    return report
+
+
+def print_report(report):
+    pages = report["pages"]
+    j = report["json"]
+    print(f"\n📄 {pages} pages")
+    if j["rows"]:
+        print(f"  embedded JSON  {j['rows'] / j['seconds']:10.0f} rows/s  {j['seconds'] / pages * 1000:6.2f} ms/page")
+
+    print(f"\n  {'backend':<11} {'pages/s':>8} {'cards/s':>9} {'parse':>8} {'lookup':>8} {'extract':>8} "
+          f"{'blocks':>8} {'peak KB':>8}")
+    for name, b in report["backends"].items():
+        print(f"  {name:<11} {b['pages_per_sec']:8.1f} {b['cards_per_sec']:9.0f} {b['parse_ms']:6.2f}ms "
+              f"{b['lookup_ms']:6.2f}ms {b['extract_ms']:6.2f}ms {b['blocks_per_page']:8.0f} {b['peak_kb']:8.0f}")
+
+    print(f"\n  field lookup, µs/card")
+    print("  " + " " * 11 + "".join(f"{f:>9}" for f in PLAN))
+    for name, b in report["backends"].items():
+        print(f"  {name:<11}" + "".join(f"{b['field_us'][f]:9.1f}" for f in PLAN))
+
+    print(f"\n  fill rates")
+    for field, rate in report["fill_rates"].items():
+        print(f"  {field:<12} {rate * 100:6.1f}%")
+
+
+def expected_from(report):
+    reference = report["rows"].get(REFERENCE_PARSER) or next(iter(report["rows"].values()))
+    return reference
+
+
+def speedup(report, name):
+    """Cards/s of backend `name` over those of the reference parser in the same run, or None"""
+    reference = report["backends"].get(REFERENCE_PARSER)
+    if not reference or name == REFERENCE_PARSER or name not in report["backends"]:
+        return None
+    return report["backends"][name]["cards_per_sec"] / reference["cards_per_sec"]
+
+
+def baseline_from(reports):
+    """Baseline numbers of several runs: the slowest speedup and the largest allocations"""
+    report = reports[0]
+    backends = {}
+    for name, b in report["backends"].items():
+        runs = [r["backends"][name] for r in reports if name in r["backends"]]
+        backends[name] = {"cards_per_sec": round(min(r["cards_per_sec"] for r in runs), 1),
+                          "blocks_per_page": round(max(r["blocks_per_page"] for r in runs), 1),
+                          "peak_kb": round(max(r["peak_kb"] for r in runs), 1)}
+        speedups = [x for x in (speedup(r, name) for r in reports) if x is not None]
+        if speedups:
+            backends[name]["min_speedup"] = round(min(speedups), 2)
+    return {"runs": len(reports), "backends": backends,
+            "fill_rates": {f: round(r, 4) for f, r in report["fill_rates"].items()}}
+
+
+def check(report, expected, baseline, tolerance):
+    """
+    List of regressions against the expected rows and the baseline numbers.
+
+    Speed is compared relative to the bs4 run of the same process, so the check
+    holds on other hardware; allocation counts and fill rates are absolute.
+    """
+    problems = []
+    missing = [name for name in baseline.get("backends", {}) if name not in report["backends"]]
+    for name in missing:
+        problems.append(f"{name}: backend in baseline.json is not installed")
+
+    compared = 0
+    for name, pages in report["rows"].items():
+        for page_name, out in pages.items():
+            want = expected.get(page_name)
+            if want is None:
+                problems.append(f"{page_name}: not in expected.json (run --update-baseline)")
+                continue
+            compared += 1
+            if out != want:
+                problems.append(f"{name}: rows of {page_name} differ from expected.json")
+    if not compared:
+        problems.append("no page was compared with expected.json")
+
+    for name, b in report["backends"].items():
+        base = baseline.get("backends", {}).get(name)
+        if not base:
+            continue
+        ratio = speedup(report, name)
+        if ratio is not None and "min_speedup" in base:
+            floor = max(1.0, base["min_speedup"] * (1 - tolerance))
+            if ratio < floor:
+                problems.append(f"{name}: {ratio:.1f}x the speed of {REFERENCE_PARSER}, below {floor:.1f}x "
+                                f"(slowest baseline run {base['min_speedup']:.1f}x)")
+        # The absolute slack keeps tiny numbers (lxml/lexbor allocate outside Python) from flapping
+        for key, unit, slack in (("blocks_per_page", "blocks/page", 200), ("peak_kb", "peak KB/page", 64)):
+            if b[key] > base[key] * (1 + tolerance) + slack:
+                problems.append(f"{name}: {b[key]:.0f} {unit}, baseline {base[key]:.0f}")
+
+    for field, rate in report["fill_rates"].items():
+        base = baseline.get("fill_rates", {}).get(field)
+        if base is not None and rate < base - 0.005:
+            problems.append(f"fill rate of {field}: {rate:.1%}, baseline {base:.1%}")
+    return problems
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Benchmark listing extraction on the saved page corpus")
+    ap.add_argument("--repeat", type=int, default=7, help="timed runs per measurement, the best one counts")
+    ap.add_argument("--check", action="store_true", help="exit 1 if rows, relative speed or fill rates regressed")
+    ap.add_argument("--tolerance", type=float, default=0.5, help="allowed relative slowdown / allocation growth")
+    ap.add_argument("--update-baseline", action="store_true", help="record expected rows and baseline numbers")
+    ap.add_argument("--baseline-runs", type=int, default=BASELINE_RUNS,
+                    help="runs --update-baseline takes the slowest numbers of")
+    ap.add_argument("--add", nargs="+", metavar="HTML", help="copy saved pages into the corpus")
+    ap.add_argument("--make-sample", action="store_true", help=f"rebuild sample pages from {SAMPLE_ROWS}")
+    args = ap.parse_args(argv)
+
+    if args.add:
+        print(f"➕ Added to corpus: {', '.join(add_pages(args.add))}")
+    if args.make_sample:
+        print(f"🧪 Sample pages: {', '.join(make_sample_corpus())}")
+
+    pages = load_corpus()
+    if not pages:
+        print(f"⚠ No pages in {PAGES_DIR}; use --add or --make-sample")
+        return 1
+
+    report = run(pages, args.repeat)
+    print_report(report)
+
+    if args.update_baseline:
+        reports = [report]
+        for i in range(1, args.baseline_runs):
+            print(f"\n⏱ Baseline run {i + 1}/{args.baseline_runs}")
+            reports.append(run(pages, args.repeat))
+        with open(EXPECTED_PATH, "w", encoding="utf-8") as fh:
+            json.dump(expected_from(report), fh, ensure_ascii=False, indent=1)
+        with open(BASELINE_PATH, "w", encoding="utf-8") as fh:
+            json.dump(baseline_from(reports), fh, indent=2)
+        print(f"\n💾 Baseline written to {FIXTURES_DIR}")
+
+    if args.check:
+        with open(EXPECTED_PATH, encoding="utf-8") as fh:
+            expected = json.load(fh)
+        with open(BASELINE_PATH, encoding="utf-8") as fh:
+            baseline = json.load(fh)
+        problems = check(report, expected, baseline, args.tolerance)
+        if problems:
+            print(f"\n❌ {len(problems)} regressions:")
+            for p in problems:
+                print(f"  - {p}")
+            return 1
+        print("\n✅ No regressions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,71 @@
+# blocking.py
+"""
+Which requests a listing crawl can do without.
+
+The scraper only needs the search page markup, its embedded JSON and the
+StaysSearch XHR; image URLs are read from the markup and fetched separately by
+the image pipeline. Everything in the categories below is blocked in the
+browser. Selenium blocks by URL pattern (CDP Network.setBlockedURLs),
+Playwright by URL pattern or resource type (a route on the browser context).
+"""
+import fnmatch
+import re
+
+BLOCK_CATEGORIES = {
+    "images": {
+        "types": {"image"},
+        "patterns": ["*.jpg*", "*.jpeg*", "*.png*", "*.gif*", "*.webp*", "*.avif*", "*.svg*", "*.ico*",
+                     "*muscache.com/im/*"],
+    },
+    "media": {
+        "types": {"media"},
+        "patterns": ["*.mp4*", "*.webm*", "*.m3u8*", "*.mp3*", "*.ogg*"],
+    },
+    "fonts": {
+        "types": {"font"},
+        "patterns": ["*.woff*", "*.ttf*", "*.otf*", "*.eot*"],
+    },
+    "analytics": {
+        "types": set(),
+        "patterns": ["*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*",
+                     "*googleadservices.com*", "*facebook.net*", "*facebook.com/tr*", "*connect.facebook*",
+                     "*bat.bing.com*", "*criteo.*", "*hotjar.*", "*branch.io*", "*sentry.io*",
+                     "*datadoghq.com*", "*airbnb.com/tracking/*", "*/marketing_event_tracking*"],
+    },
+    "maps": {
+        "types": set(),
+        "patterns": ["*maps.googleapis.com*", "*maps.gstatic.com*", "*khms*.google.com*",
+                     "*mts*.google.com*", "*mapbox.com*", "*/maps/api/*"],
+    },
+}
+
+
+class BlockList:
+    """URL patterns and resource types to block, built from category names plus extra patterns"""
+
+    def __init__(self, categories=(), patterns=()):
+        unknown = [name for name in categories if name not in BLOCK_CATEGORIES]
+        if unknown:
+            raise ValueError(f"Unknown block categories {unknown}, expected any of {sorted(BLOCK_CATEGORIES)}")
+        self.categories = list(categories)
+        self.patterns = [p for name in self.categories for p in BLOCK_CATEGORIES[name]["patterns"]]
+        self.patterns += list(patterns)
+        self.resource_types = {t for name in self.categories for t in BLOCK_CATEGORIES[name]["types"]}
+        # All patterns in one regex: Playwright checks every request against it
+        self._regex = (re.compile("|".join(fnmatch.translate(p) for p in self.patterns), re.IGNORECASE)
+                       if self.patterns else None)
+
+    def __bool__(self):
+        return bool(self.patterns or self.resource_types)
+
+    def __repr__(self):
+        return f"BlockList(categories={self.categories!r}, patterns={len(self.patterns)})"
+
+    @property
+    def blocks_images(self):
+        return "images" in self.categories
+
+    def blocks(self, url, resource_type=None):
+        if resource_type in self.resource_types:
+            return True
+        return bool(self._regex and self._regex.match(url))
@@ -0,0 +1,154 @@
+# checkpoint.py
+"""
+Page-granular checkpoint journal for crash recovery.
+
+The journal is an append-only JSON Lines file with three record types:
+
+    {"type": "nav",  "city": ..., "page": N, "url": ...}   page N was reached at url
+    {"type": "page", "city": ..., "page": N, "listing_ids": [...]}
+                                                            every row of page N is on disk
+    {"type": "city", "city": ...}                           all pages of the city are on disk
+
+A page record is only written once all rows of that page have reached the
+output sinks (rows with images are written when their download finishes), so
+whatever the journal claims is really in the output files. `load()` turns the
+journal into a per-city resume point: the first page not yet on disk, the URL
+it was reached at and the listing IDs to skip. Records written during the run
+update the same state, so a city retried later in the run resumes too.
+"""
+import json
+import os
+import threading
+from datetime import datetime
+
+from .listing_urls import listing_id
+
+
+class CityResume:
+    """Where to pick a city up again"""
+
+    def __init__(self):
+        self.done = False
+        self.done_pages = set()
+        self.nav_urls = {}
+        self.listing_ids = set()
+
+    def resume_page(self):
+        """(page, url) of the first page not fully written; url is None if it was never reached"""
+        page = 1
+        while page in self.done_pages:
+            page += 1
+        return page, self.nav_urls.get(page)
+
+
+class CheckpointJournal:
+    def __init__(self, path, resume=False):
+        self.path = path
+        self._lock = threading.Lock()
+        self._page_waits = {}  # (city, page) -> downloads still to finish
+        self._city_pages = {}  # city -> pages not yet recorded
+        self._finishing = set()
+        self.state = self.load(path) if resume else {}
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._fh = open(path, "a" if resume else "w", encoding="utf-8")
+
+    @staticmethod
+    def load(path):
+        """Read a journal into {city: CityResume}"""
+        state = {}
+        if not os.path.exists(path):
+            return state
+        with open(path, encoding="utf-8") as fh:
+            for line in fh:
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    continue  # torn last line after a crash
+                city = state.setdefault(rec.get("city"), CityResume())
+                kind = rec.get("type")
+                if kind == "nav":
+                    city.nav_urls[rec["page"]] = rec["url"]
+                elif kind == "page":
+                    city.done_pages.add(rec["page"])
+                    # Older journals hold IDs as strings or full listing URLs
+                    city.listing_ids.update(listing_id(key) or key for key in rec.get("listing_ids") or [])
+                elif kind == "city":
+                    city.done = True
+        return state
+
+    def city_state(self, city):
+        return self.state.get(city) or CityResume()
+
+    def _append(self, record):
+        record["at"] = datetime.utcnow().isoformat()
+        with self._lock:
+            city = self.state.setdefault(record["city"], CityResume())
+            if record["type"] == "nav":
+                city.nav_urls[record["page"]] = record["url"]
+            elif record["type"] == "page":
+                city.done_pages.add(record["page"])
+                city.listing_ids.update(record["listing_ids"])
+            elif record["type"] == "city":
+                city.done = True
+            self._fh.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self._fh.flush()
+            os.fsync(self._fh.fileno())
+
+    def record_nav(self, city, page, url):
+        if url:
+            self._append({"type": "nav", "city": city, "page": page, "url": url})
+
+    def record_page(self, city, page, listing_ids, futures=()):
+        """
+        Record page `page` of `city` once every future in `futures` is done.
+
+        `futures` are the pending image downloads whose callbacks write rows.
+        """
+        futures = [f for f in futures if f is not None]
+        key = (city, page)
+        listing_ids = list(listing_ids)
+        with self._lock:
+            self._page_waits[key] = len(futures)
+            self._city_pages[city] = self._city_pages.get(city, 0) + 1
+
+        def write_page():
+            self._append({"type": "page", "city": city, "page": page, "listing_ids": listing_ids})
+            self._page_written(city)
+
+        def one_done(_):
+            with self._lock:
+                self._page_waits[key] -= 1
+                ready = self._page_waits[key] == 0
+                if ready:
+                    del self._page_waits[key]
+            if ready:
+                write_page()
+
+        if not futures:
+            with self._lock:
+                del self._page_waits[key]
+            write_page()
+        for f in futures:
+            f.add_done_callback(one_done)
+
+    def _page_written(self, city):
+        with self._lock:
+            self._city_pages[city] -= 1
+            finished = city in self._finishing and self._city_pages[city] == 0
+            if finished:
+                self._finishing.discard(city)
+        if finished:
+            self._append({"type": "city", "city": city})
+
+    def finish_city(self, city):
+        """Record the city as done once all of its pages are on disk"""
+        with self._lock:
+            pending = self._city_pages.get(city, 0)
+            if pending > 0:
+                self._finishing.add(city)
+        if pending <= 0:
+            self._append({"type": "city", "city": city})
+
+    def close(self):
+        with self._lock:
+            self._fh.close()
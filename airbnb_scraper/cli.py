@@ -0,0 +1,242 @@
+# cli.py
+"""
+Command line entry point: `python -m airbnb_scraper <command>`.
+
+    scrape [--resume] [--cities A B] [--workers N] ...   run the scraper
+    parse PAGE.html ... [--out rows.jsonl]               extract rows from saved pages
+    replay [--run RUN ...] [--out rows.csv]              rebuild the outputs from the page archive
+    details [SRC] [--force]                              fetch the detail pages of SRC's listings
+    images [--prune]                                     thumbnails, hashes and manifest of the image store
+    export SRC DEST                                      convert between csv/json/jsonl/parquet/dataset
+    clean SRC [DEST]                                     typed price/rating/reviews/ID columns
+    url CITY [--page N]                                  print a city's search URL
+    bench [...]                                          run the offline extraction benchmark
+
+Modules are imported inside the commands, so `parse`, `export` and `url`
+start without loading the browser stack.
+"""
+import argparse
+import json
+import sys
+
+
+def cmd_scrape(args):
+    from .scraper import Scraper
+
+    overrides = {}
+    for name in ("workers", "browser_engine", "max_pages_per_city", "html_parser"):
+        if getattr(args, name) is not None:
+            overrides[name] = getattr(args, name)
+    if args.headless is not None:
+        overrides["headless"] = args.headless
+    if args.no_block:
+        overrides["block_resources"] = []
+    with Scraper(**overrides) as scraper:
+        scraper.run(cities=args.cities, resume=args.resume)
+    return 0
+
+
+def cmd_parse(args):
+    from .config import Config
+    from .scraper import Scraper
+    from .sinks import open_sink
+
+    config = Config(extraction_mode=args.mode, html_parser=args.parser)
+    sink = open_sink(args.out, config.output_columns) if args.out else None
+    scraper = Scraper(config)
+    total = 0
+    try:
+        for path in args.pages:
+            with open(path, encoding="utf-8", errors="replace") as fh:
+                rows = scraper.parse_html(fh.read())
+            for row in rows:
+                if sink:
+                    sink.write(row)
+                else:
+                    print(json.dumps(row, ensure_ascii=False))
+            total += len(rows)
+            print(f"📄 {path}: {len(rows)} listings", file=sys.stderr)
+    finally:
+        if sink:
+            sink.close()
+    print(f"✓ {total} listings from {len(args.pages)} pages", file=sys.stderr)
+    return 0
+
+
+def cmd_replay(args):
+    from .archive import PageArchive
+    from .config import Config
+    from .scraper import Scraper
+
+    overrides = {name: getattr(args, name) for name in ("extraction_mode", "html_parser", "extraction_workers")
+                 if getattr(args, name) is not None}
+    config = Config(**overrides)
+    if args.list:
+        archive = PageArchive(config.page_archive)
+        for run, pages, cities in archive.runs():
+            print(f"{run}  {pages} pages, {cities} cities")
+        stats = archive.stats()
+        print(f"📦 {stats['captures']} snapshots, {stats['payloads']} distinct payloads, "
+              f"{stats['bytes'] / 1024 ** 2:.1f} MB in {config.page_archive}", file=sys.stderr)
+        archive.close()
+        return 0
+    try:
+        Scraper(config).replay(runs=args.run, cities=args.cities, out=args.out)
+    except ValueError as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+def cmd_details(args):
+    from .config import Config
+    from .listing_urls import listing_id
+    from .scraper import Scraper
+    from .sinks import read_rows
+
+    overrides = {name: getattr(args, name) for name in ("detail_workers", "detail_rate_limit")
+                 if getattr(args, name) is not None}
+    config = Config(**overrides)
+    if args.ids:
+        ids = [listing_id(value) for value in args.ids]
+    else:
+        src = args.src or config.out_csv
+        ids = [listing_id(row.get("Listing_ID")) or listing_id(row.get("Listing_URL")) for row in read_rows(src)]
+    ids = list(dict.fromkeys(lid for lid in ids if lid))
+    print(f"🏠 {len(ids)} listings")
+    Scraper(config).refresh_details(ids, force=args.force)
+    return 0
+
+
+def cmd_images(args):
+    from .config import Config
+    from .scraper import Scraper
+
+    overrides = {name: getattr(args, name) for name in ("image_process_workers", "near_duplicate_distance")
+                 if getattr(args, name) is not None}
+    try:
+        Scraper(Config(**overrides)).process_images(prune=args.prune)
+    except RuntimeError as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+def cmd_export(args):
+    from .config import OUTPUT_COLUMNS
+    from .sinks import open_sink, read_rows
+
+    sink = open_sink(args.dest, args.columns or OUTPUT_COLUMNS)
+    count = 0
+    try:
+        for row in read_rows(args.src):
+            sink.write(row)
+            count += 1
+    finally:
+        sink.close()
+    print(f"✓ Exported {count} rows to {args.dest}")
+    return 0
+
+
+def cmd_clean(args):
+    from .cleaning import clean_file
+
+    df, rows_per_sec = clean_file(args.src, args.dest)
+    print(df.dtypes.to_string())
+    print(f"✓ Cleaned {len(df)} rows ({rows_per_sec:,.0f} rows/s)" + (f" into {args.dest}" if args.dest else ""))
+    return 0
+
+
+def cmd_url(args):
+    from .config import TEMPLATE_URL
+    from .pagination import build_city_url_from_template, page_url
+
+    print(page_url(build_city_url_from_template(TEMPLATE_URL, args.city), args.page))
+    return 0
+
+
+def build_parser():
+    ap = argparse.ArgumentParser(prog="airbnb_scraper", description="Scrape Airbnb search results for several cities")
+    commands = ap.add_subparsers(dest="command", required=True)
+
+    p = commands.add_parser("scrape", help="scrape the configured cities")
+    p.add_argument("--resume", action="store_true",
+                   help="continue the previous run from its checkpoint journal instead of starting over")
+    p.add_argument("--cities", nargs="+", metavar="CITY", help="cities to scrape (default: CITIES in config.py)")
+    p.add_argument("--workers", type=int, help="parallel browser sessions")
+    p.add_argument("--engine", dest="browser_engine", choices=["selenium", "playwright"])
+    p.add_argument("--max-pages", dest="max_pages_per_city", type=int, help="max search pages per city")
+    p.add_argument("--parser", dest="html_parser", help="card parser: bs4, lxml, selectolax or auto")
+    p.add_argument("--headless", action="store_true", default=None, help="run the browser without a window")
+    p.add_argument("--headed", dest="headless", action="store_false", help="show the browser window")
+    p.add_argument("--no-block", action="store_true",
+                   help="load every resource (compare its transfer per page with the default blocking)")
+    p.set_defaults(func=cmd_scrape)
+
+    p = commands.add_parser("parse", help="extract listing rows from saved search pages")
+    p.add_argument("pages", nargs="+", metavar="PAGE.html")
+    p.add_argument("--out", help="output file, format by extension (default: JSON lines on stdout)")
+    p.add_argument("--mode", default="auto", choices=["auto", "json", "dom"], help="extraction mode")
+    p.add_argument("--parser", default="auto", help="card parser: bs4, lxml, selectolax or auto")
+    p.set_defaults(func=cmd_parse)
+
+    p = commands.add_parser("replay", help="rebuild the output files from the archived search pages")
+    p.add_argument("--list", action="store_true", help="list the archived runs and exit")
+    p.add_argument("--run", nargs="+", metavar="RUN",
+                   help="run(s) to replay, as shown by --list (default: the latest)")
+    p.add_argument("--cities", nargs="+", metavar="CITY", help="only these cities")
+    p.add_argument("--out", help="write here instead of the configured output files (format by extension)")
+    p.add_argument("--mode", dest="extraction_mode", choices=["auto", "json", "dom"], help="extraction mode")
+    p.add_argument("--parser", dest="html_parser", help="card parser: bs4, lxml, selectolax or auto")
+    p.add_argument("--workers", dest="extraction_workers", type=int, help="extraction processes")
+    p.set_defaults(func=cmd_replay)
+
+    p = commands.add_parser("details", help="fetch amenities, capacity, host, coordinates and photos of listings")
+    p.add_argument("src", nargs="?", help="output file or dataset with the listings (default: OUT_CSV)")
+    p.add_argument("--ids", nargs="+", metavar="ID", help="listing IDs or URLs instead of a file")
+    p.add_argument("--force", action="store_true", help="fetch again even if the cached details are fresh")
+    p.add_argument("--workers", dest="detail_workers", type=int, help="fetch threads")
+    p.add_argument("--rate", dest="detail_rate_limit", type=float, help="starting detail pages per second")
+    p.set_defaults(func=cmd_details)
+
+    p = commands.add_parser("images", help="thumbnail, hash and catalogue the downloaded images")
+    p.add_argument("--prune", action="store_true",
+                   help="replace near-duplicate images by links to the kept one, which their URLs then use")
+    p.add_argument("--workers", dest="image_process_workers", type=int, help="decoding processes")
+    p.add_argument("--distance", dest="near_duplicate_distance", type=int,
+                   help="max dHash bits apart for two images to count as the same photo")
+    p.set_defaults(func=cmd_images)
+
+    p = commands.add_parser("export", help="convert an output file to another format")
+    p.add_argument("src", help="existing .csv, .json, .jsonl or .parquet file, or a dataset directory")
+    p.add_argument("dest", help="file to write, format by extension; no extension = partitioned dataset")
+    p.add_argument("--columns", nargs="+", help="columns of csv/parquet output (default: OUTPUT_COLUMNS)")
+    p.set_defaults(func=cmd_export)
+
+    p = commands.add_parser("clean", help="parse price, rating, reviews and listing ID into typed columns")
+    p.add_argument("src", help="output file (.csv, .json, .jsonl or .parquet) or dataset directory")
+    p.add_argument("dest", nargs="?", help="where to write the typed rows (.parquet keeps the types)")
+    p.set_defaults(func=cmd_clean)
+
+    p = commands.add_parser("url", help="print the search URL of a city")
+    p.add_argument("city")
+    p.add_argument("--page", type=int, default=1)
+    p.set_defaults(func=cmd_url)
+
+    # Listed for --help only, main() hands the arguments to bench_extraction.main
+    commands.add_parser("bench", help="offline extraction benchmark (see bench_extraction.py)")
+    return ap
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if argv[:1] == ["bench"]:
+        # bench's own options (--check, --repeat ...) are passed through untouched
+        from .bench_extraction import main as bench_main
+        return bench_main(argv[1:]) or 0
+    args = build_parser().parse_args(argv)
+    return args.func(args) or 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
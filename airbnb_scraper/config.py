@@ -0,0 +1,156 @@
+# config.py
+"""
+Default settings of the scraper.
+
+Edit the constants below, or override any of them per run:
+`Scraper(cities=["Lahore"], workers=2)` / `python -m airbnb_scraper scrape --workers 2`.
+Setting names are the constants in lowercase.
+"""
+
+# ---------------- CONFIG ----------------
+HEADLESS = True
+VIEWPORT = (1280, 720)  # Browser window size; a small one renders less
+# Requests the browser never sends (see blocking.py): any of "images", "media", "fonts", "analytics", "maps".
+# Listing image URLs are still read from the markup; the image pipeline downloads them itself.
+BLOCK_RESOURCES = ["images", "media", "fonts", "analytics", "maps"]
+BLOCK_URL_PATTERNS = []  # Extra wildcard URL patterns to block, e.g. "*example.com/pixel*"
+BROWSER_ENGINE = "selenium"  # "selenium" (one Chrome per session) or "playwright" (one browser, many contexts)
+# "auto": read listings from the page's embedded JSON / StaysSearch XHR, fall back to card parsing
+# "json": structured data only, "dom": always parse the rendered cards
+EXTRACTION_MODE = "auto"
+HTML_PARSER = "auto"  # Card parser: "bs4", "lxml", "selectolax" or "auto" (fastest installed)
+# Processes extracting listings from compressed page snapshots (extraction.py), so parsing never holds up
+# the browser; 0 = extract in the crawler thread
+EXTRACTION_WORKERS = 2
+SNAPSHOT_CODEC = "gzip"  # Page snapshot compression: "gzip" or "zstd" (needs zstandard)
+# Every extracted page is kept here, compressed and deduplicated (archive.py), so
+# `python -m airbnb_scraper replay` can rebuild the outputs without crawling again; "" = off
+PAGE_ARCHIVE = "output/pages"
+SAVE_PAGES_DIR = ""  # Save every search page here (e.g. "fixtures/pages") for bench_extraction.py, "" = off
+CITIES = [
+    "Islamabad", "Lahore", "Karachi", "Rawalpindi", "Multan",
+    "Faisalabad", "Hyderabad", "Peshawar", "Quetta", "Sialkot"
+]
+# Put your example/search URL here. The script will replace the city part of the path.
+TEMPLATE_URL = ("https://www.airbnb.com/s/karachi-/homes?refinement_paths%5B%5D=%2Fhomes"
+                "&date_picker_type=monthly_stay&monthly_start_date=2025-09-01&monthly_end_date=2026-09-01"
+                "&search_type=search_query&flexible_trip_lengths%5B%5D=one_week&monthly_length=3"
+                "&price_filter_input_type=1&price_filter_num_nights=365&channel=EXPLORE"
+                "&location_bb=QgcllEKSxKxCBcg6QpGTgQ%3D%3D&acp_id=b513a84f-8cc3-4439-bc64-0df14e5810b4"
+                "&source=structured_search_input_header")
+
+OUT_CSV = "output/airbnb_by_template_all_cities.csv"
+OUT_JSON = "output/airbnb_by_template_all_cities.json"
+OUT_JSONL = "output/airbnb_by_template_all_cities.jsonl"
+OUT_PARQUET = "output/airbnb_by_template_all_cities.parquet"
+# Parquet dataset partitioned by City and scrape date; every run adds its own files (see sinks.py)
+OUT_DATASET = "output/dataset"
+# Any of "csv", "json", "jsonl", "parquet", "dataset" (parquet and dataset need pyarrow)
+OUTPUT_FORMATS = ["csv", "json"]
+OUTPUT_COLUMNS = ["Title", "Price", "Rating", "Reviews", "Image_URL", "Local_Image_Path",
+                  "Listing_URL", "Listing_ID", "City", "Page", "Scraped_At", "Change"]
+# Listing_URL is written in canonical /rooms/<id> form; the search/tracking query parameters
+# stripped from it go here as JSON lines ({"Listing_ID", "City", "Page", "Scraped_At", "Params"}). "" = drop
+URL_PARAMS_OUT = ""
+# Listings are written once per run, whichever city finds them first; every city/page a listing was
+# seen on is kept in this index (.npz, loaded again by --resume). "" = keep it in memory only
+LISTING_INDEX = "output/listing_index.npz"
+FSYNC_INTERVAL = 5  # Seconds between fsyncs of the output files
+CHECKPOINT_JOURNAL = "output/checkpoint.jsonl"  # Page-level progress journal used by --resume
+PARQUET_ROW_GROUP = 5000  # Rows per Parquet row group
+# After a run, parse Price/Rating/Reviews/Listing_ID into typed columns (cleaning.py) and write them here;
+# .parquet keeps the column types (needs pyarrow), .csv / .jsonl only the values. "" = off
+CLEAN_OUTPUT = "output/airbnb_by_template_all_cities_clean.csv"
+
+# Timers and counters per crawl stage (metrics.py), rewritten after every city and at the end; "" = off
+METRICS_JSON = "output/metrics.json"
+METRICS_PROM = "output/metrics.prom"  # Prometheus text format, e.g. for node_exporter's textfile collector
+METRICS_PORT = 0  # Serve http://127.0.0.1:PORT/metrics while a run lasts; 0 = off
+
+# Image settings
+DOWNLOAD_IMAGES = True  # Set to False if you don't want to download images
+IMAGES_FOLDER = "output/images"  # Content-addressed image store (blobs/ + index.sqlite)
+IMAGE_TIMEOUT = 10  # Timeout for image download in seconds
+MAX_IMAGE_SIZE = 5 * 1024 * 1024  # 5MB max image size
+IMAGE_WORKERS = 8  # Background download threads
+IMAGE_QUEUE_SIZE = 500  # Max images waiting for download before the scraper blocks
+IMAGE_POOL_SIZE = 16  # Keep-alive HTTP connections kept open per host
+IMAGE_PER_HOST_LIMIT = 6  # Max concurrent downloads from one host
+IMAGE_RETRIES = 3  # Retries (with exponential backoff) on connection errors / 429 / 5xx
+IMAGE_BACKOFF = 0.5  # Backoff factor in seconds
+
+# Detail pages (details.py): capacity, amenities, host, coordinates and all photos of every new or
+# changed listing, fetched over plain HTTP next to the crawl. Also `python -m airbnb_scraper details`
+FETCH_DETAILS = False
+DETAILS_OUT = "output/listing_details.jsonl"  # One JSON line per fetched listing, appended run after run
+DETAILS_CACHE = "output/details.sqlite"  # Last fetch (and page) per listing
+DETAIL_WORKERS = 4  # Fetch threads
+DETAIL_PER_HOST_LIMIT = 2  # Max detail pages in flight at once (they all come from www.airbnb.com)
+DETAIL_RATE_LIMIT = 1.0  # Starting detail pages per second, adapting within RATE_LIMIT_RANGE
+DETAIL_MAX_AGE_DAYS = 7  # Unchanged listings are fetched again once their details are this old
+DETAIL_TIMEOUT = 15  # Seconds per detail page request
+
+# Post-download image stage (image_processing.py, needs Pillow): WebP thumbnails, perceptual hashes and a
+# manifest marking placeholders and near-duplicates. Also `python -m airbnb_scraper images [--prune]`
+PROCESS_IMAGES = False
+IMAGE_MANIFEST = "output/images/manifest.jsonl"  # One JSON line per stored image
+THUMBS_FOLDER = "output/images/thumbs"
+THUMB_SIZE = (360, 240)  # Thumbnail width x height, center-cropped
+IMAGE_PROCESS_WORKERS = 4  # Processes decoding images; 0 = in the calling process
+NEAR_DUPLICATE_DISTANCE = 6  # dHash bits two images may differ in and still be the same photo
+PLACEHOLDER_MIN_SIDE = 120  # Images smaller than this (px) on either side are icons / placeholders
+PLACEHOLDER_URL_PATTERNS = ["aki_policy=profile"]  # Host avatars
+
+# Pagination settings
+MAX_PAGES_PER_CITY = 20  # Adjust based on how many pages you want to scrape per city
+# "url": open page N straight from its offset URL (clicking "Next" only when that fails),
+# "click": click through the pages one after another
+PAGINATION_MODE = "url"
+PAGE_READY_TIMEOUT = 15  # Max seconds to wait for a page's listings to settle
+PAGE_POLITENESS_RANGE = (1, 3)  # Random pause (seconds) before each next-page click, (0, 0) disables
+CARD_READY_CSS = 'div[data-testid="card-container"], div[itemprop="itemListElement"], a[href*="/rooms/"]'
+
+# Incremental re-crawl settings
+INCREMENTAL = True  # Track listings across runs and only emit inserts / updates / removals
+STATE_DB = "output/listings_state.sqlite"  # Persistent listing state (first/last seen, fingerprint)
+CHANGES_LOG = "output/changes.jsonl"  # Append-only log of insert / update / remove events
+KNOWN_STOP_RATIO = 0.8  # Stop paginating a city once this share of a page is known and unchanged
+STALE_AFTER_DAYS = 7  # After an early stop, listings unseen this long are reported as removed
+
+# Worker pool settings
+WORKERS = 1  # Number of parallel browser sessions (1 = old serial behaviour)
+MAX_WORKERS_PER_CITY = 1  # Max sessions working on the same city at once
+GLOBAL_RATE_LIMIT = 0.5  # Starting page loads per second across all workers (0 = unlimited)
+RATE_LIMIT_RANGE = (0.1, 2.0)  # The rate adapts between these: up on clean pages, down on slow/empty/blocked ones
+RATE_INCREASE = 0.02  # Pages/s added after every clean page
+RATE_BACKOFF = 0.5  # Rate multiplier after a slow, empty or timed-out page (squared for a block page)
+SLOW_PAGE_SECONDS = 10  # A page taking longer than this to load counts as slow
+BREAKER_THRESHOLD = 2  # Failed pages in a row before a city is put aside
+BREAKER_COOLDOWN = 60  # Seconds a city is put aside for; doubles with every further trip
+BREAKER_MAX_TRIPS = 3  # Trips after which a city is given up
+CITY_PAUSE_RANGE = (8, 15)  # Polite pause (seconds) a session takes between cities
+
+# Browser session settings
+BROWSER_STATE = "output/browser_state.json"  # Saved cookies + cookie-banner consent shared by all sessions
+SESSION_RECYCLE_PAGES = 50  # Reopen a session's browser after this many pages (caps Chrome memory), 0 = never
+SESSION_MAX_FAILURES = 3  # Reopen a session's browser after this many failed page loads in a row
+PRELOAD_NEXT_CITY = True  # Serial runs: load the next city's first page during the pause between cities
+# ----------------------------------------
+
+
+DEFAULTS = {name: value for name, value in globals().items() if name.isupper()}
+
+
+class Config:
+    """The settings above as lowercase attributes, with keyword overrides"""
+
+    def __init__(self, **overrides):
+        for name, value in DEFAULTS.items():
+            setattr(self, name.lower(), value)
+        for name, value in overrides.items():
+            if name.upper() not in DEFAULTS:
+                raise TypeError(f"Unknown setting: {name}")
+            setattr(self, name, value)
+
+    def __repr__(self):
+        return f"Config({', '.join(f'{k}={v!r}' for k, v in vars(self).items())})"
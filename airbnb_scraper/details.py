@@ -0,0 +1,326 @@
+# details.py
+"""
+Optional second stage: listing detail pages.
+
+A search card only carries Title / Price / Rating / Reviews and one image. The
+listing's own page, https://www.airbnb.com/rooms/<id>, embeds the rest in the
+same kind of JSON blob as a search page (see embedded_json.py); this stage
+reads it for listings that are new or changed:
+
+    Guests, Bedrooms, Beds, Bathrooms   capacity ("4 guests · 2 bedrooms · ...")
+    Amenities                           available amenities, by title
+    Host_Name, Host_ID, Superhost       the host card
+    Latitude, Longitude                 the map pin (Airbnb offsets it a little)
+    Photos                              every photo URL of the listing
+
+Pages are fetched over plain HTTP (no browser) by a pool of threads sharing a
+keep-alive session, at most `per_host_limit` at once, paced by an
+AdaptiveRateLimiter. Results go into a `DetailCache` (SQLite, with the page
+itself compressed), so a listing is fetched again only when it changed or its
+details are older than `max_age_days`, and out as JSON lines (DETAILS_OUT).
+"""
+import json
+import queue
+import re
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from datetime import datetime, timedelta
+
+from .embedded_json import decode_id, find_embedded_blobs
+from .extraction import compress, decompress
+from .listing_urls import canonical_listing_url
+from .metrics import timed
+
+DETAIL_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/115.0 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml',
+    'Accept-Language': 'en-US,en;q=0.9',
+}
+
+# "4 guests", "1 bedroom", "2 beds", "1.5 baths" / "1 private bath"
+CAPACITY_RE = re.compile(r'(\d+(?:\.\d+)?)\s+(?:\w+\s+)?(guest|bedroom|bed|bath)s?\b', re.I)
+CAPACITY_FIELDS = {"guest": "Guests", "bedroom": "Bedrooms", "bed": "Beds", "bath": "Bathrooms"}
+HOSTED_BY_RE = re.compile(r'Hosted by\s+(.+)', re.I)
+
+_STOP = object()
+
+
+# ---------------- parsing ----------------
+def _walk(node):
+    """Yield every (key, value) pair of the JSON tree, depth first"""
+    stack = [node]
+    while stack:
+        cur = stack.pop()
+        if isinstance(cur, dict):
+            for key, value in cur.items():
+                yield key, value
+                if isinstance(value, (dict, list)):
+                    stack.append(value)
+        elif isinstance(cur, list):
+            stack.extend(v for v in cur if isinstance(v, (dict, list)))
+
+
+def _number(text):
+    value = float(text)
+    return int(value) if value.is_integer() else value
+
+
+def parse_detail_page(html):
+    """
+    Detail fields of a listing page (without Listing_ID / Listing_URL / Fetched_At).
+
+    Fields the page doesn't carry are left empty; an empty dict means no
+    embedded data was found at all (e.g. a block or error page).
+    """
+    blobs = []
+    for blob in find_embedded_blobs(html):
+        try:
+            blobs.append(json.loads(blob))
+        except ValueError:
+            continue
+    if not blobs:
+        return {}
+
+    details = {"Guests": "", "Bedrooms": "", "Beds": "", "Bathrooms": "", "Amenities": [],
+               "Host_Name": "", "Host_ID": "", "Superhost": "", "Latitude": "", "Longitude": "", "Photos": []}
+    amenities, photos = {}, {}
+    for key, value in (pair for blob in blobs for pair in _walk(blob)):
+        if key in ("overviewItems", "detailItems") and isinstance(value, list):
+            for item in value:
+                text = item.get("title", "") if isinstance(item, dict) else ""
+                for number, unit in CAPACITY_RE.findall(text):
+                    field = CAPACITY_FIELDS[unit.lower()]
+                    details[field] = details[field] or _number(number)
+        elif key == "personCapacity" and isinstance(value, int):
+            details["Guests"] = details["Guests"] or value
+        elif key == "seeAllAmenitiesGroups" and isinstance(value, list):
+            for group in value:
+                for amenity in (group or {}).get("amenities") or []:
+                    if isinstance(amenity, dict) and amenity.get("available", True) and amenity.get("title"):
+                        amenities.setdefault(amenity["title"], None)
+        elif key in ("mediaItems", "photos") and isinstance(value, list):
+            for item in value:
+                url = item.get("baseUrl") or item.get("pictureUrl") if isinstance(item, dict) else None
+                if url:
+                    photos.setdefault(url.split("?")[0], None)
+        elif key == "lat" and isinstance(value, (int, float)) and details["Latitude"] == "":
+            details["Latitude"] = value
+        elif key == "lng" and isinstance(value, (int, float)) and details["Longitude"] == "":
+            details["Longitude"] = value
+        elif key == "isSuperhost" and isinstance(value, bool) and details["Superhost"] == "":
+            details["Superhost"] = value
+        elif key == "userId" and isinstance(value, str) and not details["Host_ID"]:
+            details["Host_ID"] = decode_id(value)
+        elif key == "title" and isinstance(value, str) and not details["Host_Name"]:
+            m = HOSTED_BY_RE.match(value)
+            if m:
+                details["Host_Name"] = m.group(1).strip()
+    details["Amenities"] = list(amenities)
+    details["Photos"] = list(photos)
+    return details
+
+
+# ---------------- cache ----------------
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS details (
+    listing_id TEXT PRIMARY KEY,
+    fetched_at TEXT NOT NULL,
+    status     TEXT NOT NULL,
+    data       TEXT,
+    page       BLOB
+);
+"""
+
+
+class DetailCache:
+    """Last fetch of every listing's detail page: when, how it went, the parsed fields and the page (gzip)"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.executescript(SCHEMA)
+        self._db.commit()
+
+    def fresh(self, listing_id, max_age_days):
+        """True if the listing's details were fetched successfully within `max_age_days`"""
+        since = (datetime.utcnow() - timedelta(days=max_age_days)).isoformat()
+        with self._lock:
+            row = self._db.execute("SELECT 1 FROM details WHERE listing_id = ? AND status = 'ok' AND fetched_at >= ?",
+                                   (str(listing_id), since)).fetchone()
+        return row is not None
+
+    def get(self, listing_id):
+        """Last good detail fields of a listing, or None"""
+        with self._lock:
+            row = self._db.execute("SELECT data FROM details WHERE listing_id = ? AND data IS NOT NULL",
+                                   (str(listing_id),)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def page(self, listing_id):
+        """The cached detail page's HTML, or None"""
+        with self._lock:
+            row = self._db.execute("SELECT page FROM details WHERE listing_id = ?", (str(listing_id),)).fetchone()
+        return decompress(row[0]).decode("utf-8", errors="replace") if row and row[0] else None
+
+    def put(self, listing_id, status, data=None, html=None):
+        with self._lock:
+            # A failed refetch keeps the last good data and page
+            self._db.execute(
+                "INSERT INTO details (listing_id, fetched_at, status, data, page) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(listing_id) DO UPDATE SET fetched_at = excluded.fetched_at, status = excluded.status, "
+                "data = COALESCE(excluded.data, data), page = COALESCE(excluded.page, page)",
+                (str(listing_id), datetime.utcnow().isoformat(), status,
+                 json.dumps(data, ensure_ascii=False) if data is not None else None,
+                 compress(html.encode("utf-8")) if html else None))
+            self._db.commit()
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+# ---------------- fetching ----------------
+class DetailFetcher:
+    """
+    Bounded queue of detail-page fetches served by a pool of worker threads.
+
+    `submit(listing_id)` skips listings whose cached details are fresh (unless
+    `force`, e.g. for a changed listing). Parsed details are written to `sink`.
+    """
+
+    def __init__(self, cache, sink=None, workers=4, queue_size=1000, per_host_limit=2, rate_limiter=None,
+                 retries=3, backoff=0.5, timeout=15, max_age_days=7, metrics=None):
+        from .image_pipeline import make_session  # requests, only needed once details are fetched
+
+        self.cache = cache
+        self.sink = sink
+        self.workers = workers
+        self.per_host_limit = per_host_limit
+        self.rate_limiter = rate_limiter
+        self.timeout = timeout
+        self.max_age_days = max_age_days
+        self.metrics = metrics
+        self.session = make_session(pool_size=per_host_limit, retries=retries, backoff=backoff)
+        self.session.headers.update(DETAIL_HEADERS)
+        self.session.headers.pop("Referer", None)
+
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._threads = []
+        self._host_slot = threading.BoundedSemaphore(per_host_limit)  # every detail page is on www.airbnb.com
+        self._queued = set()
+        self._lock = threading.Lock()
+        self.fetched = 0
+        self.cached = 0
+        self.failed = 0
+
+    def _start(self):
+        with self._lock:
+            if self._threads:
+                return
+            for i in range(self.workers):
+                t = threading.Thread(target=self._worker, name=f"details-{i + 1}", daemon=True)
+                t.start()
+                self._threads.append(t)
+
+    def submit(self, listing_id, force=False):
+        """
+        Queue a listing's detail page and return a Future of its details (None
+        if it failed or was skipped). Blocks while the queue is full.
+        """
+        future = Future()
+        with self._lock:
+            queued = listing_id in self._queued
+            self._queued.add(listing_id)
+        if queued:
+            future.set_result(None)
+            return future
+        if not force and self.cache.fresh(listing_id, self.max_age_days):
+            with self._lock:
+                self.cached += 1
+            future.set_result(None)
+            return future
+        self._start()
+        self._queue.put((future, listing_id))
+        return future
+
+    def _worker(self):
+        while True:
+            job = self._queue.get()
+            try:
+                if job is _STOP:
+                    return
+                future, listing_id = job
+                try:
+                    details = self.fetch(listing_id)
+                except Exception as e:
+                    print(f"    ⚠ Error fetching details of {listing_id}: {e}")
+                    details = None
+                future.set_result(details)
+            finally:
+                self._queue.task_done()
+
+    def fetch(self, listing_id):
+        """Fetch, parse, cache and write one listing's details; None if the page had none"""
+        import requests
+
+        url = canonical_listing_url(listing_id)
+        if self.rate_limiter:
+            self.rate_limiter.wait()
+        started = time.monotonic()
+        try:
+            with self._host_slot, timed(self.metrics, "detail_fetch"):
+                response = self.session.get(url, timeout=self.timeout)
+        except requests.exceptions.RequestException as e:
+            self._failed(listing_id, "timeout", f"{e.__class__.__name__}")
+            return None
+        if response.status_code == 404:
+            self._failed(listing_id, "gone", "404")  # delisted; not the site pushing back
+            return None
+        if response.status_code in (403, 429) or not response.ok:
+            self._failed(listing_id, "blocked" if response.status_code in (403, 429) else "empty",
+                         str(response.status_code))
+            return None
+
+        with timed(self.metrics, "detail_parse"):
+            details = parse_detail_page(response.text)
+        if not details:
+            self._failed(listing_id, "empty", "no embedded data", html=response.text)
+            return None
+        if self.rate_limiter:
+            self.rate_limiter.report("ok", time.monotonic() - started)
+        details = {"Listing_ID": listing_id, "Listing_URL": url,
+                   "Fetched_At": datetime.utcnow().isoformat(), **details}
+        self.cache.put(listing_id, "ok", details, response.text)
+        if self.sink:
+            self.sink.write(details)
+        with self._lock:
+            self.fetched += 1
+        if self.metrics is not None:
+            self.metrics.count("details_fetched")
+        return details
+
+    def _failed(self, listing_id, outcome, reason, html=None):
+        if self.rate_limiter and outcome != "gone":
+            self.rate_limiter.report(outcome)
+        self.cache.put(listing_id, outcome, html=html)
+        with self._lock:
+            self.failed += 1
+        print(f"    ⚠ No details for {listing_id}: {reason}")
+
+    def join(self):
+        """Wait until every queued listing has been fetched"""
+        self._queue.join()
+
+    def close(self):
+        """Finish the queued fetches and stop the workers"""
+        if self._threads:
+            self.join()
+            for _ in self._threads:
+                self._queue.put(_STOP)
+            for t in self._threads:
+                t.join()
+            self._threads = []
+        self.session.close()
@@ -0,0 +1,151 @@
+# embedded_json.py
+"""
+Read listings straight from the structured JSON Airbnb ships with a search page.
+
+A freshly loaded search page embeds the StaysSearch result in a
+<script type="application/json"> blob (data-deferred-state-*, data-state or
+__NEXT_DATA__); later pages reached by client-side navigation fetch the same
+structure through the StaysSearch XHR. Both are handled here without building
+a DOM: the blob is cut out of the page source with a regex and only that JSON
+is parsed.
+"""
+import base64
+import json
+import re
+
+SCRIPT_RE = re.compile(
+    r'<script[^>]*\bid="(?:data-deferred-state(?:-\d+)?|data-state|__NEXT_DATA__)"[^>]*>(.*?)</script>',
+    re.DOTALL,
+)
+RATING_RE = re.compile(r'(\d(?:\.\d{1,2})?)\s*\(([\d,]+)\)')
+
+
+def find_embedded_blobs(html):
+    """Return the raw JSON strings embedded in a search page"""
+    if not html:
+        return []
+    return [m.group(1) for m in SCRIPT_RE.finditer(html)]
+
+
+def _iter_search_results(node):
+    """Yield every item of any `searchResults` list found in the JSON tree"""
+    stack = [node]
+    while stack:
+        cur = stack.pop()
+        if isinstance(cur, dict):
+            for key, value in cur.items():
+                if key == "searchResults" and isinstance(value, list):
+                    for item in value:
+                        if isinstance(item, dict):
+                            yield item
+                elif isinstance(value, (dict, list)):
+                    stack.append(value)
+        elif isinstance(cur, list):
+            stack.extend(v for v in cur if isinstance(v, (dict, list)))
+
+
+def decode_id(raw):
+    """IDs are either plain digits or base64 of '<Type>:<id>' (DemandStayListing, DemandUser ...)"""
+    if raw is None:
+        return ""
+    raw = str(raw)
+    if raw.isdigit():
+        return raw
+    try:
+        decoded = base64.b64decode(raw + "=" * (-len(raw) % 4)).decode("utf-8", "ignore")
+    except (ValueError, TypeError):
+        return ""
+    m = re.search(r':(\d+)$', decoded)
+    return m.group(1) if m else ""
+
+
+def _price_text(result):
+    """Flatten the structured display price into the same kind of text the card shows"""
+    for holder in (result, result.get("pricingQuote") or {}):
+        price = holder.get("structuredDisplayPrice") or holder.get("structuredStayDisplayPrice")
+        if not isinstance(price, dict):
+            continue
+        line = price.get("primaryLine") or {}
+        label = line.get("accessibilityLabel")
+        if label:
+            return label
+        parts = [line.get("originalPrice"), line.get("discountedPrice") or line.get("price"), line.get("qualifier")]
+        text = " ".join(p for p in parts if p)
+        if text:
+            return text
+    return ""
+
+
+def _first_picture(result, listing):
+    for holder in (result, listing):
+        pictures = holder.get("contextualPictures") or []
+        for pic in pictures:
+            if isinstance(pic, dict) and pic.get("picture"):
+                return pic["picture"]
+        if holder.get("pictureUrl"):
+            return holder["pictureUrl"]
+    return ""
+
+
+def listing_from_result(result):
+    """Map one StaysSearch result onto the same fields `extract_from_card` returns"""
+    listing = result.get("listing") or {}
+    demand = result.get("demandStayListing") or {}
+
+    listing_id = (decode_id(listing.get("id"))
+                  or decode_id(demand.get("id"))
+                  or decode_id(result.get("propertyId")))
+
+    title = (result.get("title") or listing.get("title") or listing.get("name")
+             or ((demand.get("description") or {}).get("name") or {}).get("localizedStringWithTranslationPreference")
+             or "")
+
+    rating, reviews = "", ""
+    rating_text = result.get("avgRatingLocalized") or listing.get("avgRatingLocalized") or ""
+    m = RATING_RE.search(rating_text)
+    if m:
+        rating = m.group(1)
+        reviews = m.group(2).replace(",", "")
+    else:
+        if listing.get("avgRating") is not None:
+            rating = str(listing["avgRating"])
+        if listing.get("reviewsCount") is not None:
+            reviews = str(listing["reviewsCount"])
+
+    return {
+        "Title": title.strip(),
+        "Price": _price_text(result),
+        "Rating": rating,
+        "Reviews": reviews,
+        "Image_URL": _first_picture(result, listing),
+        "Local_Image_Path": "",
+        "Listing_URL": f"https://www.airbnb.com/rooms/{listing_id}" if listing_id else "",
+        "Listing_ID": listing_id,
+    }
+
+
+def extract_listings_from_json(blobs):
+    """
+    Parse JSON blobs (embedded script contents or XHR bodies) into listing rows.
+
+    Returns (rows, bytes_parsed). Rows are de-duplicated by Listing_ID; an empty
+    list means the caller should fall back to the card parser.
+    """
+    rows = []
+    seen = set()
+    bytes_parsed = 0
+    for blob in blobs:
+        if not blob:
+            continue
+        bytes_parsed += len(blob)
+        try:
+            data = json.loads(blob)
+        except ValueError:
+            continue
+        for result in _iter_search_results(data):
+            row = listing_from_result(result)
+            if not row["Listing_ID"] or row["Listing_ID"] in seen:
+                continue
+            seen.add(row["Listing_ID"])
+            rows.append(row)
+    return rows, bytes_parsed
@@ -0,0 +1,534 @@
+# engines.py
+"""
+Browser engines behind one small page interface.
+
+The scraper only talks to a `BrowserPage` (get, page_source, execute_script,
+wait_for_css, find_clickable, drain_json_responses, take_transfer_stats, cookies,
+add_cookies, quit). Two engines
+provide pages:
+
+  * SeleniumEngine   - one Chrome process per page (the original behaviour)
+  * PlaywrightEngine - one Chromium process; every page is a lightweight
+                       browser context driven from a single asyncio loop
+
+Both load pages lightly: a small viewport, and requests matching a `BlockList`
+(images, fonts, analytics, map tiles ... see blocking.py) are never sent.
+
+Backend packages are imported lazily, so only the chosen one has to be installed.
+"""
+import asyncio
+import json
+import os
+import shutil
+import threading
+
+DEFAULT_USER_AGENT = ("Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+                      "AppleWebKit/537.36 (KHTML, like Gecko) Chrome/115.0 Safari/537.36")
+# XHR responses worth keeping: they carry the same listing JSON the page embeds
+DEFAULT_CAPTURE_PATTERNS = ("/api/v3/StaysSearch",)
+DEFAULT_VIEWPORT = (1280, 720)
+# Where the chromedriver last installed by webdriver_manager is remembered
+DRIVER_PATH_CACHE = os.path.join(os.path.expanduser("~"), ".cache", "airbnb_scraper", "chromedriver.json")
+
+
+def new_transfer_stats():
+    return {"bytes": 0, "requests": 0, "blocked": 0}
+
+
+class BrowserElement:
+    """A clickable element returned by `BrowserPage.find_clickable`"""
+
+    def is_displayed(self):
+        raise NotImplementedError
+
+    def get_attribute(self, name):
+        raise NotImplementedError
+
+    def scroll_into_view(self):
+        raise NotImplementedError
+
+    def click(self):
+        raise NotImplementedError
+
+    def js_click(self):
+        raise NotImplementedError
+
+
+class BrowserPage:
+    """One browser tab the scraper can drive"""
+
+    def get(self, url):
+        raise NotImplementedError
+
+    @property
+    def page_source(self):
+        raise NotImplementedError
+
+    @property
+    def current_url(self):
+        raise NotImplementedError
+
+    def execute_script(self, script):
+        """Run a JS function body (use `return` to get a value back)"""
+        raise NotImplementedError
+
+    def wait_for_css(self, selectors, timeout):
+        """Wait until any of the CSS selectors is present; True if one appeared"""
+        raise NotImplementedError
+
+    def find_clickable(self, xpath, timeout):
+        """Wait for a visible, enabled element matching xpath; None on timeout"""
+        raise NotImplementedError
+
+    def drain_json_responses(self):
+        """Return (and forget) bodies of captured XHR responses since the last call"""
+        return []
+
+    def take_transfer_stats(self):
+        """Network use since the last call: {"bytes": ..., "requests": ..., "blocked": ...}"""
+        return new_transfer_stats()
+
+    def cookies(self):
+        """All cookies of the page's browser session, as CDP/Playwright cookie dicts"""
+        return []
+
+    def add_cookies(self, cookies):
+        """Load cookies (as returned by `cookies()`) without navigating anywhere"""
+
+    def quit(self):
+        raise NotImplementedError
+
+
+class BrowserEngine:
+    """Factory for pages; owns whatever process(es) the pages live in"""
+
+    def new_page(self):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+# ---------------- selenium ----------------
+def cached_driver_path(cache=DRIVER_PATH_CACHE):
+    """The remembered chromedriver path, if it still exists"""
+    try:
+        with open(cache, encoding="utf-8") as fh:
+            path = json.load(fh).get("path")
+    except (OSError, ValueError, AttributeError):
+        return None
+    return path if path and os.path.isfile(path) else None
+
+
+def remember_driver_path(path, cache=DRIVER_PATH_CACHE):
+    try:
+        os.makedirs(os.path.dirname(cache), exist_ok=True)
+        with open(cache, "w", encoding="utf-8") as fh:
+            json.dump({"path": path}, fh)
+    except OSError:
+        pass
+
+
+class SeleniumElement(BrowserElement):
+    def __init__(self, driver, element):
+        self._driver = driver
+        self._element = element
+
+    def is_displayed(self):
+        return self._element.is_displayed()
+
+    def get_attribute(self, name):
+        return self._element.get_attribute(name)
+
+    def scroll_into_view(self):
+        self._driver.execute_script(
+            "arguments[0].scrollIntoView({behavior: 'smooth', block: 'center'});", self._element)
+
+    def click(self):
+        self._element.click()
+
+    def js_click(self):
+        self._driver.execute_script("arguments[0].click();", self._element)
+
+
+class SeleniumPage(BrowserPage):
+    def __init__(self, driver, capture_patterns=()):
+        self.driver = driver
+        self.capture_patterns = tuple(capture_patterns)
+        self._captured_ids = []
+        self._transfer = new_transfer_stats()
+
+    def get(self, url):
+        self.driver.get(url)
+
+    @property
+    def page_source(self):
+        return self.driver.page_source
+
+    @property
+    def current_url(self):
+        return self.driver.current_url
+
+    def execute_script(self, script):
+        return self.driver.execute_script(script)
+
+    def wait_for_css(self, selectors, timeout):
+        from selenium.common.exceptions import TimeoutException
+        from selenium.webdriver.common.by import By
+        from selenium.webdriver.support import expected_conditions as EC
+        from selenium.webdriver.support.ui import WebDriverWait
+
+        try:
+            WebDriverWait(self.driver, timeout).until(
+                EC.any_of(*[EC.presence_of_element_located((By.CSS_SELECTOR, sel)) for sel in selectors])
+            )
+            return True
+        except TimeoutException:
+            return False
+
+    def find_clickable(self, xpath, timeout):
+        from selenium.common.exceptions import TimeoutException
+        from selenium.webdriver.common.by import By
+        from selenium.webdriver.support import expected_conditions as EC
+        from selenium.webdriver.support.ui import WebDriverWait
+
+        try:
+            element = WebDriverWait(self.driver, timeout).until(
+                EC.element_to_be_clickable((By.XPATH, xpath))
+            )
+        except TimeoutException:
+            return None
+        return SeleniumElement(self.driver, element) if element else None
+
+    def _read_performance_log(self):
+        """
+        Consume Chrome's performance log: count transferred bytes and blocked
+        requests, and remember the request IDs of responses worth capturing.
+        """
+        try:
+            entries = self.driver.get_log("performance")
+        except Exception:
+            return
+        for entry in entries:
+            try:
+                message = json.loads(entry["message"])["message"]
+            except (KeyError, ValueError):
+                continue
+            method = message.get("method")
+            params = message.get("params", {})
+            if method == "Network.loadingFinished":
+                self._transfer["bytes"] += int(params.get("encodedDataLength") or 0)
+                self._transfer["requests"] += 1
+            elif method == "Network.loadingFailed" and params.get("blockedReason"):
+                self._transfer["blocked"] += 1
+            elif method == "Network.responseReceived":
+                url = params.get("response", {}).get("url", "")
+                if any(p in url for p in self.capture_patterns):
+                    self._captured_ids.append(params["requestId"])
+
+    def drain_json_responses(self):
+        # Responses are found through Chrome's performance log, bodies fetched over CDP
+        self._read_performance_log()
+        request_ids, self._captured_ids = self._captured_ids, []
+        bodies = []
+        for request_id in request_ids:
+            try:
+                body = self.driver.execute_cdp_cmd("Network.getResponseBody", {"requestId": request_id})
+                bodies.append(body.get("body", ""))
+            except Exception:
+                continue
+        return bodies
+
+    def take_transfer_stats(self):
+        self._read_performance_log()
+        stats, self._transfer = self._transfer, new_transfer_stats()
+        return stats
+
+    def cookies(self):
+        # Over CDP: driver.get_cookies() only sees the current domain
+        return self.driver.execute_cdp_cmd("Network.getAllCookies", {}).get("cookies", [])
+
+    def add_cookies(self, cookies):
+        self.driver.execute_cdp_cmd("Network.setCookies", {"cookies": cookies})
+
+    def quit(self):
+        self.driver.quit()
+
+
+class SeleniumEngine(BrowserEngine):
+    """Every page is its own Chrome process"""
+
+    def __init__(self, headless=True, user_agent=DEFAULT_USER_AGENT, page_load_timeout=60,
+                 capture_patterns=DEFAULT_CAPTURE_PATTERNS, driver_path=None,
+                 viewport=DEFAULT_VIEWPORT, block=None):
+        self.headless = headless
+        self.user_agent = user_agent
+        self.page_load_timeout = page_load_timeout
+        self.capture_patterns = capture_patterns
+        self.viewport = viewport
+        self.block = block
+        self._driver_path = driver_path or os.environ.get("CHROMEDRIVER") or None
+        self._lock = threading.Lock()
+
+    def _resolve_driver_path(self):
+        """
+        Path of the chromedriver binary, found without going to the network if possible:
+        the `driver_path` / $CHROMEDRIVER setting, a chromedriver on PATH, or the one
+        webdriver_manager installed last time. Only when none exists is
+        ChromeDriverManager asked (it checks the latest version online).
+        """
+        # Resolve chromedriver once, so parallel workers don't race on the download
+        with self._lock:
+            if self._driver_path is None:
+                self._driver_path = shutil.which("chromedriver") or cached_driver_path()
+            if self._driver_path is None:
+                from webdriver_manager.chrome import ChromeDriverManager
+                self._driver_path = ChromeDriverManager().install()
+                remember_driver_path(self._driver_path)
+            return self._driver_path
+
+    def new_page(self):
+        from selenium import webdriver
+        from selenium.webdriver.chrome.options import Options
+        from selenium.webdriver.chrome.service import Service
+
+        options = Options()
+        if self.headless:
+            options.add_argument("--headless=new")
+        options.add_argument("--disable-blink-features=AutomationControlled")
+        options.add_argument(f"user-agent={self.user_agent}")
+        options.add_argument("--window-size={},{}".format(*self.viewport))
+        options.add_argument("--disable-web-security")
+        if self.block and self.block.blocks_images:
+            # Stops image decoding too, not just the requests setBlockedURLs catches
+            options.add_experimental_option("prefs", {"profile.managed_default_content_settings.images": 2})
+        # The performance log carries captured XHRs and the transfer sizes of every request
+        options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+
+        driver = webdriver.Chrome(service=Service(self._resolve_driver_path()), options=options)
+        driver.set_page_load_timeout(self.page_load_timeout)
+        if self.block and self.block.patterns:
+            driver.execute_cdp_cmd("Network.enable", {})
+            driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": self.block.patterns})
+        return SeleniumPage(driver, self.capture_patterns)
+
+
+# ---------------- playwright ----------------
+class PlaywrightElement(BrowserElement):
+    def __init__(self, page, handle):
+        self._page = page
+        self._handle = handle
+
+    def is_displayed(self):
+        return self._page._run(self._handle.is_visible())
+
+    def get_attribute(self, name):
+        return self._page._run(self._handle.get_attribute(name))
+
+    def scroll_into_view(self):
+        self._page._run(self._handle.scroll_into_view_if_needed())
+
+    def click(self):
+        self._page._run(self._handle.click())
+
+    def js_click(self):
+        self._page._run(self._handle.evaluate("el => el.click()"))
+
+
+class PlaywrightPage(BrowserPage):
+    """
+    Sync facade over an async Playwright page.
+
+    Calls are forwarded to the engine's event loop, so pages used from several
+    worker threads load concurrently inside one browser process.
+    """
+
+    def __init__(self, engine, context, page, capture_patterns=()):
+        self._engine = engine
+        self._context = context
+        self._page = page
+        self._captured = []
+        self._transfer = new_transfer_stats()
+        self.capture_patterns = tuple(capture_patterns)
+        if self.capture_patterns:
+            page.on("response", self._on_response)
+
+    def _on_loading_finished(self, params):
+        self._transfer["bytes"] += int(params.get("encodedDataLength") or 0)
+        self._transfer["requests"] += 1
+
+    def _on_blocked(self):
+        self._transfer["blocked"] += 1
+
+    async def _on_response(self, response):
+        if not any(p in response.url for p in self.capture_patterns):
+            return
+        try:
+            self._captured.append(await response.text())
+        except Exception:
+            pass
+
+    def _run(self, coro):
+        return self._engine.run(coro)
+
+    def get(self, url):
+        self._run(self._page.goto(url, wait_until="domcontentloaded"))
+
+    @property
+    def page_source(self):
+        return self._run(self._page.content())
+
+    @property
+    def current_url(self):
+        return self._page.url
+
+    def execute_script(self, script):
+        return self._run(self._page.evaluate(f"() => {{ {script} }}"))
+
+    def wait_for_css(self, selectors, timeout):
+        from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+
+        try:
+            self._run(self._page.wait_for_selector(", ".join(selectors), state="attached",
+                                                   timeout=timeout * 1000))
+            return True
+        except PlaywrightTimeoutError:
+            return False
+
+    def find_clickable(self, xpath, timeout):
+        from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+
+        try:
+            handle = self._run(self._page.wait_for_selector(f"xpath={xpath}", state="visible",
+                                                            timeout=timeout * 1000))
+        except PlaywrightTimeoutError:
+            return None
+        if handle is None or not self._run(handle.is_enabled()):
+            return None
+        return PlaywrightElement(self, handle)
+
+    def drain_json_responses(self):
+        bodies, self._captured = self._captured, []
+        return bodies
+
+    def take_transfer_stats(self):
+        stats, self._transfer = self._transfer, new_transfer_stats()
+        return stats
+
+    def cookies(self):
+        return self._run(self._context.cookies())
+
+    def add_cookies(self, cookies):
+        self._run(self._context.add_cookies(cookies))
+
+    def quit(self):
+        try:
+            self._run(self._context.close())
+        except Exception:
+            pass
+
+
+class PlaywrightEngine(BrowserEngine):
+    """
+    One Chromium process, one asyncio loop on a background thread.
+
+    Each `new_page()` opens a fresh browser context (own cookies/storage), which
+    is far cheaper than launching another browser.
+    """
+
+    def __init__(self, headless=True, user_agent=DEFAULT_USER_AGENT, page_load_timeout=60,
+                 capture_patterns=DEFAULT_CAPTURE_PATTERNS, viewport=DEFAULT_VIEWPORT, block=None):
+        self.headless = headless
+        self.user_agent = user_agent
+        self.page_load_timeout = page_load_timeout
+        self.capture_patterns = capture_patterns
+        self.viewport = viewport
+        self.block = block
+        self._loop = None
+        self._thread = None
+        self._playwright = None
+        self._browser = None
+        self._lock = threading.Lock()
+
+    def run(self, coro):
+        """Run a coroutine on the engine loop and wait for its result"""
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+
+    def _start(self):
+        with self._lock:
+            if self._browser is not None:
+                return
+            from playwright.async_api import async_playwright
+
+            self._loop = asyncio.new_event_loop()
+            self._thread = threading.Thread(target=self._loop.run_forever,
+                                            name="playwright-loop", daemon=True)
+            self._thread.start()
+            try:
+                self._playwright = self.run(async_playwright().start())
+                self._browser = self.run(self._playwright.chromium.launch(
+                    headless=self.headless,
+                    args=["--disable-blink-features=AutomationControlled"],
+                ))
+            except Exception:
+                if self._playwright is not None:
+                    self.run(self._playwright.stop())
+                    self._playwright = None
+                self._loop.call_soon_threadsafe(self._loop.stop)
+                self._thread.join(timeout=5)
+                raise
+
+    def new_page(self):
+        self._start()
+        width, height = self.viewport
+        context = self.run(self._browser.new_context(user_agent=self.user_agent,
+                                                     viewport={"width": width, "height": height}))
+        page = self.run(context.new_page())
+        page.set_default_navigation_timeout(self.page_load_timeout * 1000)
+        wrapper = PlaywrightPage(self, context, page, self.capture_patterns)
+        self.run(self._watch_network(wrapper, context, page))
+        return wrapper
+
+    async def _watch_network(self, wrapper, context, page):
+        """Block unwanted requests on the context and count transferred bytes over CDP"""
+        block = self.block
+        if block:
+            async def route(route):
+                request = route.request
+                if block.blocks(request.url, request.resource_type):
+                    wrapper._on_blocked()
+                    await route.abort()
+                else:
+                    await route.continue_()
+
+            await context.route("**/*", route)
+        cdp = await context.new_cdp_session(page)
+        cdp.on("Network.loadingFinished", wrapper._on_loading_finished)
+        await cdp.send("Network.enable")
+
+    def close(self):
+        with self._lock:
+            if self._browser is None:
+                return
+            try:
+                self.run(self._browser.close())
+                self.run(self._playwright.stop())
+            finally:
+                self._loop.call_soon_threadsafe(self._loop.stop)
+                self._thread.join(timeout=5)
+                self._browser = None
+                self._playwright = None
+
+
+ENGINES = {
+    "selenium": SeleniumEngine,
+    "playwright": PlaywrightEngine,
+}
+
+
+def create_engine(name, **kwargs):
+    """Build the engine registered under `name`"""
+    try:
+        return ENGINES[name](**kwargs)
+    except KeyError:
+        raise ValueError(f"Unknown browser engine {name!r}, expected one of {sorted(ENGINES)}")
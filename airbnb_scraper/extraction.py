@@ -0,0 +1,193 @@
+# extraction.py
+"""
+Listing extraction off the browser thread.
+
+Reading listings out of a search page (its embedded JSON, or find_cards /
+extract_from_card over the rendered DOM) is CPU work, and it used to run on the
+thread that drives the browser. Now the crawler only takes a `PageSnapshot` —
+the page's HTML and the StaysSearch XHR bodies captured with it, compressed —
+and hands it to an `ExtractionPool`, a ProcessPoolExecutor whose workers parse
+on every core and outside the crawler's GIL (browser sessions, image download
+threads and the metrics server keep running meanwhile).
+
+A snapshot holds everything extraction needs, so the same `extract_snapshot()`
+re-extracts a page saved long ago (archive.py) without opening the site.
+"""
+import gzip
+import json
+import signal
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from datetime import datetime
+
+from .embedded_json import extract_listings_from_json, find_embedded_blobs
+from .metrics import Metrics
+from .parsers import create_parser
+
+CODECS = ("gzip", "zstd")
+
+
+# ---------------- compression ----------------
+def _zstd():
+    try:
+        import zstandard
+    except ImportError:
+        raise RuntimeError("zstd compression needs zstandard: pip install zstandard")
+    return zstandard
+
+
+def compress(data, codec="gzip"):
+    """Compress bytes; gzip level 1 / zstd level 3 cost a few ms for a 1 MB search page"""
+    if codec == "gzip":
+        return gzip.compress(data, compresslevel=1, mtime=0)
+    if codec == "zstd":
+        return _zstd().ZstdCompressor(level=3).compress(data)
+    raise ValueError(f"Unknown codec {codec!r}, expected one of: {', '.join(CODECS)}")
+
+
+def decompress(data, codec="gzip"):
+    if codec == "gzip":
+        return gzip.decompress(data)
+    if codec == "zstd":
+        return _zstd().ZstdDecompressor().decompress(data)
+    raise ValueError(f"Unknown codec {codec!r}, expected one of: {', '.join(CODECS)}")
+
+
+# ---------------- snapshots ----------------
+class PageSnapshot:
+    """
+    One fetched search page, as extraction needs it.
+
+    `html` and `blobs` are compressed with `codec`; `html` is None when the
+    page's markup wasn't needed (JSON from XHR responses after a client-side
+    navigation), `fresh_load` says whether its embedded JSON is current.
+    """
+    __slots__ = ("city", "page", "url", "fetched_at", "fresh_load", "codec", "html", "blobs")
+
+    def __init__(self, city, page, url, html=None, blobs=None, fresh_load=True, codec="gzip", fetched_at=None):
+        self.city = city
+        self.page = page
+        self.url = url
+        self.fetched_at = fetched_at or datetime.utcnow().isoformat()
+        self.fresh_load = fresh_load
+        self.codec = codec
+        self.html = html
+        self.blobs = blobs
+
+    @classmethod
+    def take(cls, city, page, url, html=None, blobs=(), fresh_load=True, codec="gzip"):
+        """Snapshot of raw page text and XHR bodies, compressing both"""
+        return cls(city, page, url,
+                   html=compress(html.encode("utf-8"), codec) if html is not None else None,
+                   blobs=compress(json.dumps(list(blobs)).encode("utf-8"), codec) if blobs else None,
+                   fresh_load=fresh_load, codec=codec)
+
+    def text(self):
+        """The page's HTML ("" if it wasn't kept)"""
+        return decompress(self.html, self.codec).decode("utf-8", errors="replace") if self.html else ""
+
+    def json_blobs(self):
+        """Captured XHR bodies"""
+        return json.loads(decompress(self.blobs, self.codec)) if self.blobs else []
+
+    @property
+    def nbytes(self):
+        return len(self.html or b"") + len(self.blobs or b"")
+
+
+# ---------------- extraction ----------------
+_parsers = {}  # one parser per backend, per process
+
+
+def _parser(name):
+    if name not in _parsers:
+        _parsers[name] = create_parser(name)
+    return _parsers[name]
+
+
+def extract_snapshot(snapshot, mode="auto", parser="auto"):
+    """
+    Listing rows of a snapshot: embedded JSON and XHR bodies first, else its cards.
+
+    `mode` is an EXTRACTION_MODE ("auto", "json" or "dom"). Returns
+    (rows, source, seconds) with source "json" or "cards" and seconds the time
+    per stage ({stage: seconds}), for the caller's metrics: a worker process
+    can't record into them itself.
+    """
+    metrics = Metrics()
+    rows, source = [], "json"
+    if mode != "dom":
+        with metrics.timer("find_json"):
+            blobs = snapshot.json_blobs()
+            if snapshot.fresh_load:
+                blobs = find_embedded_blobs(snapshot.text()) + blobs
+        with metrics.timer("extract_json"):
+            rows, _ = extract_listings_from_json(blobs)
+    if not rows and mode != "json" and snapshot.html:
+        rows, source = _parser(parser).parse_cards(snapshot.text(), metrics), "cards"
+    return rows, source, {stage: s["total"] for stage, s in metrics.stages().items()}
+
+
+def _ignore_sigint():
+    # Ctrl-C is the crawler's to handle: it stops the run and then shuts the pool down
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+class ExtractionPool:
+    """
+    Extracts snapshots in `workers` processes (0: in the calling thread).
+
+    Every crawl thread submits its page and waits for the rows, so at most one
+    snapshot per browser session is queued at a time.
+    """
+
+    def __init__(self, workers=2, mode="auto", parser="auto", metrics=None):
+        self.workers = workers
+        self.mode = mode
+        self.parser = parser
+        self.metrics = metrics
+        self._executor = ProcessPoolExecutor(workers, initializer=_ignore_sigint) if workers > 0 else None
+
+    def submit(self, snapshot, mode=None):
+        """Future of extract_snapshot(snapshot)'s (rows, source, seconds)"""
+        mode = mode or self.mode
+        if self._executor is not None:
+            return self._executor.submit(extract_snapshot, snapshot, mode, self.parser)
+        future = Future()
+        try:
+            future.set_result(extract_snapshot(snapshot, mode, self.parser))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def _result(self, future):
+        started = time.perf_counter()
+        rows, source, seconds = future.result()
+        if self.metrics is not None:
+            self.metrics.record("extract_wait", time.perf_counter() - started)
+            for stage, total in seconds.items():
+                self.metrics.record(stage, total)
+        return rows, source
+
+    def extract(self, snapshot, mode=None):
+        """(rows, source) of a snapshot, with its stage times recorded into the pool's metrics"""
+        return self._result(self.submit(snapshot, mode))
+
+    def map(self, snapshots, mode=None):
+        """(snapshot, rows, source) of every snapshot in order, with a few per worker in flight"""
+        window = 4 * max(1, self.workers)
+        pending = deque()
+        for snapshot in snapshots:
+            pending.append((snapshot, self.submit(snapshot, mode)))
+            if len(pending) >= window:
+                snapshot, future = pending.popleft()
+                yield (snapshot, *self._result(future))
+        while pending:
+            snapshot, future = pending.popleft()
+            yield (snapshot, *self._result(future))
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
@@ -0,0 +1,227 @@
+# image_pipeline.py
+"""
+Background image downloads, decoupled from card extraction.
+
+The scraper pushes (row, city, page) jobs onto a bounded queue and carries on
+with the next card/page. A small pool of worker threads drains the queue over
+one shared `requests.Session` (keep-alive, sized connection pool, retries with
+backoff) and writes `Local_Image_Path` into the row once the file is on disk.
+Files go into an `ImageStore`, so a URL is fetched at most once and identical
+bytes are kept once.
+"""
+import hashlib
+import os
+import queue
+import threading
+from concurrent.futures import Future
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from .image_store import url_key
+from .metrics import timed
+
+IMAGE_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/115.0 Safari/537.36',
+    'Referer': 'https://www.airbnb.com/'
+}
+
+_STOP = object()
+
+
+def make_session(pool_size=16, retries=3, backoff=0.5):
+    """requests.Session with keep-alive, a sized connection pool and retry/backoff"""
+    retry = Retry(total=retries, backoff_factor=backoff,
+                  status_forcelist=(429, 500, 502, 503, 504),
+                  allowed_methods=frozenset(["GET", "HEAD"]))
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.headers.update(IMAGE_HEADERS)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+class ImageDownloader:
+    """Bounded queue of image downloads served by a pool of worker threads"""
+
+    def __init__(self, store, workers=8, queue_size=500, pool_size=16, per_host_limit=6,
+                 retries=3, backoff=0.5, timeout=10, max_size=5 * 1024 * 1024, metrics=None):
+        self.store = store
+        self.metrics = metrics
+        self.tmp_dir = store.root / "tmp"
+        self.workers = workers
+        self.per_host_limit = per_host_limit
+        self.timeout = timeout
+        self.max_size = max_size
+        self.session = make_session(pool_size=pool_size, retries=retries, backoff=backoff)
+
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._threads = []
+        self._host_slots = {}
+        self._in_flight = {}
+        self._lock = threading.Lock()
+        self.downloaded = 0
+        self.bytes_downloaded = 0
+        self.reused = 0
+        self.failed = 0
+
+    def _start(self):
+        with self._lock:
+            if self._threads:
+                return
+            for i in range(self.workers):
+                t = threading.Thread(target=self._worker, name=f"images-{i + 1}", daemon=True)
+                t.start()
+                self._threads.append(t)
+
+    def _host_slot(self, url):
+        host = urlparse(url).netloc
+        with self._lock:
+            if host not in self._host_slots:
+                self._host_slots[host] = threading.BoundedSemaphore(self.per_host_limit)
+            return self._host_slots[host]
+
+    def submit(self, entry, city, page):
+        """
+        Queue the image of `entry` for download and return a Future.
+
+        Blocks while the queue is full, which keeps memory bounded when the
+        scraper outpaces the network. The future resolves to the local path
+        ("" on failure), which is also stored in entry["Local_Image_Path"].
+        """
+        self._start()
+        future = Future()
+        self._queue.put((future, entry, city, page))
+        return future
+
+    def _worker(self):
+        while True:
+            job = self._queue.get()
+            try:
+                if job is _STOP:
+                    return
+                future, entry, city, page = job
+                try:
+                    path = self.download(entry["Image_URL"], entry["Listing_ID"], city, page)
+                except Exception as e:
+                    print(f"    ⚠ Error saving image: {e}")
+                    path = ""
+                entry["Local_Image_Path"] = path
+                if not path:
+                    with self._lock:
+                        self.failed += 1
+                future.set_result(path)
+            finally:
+                self._queue.task_done()
+
+    def download(self, image_url, listing_id, city, page):
+        """Return the local path of an image, fetching it only if its URL is new"""
+        if not image_url:
+            return ""
+        with timed(self.metrics, "image"):
+            path = self._fetch(image_url)
+        if path:
+            self.store.link(listing_id, image_url, city, page)
+        return path
+
+    def _fetch(self, image_url):
+        # A URL seen in this or any earlier run never leaves the machine twice
+        path = self.store.lookup(image_url)
+        if path:
+            with self._lock:
+                self.reused += 1
+            return path
+
+        # Same URL already downloading in another worker: wait for that one
+        key = url_key(image_url)
+        with self._lock:
+            event = self._in_flight.get(key)
+            owner = event is None
+            if owner:
+                event = self._in_flight[key] = threading.Event()
+        if not owner:
+            event.wait()
+            path = self.store.lookup(image_url)
+            if path:
+                with self._lock:
+                    self.reused += 1
+            return path or ""
+
+        try:
+            # Another worker may have stored it between our lookup and taking ownership
+            path = self.store.lookup(image_url)
+            if path:
+                with self._lock:
+                    self.reused += 1
+                return path
+            return self._download_into_store(image_url, key)
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+            event.set()
+
+    def _download_into_store(self, image_url, key):
+        # Get file extension from URL
+        file_ext = os.path.splitext(urlparse(image_url).path)[1].lower() or '.jpg'
+        if file_ext not in ['.jpg', '.jpeg', '.png', '.webp']:
+            file_ext = '.jpg'
+
+        # Write to a temp file so a crash never leaves a truncated image behind
+        self.tmp_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.tmp_dir / f"{key}.part"
+        try:
+            with self._host_slot(image_url), timed(self.metrics, "image_download"):
+                with self.session.get(image_url, timeout=self.timeout, stream=True) as response:
+                    response.raise_for_status()
+
+                    # Check content size
+                    content_length = response.headers.get('content-length')
+                    if content_length and int(content_length) > self.max_size:
+                        print(f"    ⚠ Image too large ({content_length} bytes), skipping")
+                        return ""
+
+                    digest = hashlib.sha256()
+                    downloaded_size = 0
+                    with open(tmp_path, 'wb') as f:
+                        for chunk in response.iter_content(chunk_size=64 * 1024):
+                            if chunk:
+                                downloaded_size += len(chunk)
+                                if downloaded_size > self.max_size:
+                                    break
+                                digest.update(chunk)
+                                f.write(chunk)
+            if downloaded_size > self.max_size:
+                print(f"    ⚠ Image size exceeded limit during download, removing partial file")
+                tmp_path.unlink(missing_ok=True)
+                return ""
+        except requests.exceptions.RequestException as e:
+            tmp_path.unlink(missing_ok=True)
+            print(f"    ⚠ Failed to download image: {e}")
+            return ""
+
+        with timed(self.metrics, "image_store"):
+            path = self.store.add(image_url, tmp_path, digest.hexdigest(), file_ext)
+        with self._lock:
+            self.downloaded += 1
+            self.bytes_downloaded += downloaded_size
+        print(f"    ✓ Image saved: {os.path.basename(path)}")
+        return path
+
+    def join(self):
+        """Wait until every queued image has been processed"""
+        self._queue.join()
+
+    def close(self):
+        """Finish the queued downloads and stop the workers"""
+        if not self._threads:
+            return
+        self.join()
+        for _ in self._threads:
+            self._queue.put(_STOP)
+        for t in self._threads:
+            t.join()
+        self._threads = []
+        self.session.close()
@@ -0,0 +1,196 @@
+# image_processing.py
+"""
+Post-download image stage: thumbnails, perceptual hashes and an image manifest.
+
+Downloads are kept in the ImageStore exactly as the CDN sent them (JPEG, PNG or
+WebP, up to MAX_IMAGE_SIZE each). Identical bytes are already stored once;
+this stage looks at what the images show:
+
+    thumbnail     <THUMBS_FOLDER>/<blob hash>.webp, THUMB_SIZE, center-cropped: what downstream
+                  image processing should read instead of the originals
+    dHash         64-bit difference hash; images within NEAR_DUPLICATE_DISTANCE bits of each other
+                  are the same photo (re-encoded, resized, another crop), the largest is kept
+    placeholder   host avatars (PLACEHOLDER_URL_PATTERNS, e.g. aki_policy=profile_small), icons
+                  under PLACEHOLDER_MIN_SIDE pixels and flat single-color images
+
+Images are decoded by a ProcessPoolExecutor (JPEGs at reduced scale, which is
+all a thumbnail and a hash need). The manifest (JSON lines, one per stored
+image with its status, URLs and listings) doubles as the cache: a later run
+only processes images it doesn't list yet. With `prune`, near-duplicates are
+removed from the store and their URLs point at the kept image; their files
+become links to it, so Local_Image_Path in earlier outputs still opens.
+"""
+import json
+import os
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+FLAT_STDDEV = 4.0  # Grayscale standard deviation below which an image is one flat color
+THUMB_QUALITY = 80
+
+
+def _pil():
+    try:
+        from PIL import Image, ImageOps
+    except ImportError:
+        raise RuntimeError("Image processing needs Pillow: pip install Pillow")
+    return Image, ImageOps
+
+
+# ---------------- per image (worker processes) ----------------
+def dhash(image, size=8):
+    """64-bit difference hash: is each pixel of a 9x8 grayscale copy brighter than its right neighbour"""
+    Image, _ = _pil()
+    gray = np.asarray(image.convert("L").resize((size + 1, size), Image.LANCZOS), dtype=np.int16)
+    return int.from_bytes(np.packbits(gray[:, 1:] > gray[:, :-1]).tobytes(), "big")
+
+
+def analyse_image(path, thumb_path, thumb_size=(360, 240)):
+    """Size, format, dHash and flatness of one image file, writing its thumbnail if missing"""
+    Image, ImageOps = _pil()
+    try:
+        with Image.open(path) as im:
+            width, height, fmt = im.width, im.height, im.format
+            im.draft("RGB", (thumb_size[0] * 2, thumb_size[1] * 2))  # JPEG: decode at 1/2 .. 1/8 scale
+            im = im.convert("RGB")
+        gray = np.asarray(im.convert("L"), dtype=np.float32)
+        result = {"width": width, "height": height, "format": fmt, "dhash": dhash(im),
+                  "flat": bool(gray.std() < FLAT_STDDEV)}
+        if not os.path.exists(thumb_path):
+            os.makedirs(os.path.dirname(thumb_path), exist_ok=True)
+            tmp_path = thumb_path + ".part"
+            ImageOps.fit(im, thumb_size, Image.LANCZOS).save(tmp_path, "WEBP", quality=THUMB_QUALITY)
+            os.replace(tmp_path, thumb_path)
+        return result
+    except (OSError, ValueError, Image.DecompressionBombError) as e:
+        return {"error": f"{e.__class__.__name__}: {e}"}
+
+
+def _analyse(job):
+    return analyse_image(*job)
+
+
+# ---------------- near-duplicates ----------------
+def near_duplicate_groups(hashes, max_distance):
+    """
+    Groups (lists of indexes, 2+ members) of hashes within `max_distance` bits of their first member.
+
+    Hashes are taken in order, best first: each joins the first earlier
+    representative it is close enough to, or becomes one itself. Every member
+    is within `max_distance` of group[0] (no chains of A~B~C with A and C far
+    apart). Candidates come from buckets instead of comparing every pair: cut
+    into max_distance + 1 bands, two hashes that close agree on at least one band.
+    """
+    n_bands = max_distance + 1
+    edges = np.linspace(0, 64, n_bands + 1).astype(int)
+    masks = [((1 << int(hi - lo)) - 1) << int(lo) for lo, hi in zip(edges[:-1], edges[1:])]
+    buckets = [defaultdict(list) for _ in masks]  # per band: band bits -> representatives
+    groups = {}
+    for i, h in enumerate(hashes):
+        rep = None
+        for mask, band in zip(masks, buckets):
+            for j in band.get(h & mask, ()):
+                if bin(hashes[j] ^ h).count("1") <= max_distance and (rep is None or j < rep):
+                    rep = j
+        if rep is None:
+            groups[i] = [i]
+            for mask, band in zip(masks, buckets):
+                band[h & mask].append(i)
+        else:
+            groups[rep].append(i)
+    return [members for members in groups.values() if len(members) > 1]
+
+
+# ---------------- stage ----------------
+def load_manifest(path):
+    """{Blob_Hash: manifest row} of an existing manifest"""
+    rows = {}
+    if path and os.path.exists(path):
+        with open(path, encoding="utf-8") as fh:
+            for line in fh:
+                if line.strip():
+                    row = json.loads(line)
+                    rows[row["Blob_Hash"]] = row
+    return rows
+
+
+def process_images(store, manifest_path, thumbs_folder, workers=4, thumb_size=(360, 240), min_side=120,
+                   max_distance=6, placeholder_patterns=(), prune=False):
+    """
+    Thumbnail, hash and classify every image of `store`, and rewrite the manifest.
+
+    Returns a Counter-like dict: images processed this time, and images per
+    status ("ok", "placeholder", "duplicate", "error") plus "pruned" and
+    "bytes_pruned".
+    """
+    thumb_size = tuple(thumb_size)
+    previous = load_manifest(manifest_path)
+    blobs = store.blobs()
+    todo = [h for h in blobs if h not in previous or not os.path.exists(previous[h].get("Thumbnail") or "")]
+    jobs = [(blobs[h]["path"], os.path.join(thumbs_folder, f"{h}.webp"), thumb_size) for h in todo]
+    if workers > 0 and len(jobs) > 1:
+        with ProcessPoolExecutor(workers) as executor:
+            results = list(executor.map(_analyse, jobs, chunksize=8))
+    else:
+        results = [_analyse(job) for job in jobs]
+    analysed = dict(zip(todo, results))
+
+    rows = {}
+    for blob_hash, blob in blobs.items():
+        row = previous.get(blob_hash) if blob_hash not in analysed else None
+        if row is None:
+            info = analysed[blob_hash]
+            row = {"Blob_Hash": blob_hash, "Path": blob["path"], "Thumbnail": "", "Width": info.get("width"),
+                   "Height": info.get("height"), "Format": info.get("format"), "Bytes": blob["size"],
+                   "DHash": f"{info['dhash']:016x}" if "dhash" in info else "", "Flat": info.get("flat", False),
+                   "Error": info.get("error", "")}
+            if not row["Error"]:
+                row["Thumbnail"] = os.path.join(thumbs_folder, f"{blob_hash}.webp")
+        row.update(URLs=blob["urls"], Listing_IDs=blob["listing_ids"], Duplicate_Of="")
+        rows[blob_hash] = row
+
+    # Status from scratch every time: a new image can make an old one a near-duplicate
+    candidates = []
+    for row in rows.values():
+        if row["Error"]:
+            row["Status"] = "error"
+        elif (any(p in url for url in row["URLs"] for p in placeholder_patterns)
+              or min(row["Width"], row["Height"]) < min_side or row["Flat"]):
+            row["Status"] = "placeholder"
+        else:
+            row["Status"] = "ok"
+            candidates.append(row)
+    candidates.sort(key=lambda r: (-r["Width"] * r["Height"], -r["Bytes"]))  # the largest copy is kept
+    hashes = [int(row["DHash"], 16) for row in candidates]
+    for members in near_duplicate_groups(hashes, max_distance):
+        group = [candidates[i] for i in members]
+        for row in group[1:]:
+            row["Status"] = "duplicate"
+            row["Duplicate_Of"] = group[0]["Blob_Hash"]
+
+    counts = {"processed": len(todo), "ok": 0, "placeholder": 0, "duplicate": 0, "error": 0,
+              "pruned": 0, "bytes_pruned": 0}
+    for row in rows.values():
+        counts[row["Status"]] += 1
+    if prune:
+        for blob_hash, row in list(rows.items()):
+            if row["Status"] == "duplicate":
+                store.merge_blob(blob_hash, row["Duplicate_Of"])
+                kept = rows[row["Duplicate_Of"]]
+                kept["URLs"] += [url for url in row["URLs"] if url not in kept["URLs"]]
+                kept["Listing_IDs"] += [lid for lid in row["Listing_IDs"] if lid not in kept["Listing_IDs"]]
+                if row["Thumbnail"] and os.path.exists(row["Thumbnail"]):
+                    os.remove(row["Thumbnail"])
+                counts["pruned"] += 1
+                counts["bytes_pruned"] += row["Bytes"]
+                del rows[blob_hash]
+
+    os.makedirs(os.path.dirname(manifest_path) or ".", exist_ok=True)
+    tmp_path = manifest_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as fh:
+        for row in rows.values():
+            fh.write(json.dumps(row, ensure_ascii=False) + "\n")
+    os.replace(tmp_path, manifest_path)
+    return counts
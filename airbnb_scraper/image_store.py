@@ -0,0 +1,157 @@
+# image_store.py
+"""
+Content-addressed image store with an on-disk SQLite index.
+
+Images are kept once per distinct content under
+    <root>/blobs/<sha[:2]>/<sha[2:4]>/<sha256 of bytes><ext>
+and the index maps
+    urls           full URL hash -> blob      (a known URL is never fetched again)
+    blobs          content hash  -> file      (identical bytes are stored once)
+    listing_images listing       -> URL       (which listings use which image)
+The index survives between runs, so later crawls reuse everything already on disk.
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS blobs (
+    blob_hash  TEXT PRIMARY KEY,
+    path       TEXT NOT NULL,
+    size       INTEGER NOT NULL,
+    created_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS urls (
+    url_hash   TEXT PRIMARY KEY,
+    url        TEXT NOT NULL,
+    blob_hash  TEXT NOT NULL REFERENCES blobs(blob_hash),
+    fetched_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS listing_images (
+    listing_id TEXT NOT NULL,
+    url_hash   TEXT NOT NULL,
+    city       TEXT,
+    page       INTEGER,
+    seen_at    TEXT NOT NULL,
+    PRIMARY KEY (listing_id, url_hash)
+);
+"""
+
+
+def url_key(url):
+    """Full SHA-256 of the image URL"""
+    return hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+
+class ImageStore:
+    def __init__(self, root, index_path=None):
+        self.root = Path(root)
+        self.blob_dir = self.root / "blobs"
+        self.blob_dir.mkdir(parents=True, exist_ok=True)
+        self.index_path = Path(index_path) if index_path else self.root / "index.sqlite"
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.index_path), check_same_thread=False)
+        self._db.executescript(SCHEMA)
+        self._db.commit()
+
+    def lookup(self, url):
+        """Local path of an already stored URL, or None"""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT b.path FROM urls u JOIN blobs b ON b.blob_hash = u.blob_hash WHERE u.url_hash = ?",
+                (url_key(url),)).fetchone()
+        if row and os.path.exists(row[0]):
+            return row[0]
+        return None
+
+    def blob_path(self, blob_hash, ext):
+        return self.blob_dir / blob_hash[:2] / blob_hash[2:4] / f"{blob_hash}{ext}"
+
+    def add(self, url, tmp_path, blob_hash, ext):
+        """
+        Move a finished download into the store and index it.
+
+        If identical bytes are already stored, the temp file is discarded and the
+        existing blob is reused. Returns the blob path.
+        """
+        now = datetime.utcnow().isoformat()
+        with self._lock:
+            row = self._db.execute("SELECT path FROM blobs WHERE blob_hash = ?", (blob_hash,)).fetchone()
+            if row and os.path.exists(row[0]):
+                os.remove(tmp_path)
+                path = row[0]
+            else:
+                target = self.blob_path(blob_hash, ext)
+                target.parent.mkdir(parents=True, exist_ok=True)
+                os.replace(tmp_path, target)
+                path = str(target)
+                self._db.execute("INSERT OR REPLACE INTO blobs VALUES (?, ?, ?, ?)",
+                                 (blob_hash, path, os.path.getsize(path), now))
+            self._db.execute("INSERT OR REPLACE INTO urls VALUES (?, ?, ?, ?)",
+                             (url_key(url), url, blob_hash, now))
+            self._db.commit()
+        return path
+
+    def link(self, listing_id, url, city=None, page=None):
+        """Record that `listing_id` shows the image at `url`"""
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO listing_images VALUES (?, ?, ?, ?, ?)",
+                             (str(listing_id), url_key(url), city, page, datetime.utcnow().isoformat()))
+            self._db.commit()
+
+    def blobs(self):
+        """{blob_hash: {"path", "size", "urls", "listing_ids"}} of every stored image"""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT b.blob_hash, b.path, b.size, u.url, l.listing_id FROM blobs b "
+                "LEFT JOIN urls u ON u.blob_hash = b.blob_hash "
+                "LEFT JOIN listing_images l ON l.url_hash = u.url_hash ORDER BY b.created_at").fetchall()
+        blobs = {}
+        for blob_hash, path, size, url, listing_id in rows:
+            blob = blobs.setdefault(blob_hash, {"path": path, "size": size, "urls": [], "listing_ids": []})
+            if url and url not in blob["urls"]:
+                blob["urls"].append(url)
+            if listing_id and listing_id not in blob["listing_ids"]:
+                blob["listing_ids"].append(listing_id)
+        return blobs
+
+    def merge_blob(self, blob_hash, into):
+        """
+        Point the URLs of `blob_hash` at blob `into` (e.g. a near-duplicate) and
+        free its file's space.
+
+        The old path stays valid, as a hard link (a symlink where the filesystem
+        has none) to the kept file: outputs written before keep their
+        Local_Image_Path, only now showing the kept image.
+        """
+        with self._lock:
+            row = self._db.execute("SELECT path FROM blobs WHERE blob_hash = ?", (blob_hash,)).fetchone()
+            kept = self._db.execute("SELECT path FROM blobs WHERE blob_hash = ?", (into,)).fetchone()
+            self._db.execute("UPDATE urls SET blob_hash = ? WHERE blob_hash = ?", (into, blob_hash))
+            self._db.execute("DELETE FROM blobs WHERE blob_hash = ?", (blob_hash,))
+            self._db.commit()
+        if not row or not os.path.lexists(row[0]):
+            return
+        if not kept or not os.path.exists(kept[0]):
+            os.remove(row[0])
+            return
+        tmp_path = row[0] + ".link"
+        try:
+            os.link(kept[0], tmp_path)
+        except OSError:
+            os.symlink(os.path.relpath(kept[0], os.path.dirname(row[0])), tmp_path)
+        os.replace(tmp_path, row[0])
+
+    def stats(self):
+        with self._lock:
+            urls = self._db.execute("SELECT COUNT(*) FROM urls").fetchone()[0]
+            blobs, size = self._db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM blobs").fetchone()
+            links = self._db.execute("SELECT COUNT(*) FROM listing_images").fetchone()[0]
+        return {"urls": urls, "blobs": blobs, "bytes": size, "listing_links": links}
+
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,149 @@
+# listing_index.py
+"""
+Run-wide listing dedup index.
+
+Neighbouring city searches overlap (Islamabad / Rawalpindi list many of the
+same places), so deduplicating per city writes those listings, and downloads
+their images, twice. `ListingIndex` is shared by all cities and workers of a
+run: `claim(listing_id, city, page)` is True only the first time an ID shows
+up anywhere, and every sighting (ID, city, page) is recorded either way.
+
+Memory stays at a few bytes per listing: claimed IDs live in a sorted uint64
+NumPy array (8 bytes each; new IDs collect in a small set that is merged in
+batches), sightings in three packed arrays (8 + 2 + 2 bytes each) with cities
+stored once as codes. A million listings seen twice take about 32 MB instead of
+the ~100 MB of a Python set of ints plus a list of tuples.
+
+With a path, the index is saved as a compressed .npz when the run closes and
+loaded again by a resumed run.
+"""
+import os
+import threading
+from array import array
+
+import numpy as np
+
+# New IDs collect in a set until it holds MERGE_EVERY IDs or 1/MERGE_FRACTION of the array, so a
+# merge (one pass over the array) costs a constant amount per ID however big the index gets
+MERGE_EVERY = 4096
+MERGE_FRACTION = 32
+
+
+class ListingIndex:
+    def __init__(self, path=None, load=False):
+        self.path = path
+        self._ids = np.empty(0, dtype=np.uint64)
+        self._recent = set()
+        self._cities = []
+        self._city_codes = {}
+        self._seen_id = array("Q")
+        self._seen_city = array("H")
+        self._seen_page = array("H")
+        self.claimed = 0  # IDs claimed by this process
+        self.repeats = 0  # sightings of IDs that were already claimed
+        self._lock = threading.Lock()
+        if load and path and os.path.exists(path):
+            self._load()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._ids) + len(self._recent)
+
+    def __contains__(self, listing_id):
+        with self._lock:
+            return self._has(listing_id)
+
+    def _has(self, listing_id):
+        if listing_id in self._recent:
+            return True
+        i = np.searchsorted(self._ids, np.uint64(listing_id))
+        return i < len(self._ids) and self._ids[i] == listing_id
+
+    def _merge(self):
+        if self._recent:
+            recent = np.sort(np.fromiter(self._recent, dtype=np.uint64, count=len(self._recent)))
+            self._ids = np.insert(self._ids, np.searchsorted(self._ids, recent), recent)
+            self._recent = set()
+
+    def _add(self, listing_id):
+        self._recent.add(listing_id)
+        if len(self._recent) >= max(MERGE_EVERY, len(self._ids) // MERGE_FRACTION):
+            self._merge()
+
+    def _city_code(self, city):
+        code = self._city_codes.get(city)
+        if code is None:
+            code = self._city_codes[city] = len(self._cities)
+            self._cities.append(city)
+        return code
+
+    def claim(self, listing_id, city, page):
+        """Record a sighting of `listing_id`; True if no city or page of this run had it before"""
+        with self._lock:
+            self._seen_id.append(listing_id)
+            self._seen_city.append(self._city_code(city))
+            self._seen_page.append(page or 0)
+            if self._has(listing_id):
+                self.repeats += 1
+                return False
+            self._add(listing_id)
+            self.claimed += 1
+            return True
+
+    def update(self, listing_ids):
+        """Mark IDs as already written (e.g. from the checkpoint journal) without a sighting"""
+        with self._lock:
+            for listing_id in listing_ids:
+                if isinstance(listing_id, int):
+                    self._add(listing_id)
+            self._merge()
+
+    def sightings(self, listing_id):
+        """[(city, page), ...] where `listing_id` was seen, in order"""
+        with self._lock:
+            ids = np.frombuffer(self._seen_id, dtype=np.uint64) if self._seen_id else np.empty(0, np.uint64)
+            hits = np.flatnonzero(ids == np.uint64(listing_id))
+            return [(self._cities[self._seen_city[i]], self._seen_page[i]) for i in hits]
+
+    def cross_city(self):
+        """Number of listings seen in more than one city"""
+        with self._lock:
+            if not self._seen_id:
+                return 0
+            ids = np.frombuffer(self._seen_id, dtype=np.uint64)
+            cities = np.frombuffer(self._seen_city, dtype=np.uint16)
+            order = np.lexsort((cities, ids))
+            ids, cities = ids[order], cities[order]
+            # Within one ID's run of sightings (sorted by city), a city change means a second city
+            other_city = (ids[1:] == ids[:-1]) & (cities[1:] != cities[:-1])
+            return len(np.unique(ids[1:][other_city]))
+
+    @property
+    def nbytes(self):
+        """Approximate memory held by the index"""
+        return (self._ids.nbytes + len(self._recent) * 36
+                + self._seen_id.itemsize * len(self._seen_id) + 4 * len(self._seen_city))
+
+    # ---------------- persistence ----------------
+    def save(self, path=None):
+        path = path or self.path
+        if not path:
+            return
+        with self._lock:
+            self._merge()
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            tmp_path = path + ".tmp.npz"
+            np.savez_compressed(tmp_path, ids=self._ids, cities=np.array(self._cities, dtype=str),
+                                seen_id=np.frombuffer(self._seen_id, dtype=np.uint64),
+                                seen_city=np.frombuffer(self._seen_city, dtype=np.uint16),
+                                seen_page=np.frombuffer(self._seen_page, dtype=np.uint16))
+            os.replace(tmp_path, path)
+
+    def _load(self):
+        with np.load(self.path) as data:
+            self._ids = np.asarray(data["ids"], dtype=np.uint64)
+            self._cities = [str(c) for c in data["cities"]]
+            self._seen_id.frombytes(data["seen_id"].astype(np.uint64).tobytes())
+            self._seen_city.frombytes(data["seen_city"].astype(np.uint16).tobytes())
+            self._seen_page.frombytes(data["seen_page"].astype(np.uint16).tobytes())
+        self._city_codes = {city: code for code, city in enumerate(self._cities)}
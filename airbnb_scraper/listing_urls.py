@@ -0,0 +1,56 @@
+# listing_urls.py
+"""
+Canonical listing URLs and integer listing IDs.
+
+A listing link on a search page looks like
+
+    https://www.airbnb.com/rooms/1396369424120271572?search_mode=regular_search&adults=1
+        &check_in=2025-09-01&...&source_impression_id=p3_...&federated_search_id=652b...
+
+Only the path identifies the listing; the query is search context and per-impression
+tracking that changes on every visit. `normalize_listing()` rewrites a row to
+
+    Listing_URL  https://www.airbnb.com/rooms/1396369424120271572
+    Listing_ID   1396369424120271572   (int)
+
+and returns the query it dropped, which the scraper can keep in a side file
+(URL_PARAMS_OUT) for whoever needs it.
+"""
+import re
+from urllib.parse import parse_qsl, urlsplit
+
+LISTING_URL_PREFIX = "https://www.airbnb.com/rooms/"
+LISTING_PATH_RE = re.compile(r"/rooms/(?:plus/)?(\d+)")
+
+
+def listing_id(value):
+    """Integer listing ID of an ID (int or digit string) or listing URL; None if there is none"""
+    if isinstance(value, int):
+        return value
+    if not value:
+        return None
+    value = str(value).strip()
+    if value.isdigit():
+        return int(value)
+    m = LISTING_PATH_RE.search(value)
+    return int(m.group(1)) if m else None
+
+
+def canonical_listing_url(listing_id):
+    return f"{LISTING_URL_PREFIX}{listing_id}"
+
+
+def normalize_listing(entry):
+    """
+    Give `entry` its integer Listing_ID and canonical Listing_URL (in place).
+
+    Returns the query parameters removed from the URL as a dict (empty if
+    there were none). Rows without a recognizable listing ID keep their URL.
+    """
+    url = entry.get("Listing_URL") or ""
+    lid = listing_id(entry.get("Listing_ID")) or listing_id(url)
+    if lid is None:
+        return {}
+    entry["Listing_ID"] = lid
+    entry["Listing_URL"] = canonical_listing_url(lid)
+    return dict(parse_qsl(urlsplit(url).query))
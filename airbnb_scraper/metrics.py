@@ -0,0 +1,160 @@
+# metrics.py
+"""
+Per-stage timers and counters for a crawl.
+
+The scraper times each stage of a page (navigation, politeness sleeps,
+page_source serialization, parsing, extraction, image downloads ...) into one
+`Metrics` object and counts events (pages, listings, rows, images). The numbers
+are available as
+
+    metrics.json    snapshot with count / total / mean / p50 / p95 / max per stage
+    metrics.prom    the same in the Prometheus text format (node_exporter textfile collector)
+    :PORT/metrics   served while the run lasts, with METRICS_PORT set
+
+and as the stage table printed at the end of a run.
+"""
+import json
+import os
+import threading
+import time
+from array import array
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+
+PREFIX = "airbnb_scraper"
+QUANTILES = (0.5, 0.95)
+
+
+def percentile(sorted_values, q):
+    """Nearest-rank percentile of an already sorted sequence"""
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+def timed(metrics, stage):
+    """`metrics.timer(stage)`, or a no-op context when there are no metrics"""
+    return metrics.timer(stage) if metrics is not None else nullcontext()
+
+
+class Metrics:
+    """Thread-safe stage durations (every sample kept, 8 bytes each) and event counters"""
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self._samples = {}
+        self._counters = Counter()
+        self._lock = threading.Lock()
+        self._server = None
+
+    # ---------------- recording ----------------
+    def record(self, stage, seconds):
+        with self._lock:
+            samples = self._samples.get(stage)
+            if samples is None:
+                samples = self._samples[stage] = array("d")
+            samples.append(seconds)
+
+    @contextmanager
+    def timer(self, stage):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - started)
+
+    def count(self, event, n=1):
+        with self._lock:
+            self._counters[event] += n
+
+    # ---------------- reading ----------------
+    def stages(self):
+        """{stage: {count, total, mean, p50, p95, max}} in seconds, slowest total first"""
+        with self._lock:
+            samples = {stage: sorted(values) for stage, values in self._samples.items()}
+        stats = {}
+        for stage, values in samples.items():
+            total = sum(values)
+            stats[stage] = {"count": len(values), "total": total, "mean": total / len(values),
+                            "p50": percentile(values, 0.5), "p95": percentile(values, 0.95), "max": values[-1]}
+        return dict(sorted(stats.items(), key=lambda item: -item[1]["total"]))
+
+    def snapshot(self):
+        with self._lock:
+            counters = dict(self._counters)
+        return {"at": time.strftime("%Y-%m-%dT%H:%M:%S"), "uptime": time.monotonic() - self.started,
+                "stages": self.stages(), "counters": counters}
+
+    def to_prometheus(self):
+        snapshot = self.snapshot()
+        lines = [f"# HELP {PREFIX}_stage_seconds Time spent per crawl stage",
+                 f"# TYPE {PREFIX}_stage_seconds summary"]
+        for stage, s in snapshot["stages"].items():
+            for q in QUANTILES:
+                lines.append(f'{PREFIX}_stage_seconds{{stage="{stage}",quantile="{q}"}} {s[f"p{round(q * 100)}"]:.6f}')
+            lines.append(f'{PREFIX}_stage_seconds_sum{{stage="{stage}"}} {s["total"]:.6f}')
+            lines.append(f'{PREFIX}_stage_seconds_count{{stage="{stage}"}} {s["count"]}')
+        lines += [f"# HELP {PREFIX}_events_total Pages, listings, rows and images handled",
+                  f"# TYPE {PREFIX}_events_total counter"]
+        for event, n in sorted(snapshot["counters"].items()):
+            lines.append(f'{PREFIX}_events_total{{event="{event}"}} {n}')
+        lines += [f"# TYPE {PREFIX}_uptime_seconds gauge", f"{PREFIX}_uptime_seconds {snapshot['uptime']:.3f}"]
+        return "\n".join(lines) + "\n"
+
+    # ---------------- output ----------------
+    def write(self, json_path=None, prom_path=None):
+        """Write the JSON snapshot and/or Prometheus text file (atomically, they may be read meanwhile)"""
+        for path, render in ((json_path, lambda: json.dumps(self.snapshot(), indent=2)),
+                             (prom_path, self.to_prometheus)):
+            if not path:
+                continue
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            tmp_path = path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as fh:
+                fh.write(render())
+            os.replace(tmp_path, path)
+
+    def serve(self, port, host="127.0.0.1"):
+        """Serve /metrics (Prometheus text) and /metrics.json from a background thread"""
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == "/metrics":
+                    body, kind = metrics.to_prometheus(), "text/plain; version=0.0.4"
+                elif self.path == "/metrics.json":
+                    body, kind = json.dumps(metrics.snapshot()), "application/json"
+                else:
+                    self.send_error(404)
+                    return
+                data = body.encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", kind)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass  # keep the crawl output readable
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=self._server.serve_forever, name="metrics-http", daemon=True).start()
+        return self._server
+
+    def close(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def print_table(self):
+        stages = self.stages()
+        if not stages:
+            return
+        wall = time.monotonic() - self.started
+        print(f"\nTime by stage (wall clock {wall:.1f}s; stages overlap across workers):")
+        print(f"  {'stage':<16} {'count':>7} {'total':>9} {'share':>6} {'mean':>8} {'p50':>8} {'p95':>8} {'max':>8}")
+        for stage, s in stages.items():
+            print(f"  {stage:<16} {s['count']:7d} {s['total']:8.1f}s {s['total'] / wall * 100 if wall else 0:5.1f}% "
+                  f"{s['mean'] * 1000:6.0f}ms {s['p50'] * 1000:6.0f}ms {s['p95'] * 1000:6.0f}ms "
+                  f"{s['max'] * 1000:6.0f}ms")
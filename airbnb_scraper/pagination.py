@@ -0,0 +1,173 @@
+# pagination.py
+"""
+Plan search-result pages as URLs instead of clicking through them.
+
+Airbnb pages its search results with an offset: the "Next" link carries
+`items_offset=N` and a base64 `cursor` ({"section_offset": 0, "items_offset": N,
+"version": 1}), where N grows by the page size (18). Building that URL opens
+page N directly, so the pages of a city no longer have to be visited in order
+and can be spread over several browser sessions. Clicking "Next" stays
+available as a fallback for when a planned URL does not load.
+"""
+import base64
+import json
+import threading
+from urllib.parse import parse_qsl, quote, urlencode, urlparse, urlunparse
+
+PAGE_SIZE = 18  # Listings per search page; the offset of page N is (N - 1) * PAGE_SIZE
+PAGE_PARAMS = ("cursor", "items_offset", "section_offset", "pagination_search")
+
+PAGINATION_LINKS_JS = """
+return Array.from(document.querySelectorAll('nav a[href*="cursor="], a[aria-label="Next"][href]'))
+    .map(a => a.href);
+"""
+
+
+def build_city_url_from_template(template_url: str, city: str) -> str:
+    """
+    Replace the city slug in the template URL path (the third path segment after /s/)
+    Example: /s/karachi-/homes -> /s/islamabad-/homes  (keeps trailing hyphen if present in template)
+    """
+    parsed = urlparse(template_url)
+    parts = parsed.path.split('/')  # ['', 's', 'karachi-', 'homes']
+    if len(parts) >= 3 and parts[1] == 's':
+        orig_third = parts[2]
+        # keep hyphen pattern if original endswith '-'
+        if orig_third.endswith('-'):
+            new_third = quote(city.lower()) + '-'
+        else:
+            new_third = quote(city.lower())
+        parts[2] = new_third
+        new_path = '/'.join(parts)
+    else:
+        # fallback if template path is unexpected
+        new_path = f"/s/{quote(city.lower())}/homes"
+    new_parsed = parsed._replace(path=new_path)
+    return urlunparse(new_parsed)
+
+
+def encode_cursor(items_offset, section_offset=0):
+    raw = json.dumps({"section_offset": section_offset, "items_offset": items_offset, "version": 1},
+                     separators=(",", ":"))
+    return base64.b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor):
+    """The cursor as a dict, or None if it isn't the base64 JSON kind"""
+    try:
+        value = json.loads(base64.b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (ValueError, TypeError):
+        return None
+    return value if isinstance(value, dict) else None
+
+
+def items_offset(url):
+    """Result offset a search URL points at (0 for the first page)"""
+    params = dict(parse_qsl(urlparse(url).query))
+    cursor = decode_cursor(params["cursor"]) if params.get("cursor") else None
+    offset = cursor.get("items_offset") if cursor else params.get("items_offset")
+    try:
+        return int(offset)
+    except (TypeError, ValueError):
+        return 0
+
+
+def page_url(search_url, page, page_size=PAGE_SIZE):
+    """URL of result page `page` (1-based) of a search"""
+    parsed = urlparse(search_url)
+    query = [(k, v) for k, v in parse_qsl(parsed.query, keep_blank_values=True) if k not in PAGE_PARAMS]
+    if page > 1:
+        offset = (page - 1) * page_size
+        query += [("pagination_search", "true"), ("items_offset", str(offset)),
+                  ("cursor", encode_cursor(offset))]
+    return urlunparse(parsed._replace(query=urlencode(query)))
+
+
+def page_of_url(url, page_size=PAGE_SIZE):
+    return items_offset(url) // page_size + 1
+
+
+def pagination_links(driver):
+    """hrefs of the pagination links on the current page"""
+    try:
+        return list(dict.fromkeys(driver.execute_script(PAGINATION_LINKS_JS) or []))
+    except Exception:
+        return []
+
+
+def page_size_from_links(urls, default=PAGE_SIZE):
+    """
+    Infer the page size from pagination links.
+
+    The smallest non-zero offset among them is the link to page 2, i.e. one page.
+    """
+    offsets = sorted({items_offset(u) for u in urls} - {0})
+    return offsets[0] if offsets else default
+
+
+def url_for_page(search_url, page, links=(), page_size=PAGE_SIZE):
+    """
+    URL of page `page`: its link in the current page's pagination if there is
+    one, else planned from the offset (with the page size seen in the links).
+    """
+    page_size = page_size_from_links(links, page_size)
+    for link in links:
+        if page_of_url(link, page_size) == page:
+            return link
+    return page_url(search_url, page, page_size)
+
+
+class CityPages:
+    """
+    Shared progress of one city whose pages are fetched as separate tasks.
+
+    Tracks which listings were already taken (so a listing shifting between
+    pages is written once), where the city ends and which pages are still out.
+    """
+
+    def __init__(self, city, pages=(), seen=()):
+        self.city = city
+        self.remaining = set(pages)
+        self.seen = set(seen)
+        self.rows_written = 0
+        self.pages_processed = 0  # pages of this run whose listings were read
+        self.page_size = PAGE_SIZE
+        self.last_page = None  # pages after this one are not fetched
+        self.complete = False  # True if last_page is where the results ran out
+        self._lock = threading.Lock()
+
+    def claim(self, key):
+        """True the first time `key` is seen for this city"""
+        with self._lock:
+            if key in self.seen:
+                return False
+            self.seen.add(key)
+            return True
+
+    def wanted(self, page):
+        with self._lock:
+            return self.last_page is None or page <= self.last_page
+
+    def stop_after(self, page, complete=False):
+        """
+        No pages after `page` are needed: the results ran out there (`complete`)
+        or the rest is not worth fetching.
+        """
+        with self._lock:
+            if self.last_page is None or page < self.last_page:
+                self.last_page = page
+                self.complete = complete
+            elif page == self.last_page:
+                self.complete = self.complete or complete
+
+    def add_rows(self, rows):
+        """Rows written from one processed page"""
+        with self._lock:
+            self.rows_written += rows
+            self.pages_processed += 1
+
+    def page_done(self, page):
+        """Record a finished page task; True once it was the city's last one"""
+        with self._lock:
+            self.remaining.discard(page)
+            return not self.remaining
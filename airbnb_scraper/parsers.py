@@ -0,0 +1,362 @@
+# parsers.py
+"""
+Listing-card parsing for the DOM fallback, with interchangeable HTML backends.
+
+    "bs4"        BeautifulSoup + html.parser (pure Python, the original path)
+    "lxml"       lxml.html (libxml2)
+    "selectolax" selectolax / lexbor
+    "auto"       the fastest one installed
+
+All backends share one extraction plan: the card selectors below are compiled
+once into simple matchers, and every card is walked a single time, keeping for
+each field the highest-priority element found. They produce the same rows.
+"""
+import re
+
+from .metrics import timed
+
+CARD_SELECTORS = [
+    'div[data-testid="card-container"]',
+    'div[itemprop="itemListElement"]',
+    'div[data-testid="listing"]',
+    '[data-testid="property-card"]',
+    'div[role="group"]',
+    'a[href*="/rooms/"]'
+]
+
+# Per field, in order of preference; the first selector with a match wins
+TITLE_SELECTORS = [
+    'meta[itemprop="name"][content]',
+    '[data-testid="listing-card-title"]',
+    '[data-testid="title"]',
+    '[role="heading"]',
+    'h3',
+    'h2'
+]
+PRICE_SELECTORS = [
+    '[data-testid="price"]',
+    '[data-testid="price-availability-row"]',
+    'span[aria-label*="per night"]',
+    'span[aria-label*="total"]'
+]
+IMAGE_SELECTORS = [
+    'img[data-testid="listing-card-image"]',
+    'img[data-original-uri]',
+    'img[srcset]',
+    'img[src]'
+]
+LINK_SELECTORS = ['a[href*="/rooms/"]']
+
+PRICE_RE = re.compile(r'[\$€£₹]\s*\d[\d,]*')
+RATING_REVIEWS_RE = re.compile(r'(\d\.\d{1,2})\s*[·•]\s*([\d,]+)\s*reviews?', re.IGNORECASE)
+REVIEWS_RE = re.compile(r'\(([\d,]+)\)\s*reviews?', re.IGNORECASE)
+RATING_RE = re.compile(r'(\d\.\d{1,2})(?!(\d))')
+LISTING_ID_RE = re.compile(r'/rooms/(\d+)')
+SELECTOR_RE = re.compile(r'([a-z0-9]*)((?:\[[\w-]+(?:\*?="[^"]*")?\])*)$')
+ATTR_RE = re.compile(r'\[([\w-]+)(?:(\*?=)"([^"]*)")?\]')
+
+
+# ---------------- extraction plan ----------------
+def compile_selector(css):
+    """
+    Compile the simple selectors used here (tag, [attr], [attr="v"], [attr*="v"])
+    into (tag or None, ((attr, op, value), ...)).
+    """
+    m = SELECTOR_RE.match(css)
+    if not m:
+        raise ValueError(f"Unsupported selector: {css}")
+    tag, attrs = m.groups()
+    return tag or None, tuple(ATTR_RE.findall(attrs))
+
+
+def matches(matcher, tag, get):
+    """Whether an element with `tag` and attribute getter `get` satisfies a compiled selector"""
+    want_tag, attrs = matcher
+    if want_tag and tag != want_tag:
+        return False
+    for name, op, value in attrs:
+        actual = get(name)
+        if actual is None:
+            return False
+        if op == "=" and actual != value:
+            return False
+        if op == "*=" and value not in actual:
+            return False
+    return True
+
+
+def compile_plan():
+    return {
+        "title": [compile_selector(s) for s in TITLE_SELECTORS],
+        "price": [compile_selector(s) for s in PRICE_SELECTORS],
+        "image": [compile_selector(s) for s in IMAGE_SELECTORS],
+        "link": [compile_selector(s) for s in LINK_SELECTORS],
+    }
+
+
+PLAN = compile_plan()
+
+
+def image_url_of(get):
+    """Best image URL of an <img>, given its attribute getter"""
+    image_url = (get("data-original-uri") or
+                 get("src") or
+                 (get("srcset") or "").split(",")[0].split(" ")[0] or
+                 get("data-src") or "")
+    # Clean up srcset format if needed
+    if " " in image_url:
+        image_url = image_url.split(" ")[0]
+    return image_url
+
+
+def walk_card(elements, plan=PLAN):
+    """
+    One pass over a card and its descendants, given as (tag, attribute getter, element).
+
+    Returns {field: (tag, getter, element)} with the highest-priority match per
+    field. An <img> only counts if it yields an image URL.
+    """
+    best = {}
+    for tag, get, el in elements:
+        for field, matchers in plan.items():
+            limit = best[field][0] if field in best else len(matchers)
+            for i in range(limit):
+                if matches(matchers[i], tag, get):
+                    if field == "image" and not image_url_of(get):
+                        continue
+                    best[field] = (i, tag, get, el)
+                    break
+    return {field: match[1:] for field, match in best.items()}
+
+
+def build_row(text, title, price, image_url, href):
+    """Turn the raw values found in a card into an output row"""
+    if not title:
+        # fallback
+        lines = [ln.strip() for ln in text.splitlines() if ln.strip()]
+        title = lines[0] if lines else ""
+
+    if not price:
+        m = PRICE_RE.search(text)
+        if m:
+            price = m.group(0)
+
+    # rating & reviews
+    rating = ""
+    reviews = ""
+    m = RATING_REVIEWS_RE.search(text)
+    if m:
+        rating = m.group(1)
+        reviews = m.group(2).replace(",", "")
+    else:
+        mrev = REVIEWS_RE.search(text)
+        if mrev:
+            reviews = mrev.group(1).replace(",", "")
+        mrat = RATING_RE.search(text)
+        if mrat:
+            rating = mrat.group(1)
+
+    # Clean and validate image URL
+    if image_url and not image_url.startswith('http'):
+        if image_url.startswith('//'):
+            image_url = 'https:' + image_url
+        elif image_url.startswith('/'):
+            image_url = 'https://www.airbnb.com' + image_url
+
+    # listing url and ID
+    listing_url = ""
+    listing_id = ""
+    if href is not None:
+        listing_url = href if href.startswith("http") else "https://www.airbnb.com" + href
+        id_match = LISTING_ID_RE.search(listing_url)
+        if id_match:
+            listing_id = id_match.group(1)
+
+    return {
+        "Title": title,
+        "Price": price,
+        "Rating": rating,
+        "Reviews": reviews,
+        "Image_URL": image_url,
+        "Local_Image_Path": "",
+        "Listing_URL": listing_url,
+        "Listing_ID": listing_id
+    }
+
+
+# ---------------- backends ----------------
+class HtmlParser:
+    """
+    Base class of the parser backends.
+
+    A backend only knows how to parse HTML, run a card selector, list the
+    elements of a card and get text; the extraction itself is shared.
+    """
+    name = None
+
+    def parse(self, html):
+        raise NotImplementedError
+
+    def select(self, root, css):
+        raise NotImplementedError
+
+    def elements(self, card):
+        """
+        (tag, attribute getter, element) for `card` and every element below it, in
+        document order; the card itself counts, e.g. a card that is the listing's <a>
+        """
+        raise NotImplementedError
+
+    def text(self, el, sep):
+        """Stripped text pieces of `el` joined by `sep`, like BeautifulSoup's get_text(sep, strip=True)"""
+        raise NotImplementedError
+
+    def find_cards(self, root):
+        for sel in CARD_SELECTORS:
+            cards = self.select(root, sel)
+            if cards:
+                print(f"  ✓ Found {len(cards)} cards with selector: {sel}")
+                return cards
+        return []
+
+    def extract_from_card(self, card):
+        """Extract listing data from a card element"""
+        found = walk_card(self.elements(card))
+
+        title = ""
+        if "title" in found:
+            tag, get, el = found["title"]
+            title = get("content").strip() if tag == "meta" else self.text(el, "")
+        price = self.text(found["price"][2], " ") if "price" in found else ""
+        image_url = image_url_of(found["image"][1]) if "image" in found else ""
+        href = found["link"][1]("href") if "link" in found else None
+        return build_row(self.text(card, " "), title, price, image_url, href)
+
+    def parse_cards(self, html, metrics=None):
+        """Rows of every card in `html`; parse / find_cards / extract are timed into `metrics` if given"""
+        with timed(metrics, "parse"):
+            root = self.parse(html)
+        with timed(metrics, "find_cards"):
+            cards = self.find_cards(root)
+        with timed(metrics, "extract_cards"):
+            return [self.extract_from_card(card) for card in cards]
+
+
+class SoupParser(HtmlParser):
+    """BeautifulSoup with the pure-Python html.parser"""
+    name = "bs4"
+
+    def __init__(self):
+        try:
+            from bs4 import BeautifulSoup
+        except ImportError:
+            raise RuntimeError("The bs4 parser needs beautifulsoup4: pip install beautifulsoup4")
+        self._soup = BeautifulSoup
+
+    def parse(self, html):
+        return self._soup(html, "html.parser")
+
+    def select(self, root, css):
+        return root.select(css)
+
+    def elements(self, card):
+        yield card.name, card.get, card
+        yield from ((el.name, el.get, el) for el in card.find_all(True))
+
+    def text(self, el, sep):
+        return el.get_text(sep, strip=True)
+
+
+class LxmlParser(HtmlParser):
+    """lxml.html tree; card selectors run as compiled XPath"""
+    name = "lxml"
+
+    def __init__(self):
+        try:
+            import lxml.html
+            from lxml import etree
+        except ImportError:
+            raise RuntimeError("The lxml parser needs lxml: pip install lxml")
+        self._html = lxml.html
+        self._etree = etree
+        self._xpaths = {sel: etree.XPath(self._to_xpath(compile_selector(sel))) for sel in CARD_SELECTORS}
+
+    @staticmethod
+    def _to_xpath(matcher):
+        tag, attrs = matcher
+        preds = []
+        for name, op, value in attrs:
+            if op == "=":
+                preds.append(f'[@{name}="{value}"]')
+            elif op == "*=":
+                preds.append(f'[contains(@{name}, "{value}")]')
+            else:
+                preds.append(f'[@{name}]')
+        return f"//{tag or '*'}{''.join(preds)}"
+
+    def parse(self, html):
+        root = self._html.document_fromstring(html)
+        # BeautifulSoup's get_text() leaves script/style contents out, so drop them up front
+        self._etree.strip_elements(root, "script", "style", with_tail=False)
+        return root
+
+    def select(self, root, css):
+        return self._xpaths[css](root)
+
+    def elements(self, card):
+        # Comments and processing instructions have a non-string tag
+        return ((el.tag, el.get, el) for el in card.iter() if isinstance(el.tag, str))
+
+    def text(self, el, sep):
+        return sep.join(s.strip() for s in el.itertext() if s.strip())
+
+
+class SelectolaxParser(HtmlParser):
+    """selectolax on the lexbor engine; card selectors use its native CSS engine"""
+    name = "selectolax"
+
+    def __init__(self):
+        try:
+            from selectolax.lexbor import LexborHTMLParser
+        except ImportError:
+            raise RuntimeError("The selectolax parser needs selectolax: pip install selectolax")
+        self._parser = LexborHTMLParser
+
+    def parse(self, html):
+        tree = self._parser(html)
+        # BeautifulSoup's get_text() leaves script/style contents out, so drop them up front
+        tree.strip_tags(["script", "style"])
+        return tree
+
+    def select(self, root, css):
+        return root.css(css)
+
+    def elements(self, card):
+        # traverse() starts with the card itself; comment nodes have tags like "-comment"
+        return ((el.tag, el.attributes.get, el) for el in card.traverse() if not el.tag.startswith("-"))
+
+    def text(self, el, sep):
+        return el.text(separator=sep, strip=True)
+
+
+PARSERS = {
+    "bs4": SoupParser,
+    "lxml": LxmlParser,
+    "selectolax": SelectolaxParser,
+}
+
+
+def create_parser(name="auto"):
+    """Instantiate a parser backend by name; "auto" picks the fastest one installed"""
+    if name == "auto":
+        for candidate in ("selectolax", "lxml"):
+            try:
+                return PARSERS[candidate]()
+            except RuntimeError:
+                continue
+        return SoupParser()
+    try:
+        parser_cls = PARSERS[name]
+    except KeyError:
+        raise ValueError(f"Unknown HTML parser {name!r}, expected one of: auto, {', '.join(PARSERS)}")
+    return parser_cls()
@@ -0,0 +1,190 @@
+# readiness.py
+"""
+Wait for concrete page signals instead of sleeping for fixed amounts of time.
+
+All checks poll the page through `execute_script`, so they work on any engine
+from engines.py. Deliberate delays (politeness) live in `PolitenessPolicy`,
+which is the only place random jitter comes from.
+"""
+import json
+import random
+import threading
+import time
+
+LISTING_IDS_JS = """
+return Array.from(document.querySelectorAll('a[href*="/rooms/"]'))
+    .map(a => ((a.getAttribute('href') || '').match(/\\/rooms\\/(\\d+)/) || [])[1])
+    .filter(Boolean);
+"""
+
+RESOURCE_COUNT_JS = """
+if (performance.setResourceTimingBufferSize) { performance.setResourceTimingBufferSize(100000); }
+return performance.getEntriesByType('resource').length;
+"""
+
+
+def _poll(check, timeout, interval):
+    """Call check() until it returns truthy or timeout expires; returns the last value"""
+    deadline = time.monotonic() + timeout
+    while True:
+        value = check()
+        if value or time.monotonic() >= deadline:
+            return value
+        time.sleep(interval)
+
+
+# Text of pages served instead of results when the site throttles or blocks us
+BLOCK_PAGE_MARKERS = ("captcha", "are you a robot", "unusual traffic", "access denied",
+                      "request blocked", "too many requests", "verify you are a human")
+
+
+VISIBLE_TEXT_JS = "return (document.title || '') + '\\n' + (document.body ? document.body.innerText : '');"
+
+
+def looks_blocked(driver, card_css=None):
+    """
+    True if the current page looks like a block / captcha page rather than search results.
+
+    Only what a visitor reads (title and visible text) is searched: the scripts
+    and config of every normal page mention "captcha" and the like. A page
+    showing listing cards (`card_css`) is never taken for a block page.
+    """
+    try:
+        if card_css and count_elements(driver, card_css):
+            return False
+        text = (driver.execute_script(VISIBLE_TEXT_JS) or "").lower()
+    except Exception:
+        return False
+    return any(marker in text for marker in BLOCK_PAGE_MARKERS)
+
+
+def count_elements(driver, css):
+    return driver.execute_script(f"return document.querySelectorAll({json.dumps(css)}).length;") or 0
+
+
+def listing_ids_on_page(driver):
+    """Listing IDs linked from the current page, in page order"""
+    try:
+        return list(dict.fromkeys(driver.execute_script(LISTING_IDS_JS) or []))
+    except Exception:
+        return []
+
+
+def wait_for_cards_stable(driver, css, timeout=10, interval=0.25, stable_polls=3):
+    """Wait until at least one card is present and the card count stops changing"""
+    history = []
+
+    def check():
+        history.append(count_elements(driver, css))
+        recent = history[-stable_polls:]
+        return len(recent) == stable_polls and recent[0] > 0 and len(set(recent)) == 1
+
+    _poll(check, timeout, interval)
+    return history[-1] if history else 0
+
+
+def wait_for_network_idle(driver, idle_time=0.75, timeout=10, interval=0.25):
+    """Wait until no new resource requests have started for idle_time seconds"""
+    state = {"count": -1, "since": time.monotonic()}
+
+    def check():
+        count = driver.execute_script(RESOURCE_COUNT_JS) or 0
+        now = time.monotonic()
+        if count != state["count"]:
+            state["count"], state["since"] = count, now
+            return False
+        return now - state["since"] >= idle_time
+
+    return bool(_poll(check, timeout, interval))
+
+
+def wait_for_listing_change(driver, previous_ids, timeout=15, interval=0.25):
+    """Wait until the listings on the page differ from `previous_ids`"""
+    previous = set(previous_ids or [])
+
+    def check():
+        current = listing_ids_on_page(driver)
+        return current if current and set(current) != previous else None
+
+    return _poll(check, timeout, interval) or []
+
+
+def wait_until_ready(driver, card_css, previous_ids=None, timeout=15):
+    """
+    Combined readiness check used after every navigation.
+
+    Returns the number of cards found (0 means the page never became ready).
+    """
+    deadline = time.monotonic() + timeout
+    if previous_ids is not None:
+        if not wait_for_listing_change(driver, previous_ids, timeout=timeout):
+            return 0
+    cards = wait_for_cards_stable(driver, card_css, timeout=max(0.5, deadline - time.monotonic()))
+    wait_for_network_idle(driver, timeout=max(0.5, deadline - time.monotonic()))
+    return cards
+
+
+class PolitenessPolicy:
+    """
+    Random pause between min_delay and max_delay seconds (0, 0 disables it).
+
+    `scale` (a callable) stretches or shrinks every pause, e.g. with the
+    slowdown of an adaptive rate limiter; `on_pause(seconds)` is called with
+    every pause taken. Time already spent since the last request (`elapsed`,
+    e.g. parsing the page) counts towards the pause.
+    """
+
+    def __init__(self, min_delay=0.0, max_delay=0.0, scale=None, on_pause=None):
+        self.min_delay = min_delay
+        self.max_delay = max(min_delay, max_delay)
+        self.scale = scale
+        self.on_pause = on_pause
+
+    def delay(self):
+        if self.max_delay <= 0:
+            return 0.0
+        seconds = random.uniform(self.min_delay, self.max_delay)
+        return seconds * self.scale() if self.scale else seconds
+
+    def pause(self, stop_event=None, elapsed=0.0):
+        """Sleep for one politeness delay minus `elapsed`; returns the seconds slept"""
+        seconds = self.delay() - elapsed
+        if seconds > 0:
+            if stop_event is not None:
+                stop_event.wait(seconds)
+            else:
+                time.sleep(seconds)
+            if self.on_pause:
+                self.on_pause(seconds)
+        return max(seconds, 0.0)
+
+
+class LatencyLog:
+    """Collects per-page load latency and network use so the time and bandwidth saved can be measured"""
+
+    def __init__(self):
+        self._samples = []
+        self._lock = threading.Lock()
+
+    def record(self, city, page, seconds, transfer=None):
+        with self._lock:
+            self._samples.append((city, page, seconds, transfer))
+
+    def summary(self):
+        with self._lock:
+            samples = list(self._samples)
+        if not samples:
+            return None
+        times = sorted(s[2] for s in samples)
+        summary = {
+            "pages": len(times),
+            "mean": sum(times) / len(times),
+            "p50": times[len(times) // 2],
+            "max": times[-1],
+        }
+        transfers = [s[3] for s in samples if s[3] is not None]
+        if transfers:
+            summary["bytes_mean"] = sum(t["bytes"] for t in transfers) / len(transfers)
+            summary["requests_mean"] = sum(t["requests"] for t in transfers) / len(transfers)
+            summary["blocked"] = sum(t["blocked"] for t in transfers)
+        return summary
@@ -0,0 +1,1144 @@
+# scraper.py
+"""
+The scraper as an importable object.
+
+    from airbnb_scraper import Scraper
+
+    with Scraper(cities=["Lahore"], workers=2) as scraper:
+        scraper.run()
+
+Nothing heavy happens on import or construction: the browser engine, its
+session and the HTML parser are created the first time they are needed and
+then reused, so one Scraper can run several times on the same browser.
+Sessions come from sessions.py, so their cookies and cookie-banner consent
+carry over between cities, runs and recycled browsers.
+"""
+import csv
+import time
+import os
+import threading
+from collections import Counter
+from datetime import datetime
+from functools import partial
+
+from .archive import PageArchive
+from .blocking import BlockList
+from .checkpoint import CheckpointJournal
+from .config import Config
+from .embedded_json import extract_listings_from_json, find_embedded_blobs
+from .engines import create_engine
+from .extraction import ExtractionPool, PageSnapshot
+from .image_store import ImageStore
+from .listing_urls import listing_id, normalize_listing
+from .metrics import Metrics
+from .pagination import (CityPages, build_city_url_from_template, page_of_url, page_size_from_links,
+                         page_url, pagination_links, url_for_page)
+from .parsers import create_parser
+from .readiness import (LatencyLog, PolitenessPolicy, listing_ids_on_page, looks_blocked,
+                        wait_for_cards_stable, wait_until_ready)
+from .sessions import SessionManager
+from .sinks import (CsvSink, JsonArraySink, JsonLinesSink, MultiSink, ParquetSink, PartitionedParquetSink,
+                    open_sink, read_rows)
+from .state_store import ListingStateStore
+from .worker_pool import AdaptiveRateLimiter, CircuitBreaker, CrawlPool, RetryLater
+
+
+# ---------------- helpers ----------------
+COOKIE_BUTTON_XPATHS = [
+    "//button[contains(text(),'Accept')]",
+    "//button[contains(text(),'Agree')]",
+    "//button[contains(text(),'OK')]",
+    "//button[contains(@data-testid, 'accept')]",
+    "//button[contains(@id, 'cookie')]",
+    "//button[contains(text(), 'I agree')]"
+]
+
+
+def accept_cookies_if_present(driver):
+    """Try to accept cookies if the banner appears; True if a button was clicked"""
+    try:
+        # One union query, so a page without a banner costs one 2s wait instead of six
+        btn = driver.find_clickable(" | ".join(COOKIE_BUTTON_XPATHS), timeout=2)
+        if btn and btn.is_displayed():
+            btn.click()
+            print("  ✓ Accepted cookies")
+            return True
+    except Exception as e:
+        print(f"  ⚠ Cookie handling error: {e}")
+    return False
+
+
+def click_next_page(driver):
+    """Click the next page button (>) to go to the next page"""
+    print("  ➡️ Looking for next page button...")
+    
+    # Multiple selectors for the "next" button
+    next_button_selectors = [
+        "//a[@aria-label='Next']",
+        "//button[@aria-label='Next']",
+        "//a[contains(@aria-label, 'Next')]",
+        "//button[contains(@aria-label, 'Next')]",
+        "//a[text()='>']",
+        "//button[text()='>']",
+        "//a[contains(text(), '›')]",
+        "//button[contains(text(), '›')]",
+        "//a[contains(@class, 'next')]",
+        "//button[contains(@class, 'next')]",
+        "//nav//a[last()]",  # Last pagination link
+        "//div[@role='navigation']//a[last()]",
+        "//div[contains(@data-testid, 'pagination')]//a[last()]"
+    ]
+    
+    for selector in next_button_selectors:
+        try:
+            next_btn = driver.find_clickable(selector, timeout=5)
+            
+            if next_btn and next_btn.is_displayed():
+                # Check if button is not disabled
+                if (not next_btn.get_attribute("disabled") and 
+                    "disabled" not in (next_btn.get_attribute("class") or "").lower() and
+                    next_btn.get_attribute("aria-disabled") != "true"):
+                    
+                    # Scroll to button first
+                    next_btn.scroll_into_view()
+                    
+                    # Try clicking with JavaScript first (more reliable)
+                    try:
+                        next_btn.js_click()
+                        print(f"  ✓ Clicked next page button (JS click)")
+                    except:
+                        # Fallback to regular click
+                        next_btn.click()
+                        print(f"  ✓ Clicked next page button (regular click)")
+                    return True
+                else:
+                    print(f"  ⚠ Next button found but disabled")
+                    return False
+                    
+        except Exception as e:
+            print(f"  ⚠ Error clicking next button: {e}")
+            continue
+    
+    print("  ⚠ No clickable next page button found")
+    return False
+
+
+def last_linked_page(links):
+    """Highest page the pagination links of the current page point to (0 without links)"""
+    page_size = page_size_from_links(links)
+    return max((page_of_url(link, page_size) for link in links), default=0)
+
+
+# ---------------- scraper ----------------
+class Scraper:
+    """
+    Scrapes the search results of the configured cities.
+
+    Settings come from a Config (or keyword overrides of the defaults in
+    config.py). The browser is started lazily and kept open between runs;
+    call close() (or use the scraper as a context manager) to shut it down.
+    """
+
+    def __init__(self, config=None, **overrides):
+        if config is None:
+            config = Config(**overrides)
+        elif overrides:
+            config = Config(**{**vars(config), **overrides})
+        self.config = config
+        self._engine = None
+        self._sessions = None
+        self._driver = None
+        self._html_parser = None
+
+        c = self.config
+        self.metrics = Metrics()  # replaced by a fresh one for every run
+        self.rate_limiter = AdaptiveRateLimiter(c.global_rate_limit, *c.rate_limit_range,
+                                                increase=c.rate_increase, backoff=c.rate_backoff,
+                                                slow_seconds=c.slow_page_seconds,
+                                                on_wait=lambda s: self.metrics.record("rate_wait", s))
+        # Pauses stretch while the limiter backs off and shrink while it speeds up
+        slowdown = lambda: self.rate_limiter.slowdown
+        self.page_politeness = PolitenessPolicy(*c.page_politeness_range, scale=slowdown,
+                                                on_pause=lambda s: self.metrics.record("page_pause", s))
+        self.city_politeness = PolitenessPolicy(*c.city_pause_range, scale=slowdown,
+                                                on_pause=lambda s: self.metrics.record("city_pause", s))
+        self.page_latency = LatencyLog()
+
+        # Per-run state, set up by run()
+        self.run_started_at = None
+        self.listing_state = None
+        self.image_store = None
+        self.image_downloader = None
+        self.journal = None
+        self.output_sink = None
+        self.url_params_sink = None
+        self.listing_index = None
+        self.extraction = None
+        self.page_archive = None
+        self.detail_fetcher = None
+        self.city_pages = {}
+        self.breaker = None
+        self.rows_per_city = Counter()
+        self.rows_with_image = Counter()
+        self.failed_cities = {}  # city -> reason its circuit breaker gave up
+        self._emit_lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ---------------- lazy resources ----------------
+    @property
+    def engine(self):
+        if self._engine is None:
+            c = self.config
+            self._engine = create_engine(c.browser_engine, headless=c.headless, viewport=tuple(c.viewport),
+                                         block=BlockList(c.block_resources, c.block_url_patterns))
+        return self._engine
+
+    @property
+    def sessions(self):
+        if self._sessions is None:
+            c = self.config
+            self._sessions = SessionManager(self.engine, state_path=c.browser_state,
+                                            recycle_after=c.session_recycle_pages,
+                                            max_failures=c.session_max_failures)
+        return self._sessions
+
+    @property
+    def driver(self):
+        """The scraper's own browser session, opened on first use and reused afterwards"""
+        if self._driver is None:
+            self._driver = self.create_driver()
+        return self._driver
+
+    @property
+    def html_parser(self):
+        if self._html_parser is None:
+            self._html_parser = create_parser(self.config.html_parser)
+        return self._html_parser
+
+    def close(self):
+        """Quit the browser session and engine (they are started again if needed)"""
+        if self._driver is not None:
+            self._driver.quit()
+            self._driver = None
+        if self._sessions is not None:
+            self._sessions.close()
+            self._sessions = None
+        if self._engine is not None:
+            self._engine.close()
+            self._engine = None
+
+    def city_url(self, city, page=1):
+        """Search URL of `page` of a city, built from the template"""
+        return page_url(build_city_url_from_template(self.config.template_url, city), page)
+
+    def parse_html(self, html):
+        """Listing rows of a saved search page: embedded JSON first, else its cards"""
+        if self.config.extraction_mode != "dom":
+            entries, _ = extract_listings_from_json(find_embedded_blobs(html))
+            if entries or self.config.extraction_mode == "json":
+                return [self._normalized(entry) for entry in entries]
+        return [self._normalized(entry) for entry in self.html_parser.parse_cards(html)]
+
+    @staticmethod
+    def _normalized(entry):
+        normalize_listing(entry)
+        return entry
+
+    # ---------------- run ----------------
+    def open_output_sink(self, append=False):
+        """Open the streaming writers for every configured output format"""
+        c = self.config
+        sinks = []
+        if "csv" in c.output_formats:
+            sinks.append(CsvSink(c.out_csv, c.output_columns, append=append, fsync_interval=c.fsync_interval))
+        if "json" in c.output_formats:
+            sinks.append(JsonArraySink(c.out_json, append=append, fsync_interval=c.fsync_interval))
+        if "jsonl" in c.output_formats:
+            sinks.append(JsonLinesSink(c.out_jsonl, append=append, fsync_interval=c.fsync_interval))
+        if "parquet" in c.output_formats:
+            # Parquet files can't be appended to; a resumed run writes its own part file
+            path = c.out_parquet
+            if append:
+                path = c.out_parquet.replace(".parquet", f".resumed-{datetime.utcnow():%Y%m%dT%H%M%S}.parquet")
+            sinks.append(ParquetSink(path, c.output_columns, row_group_size=c.parquet_row_group))
+        if "dataset" in c.output_formats:
+            # Each run writes new part files, so resuming needs no special case
+            sinks.append(PartitionedParquetSink(c.out_dataset, c.output_columns, row_group_size=c.parquet_row_group))
+        return MultiSink(sinks)
+
+    def _open_run(self, resume):
+        c = self.config
+        self.run_started_at = datetime.utcnow().isoformat()
+        self.metrics = Metrics()
+        if c.metrics_port:
+            self.metrics.serve(c.metrics_port)
+            print(f"📈 Metrics at http://127.0.0.1:{c.metrics_port}/metrics")
+        self.rows_per_city = Counter()
+        self.rows_with_image = Counter()
+        self.failed_cities = {}
+        self.city_pages = {}
+        self.breaker = CircuitBreaker(c.breaker_threshold, c.breaker_cooldown, c.breaker_max_trips)
+        if c.incremental:
+            os.makedirs(os.path.dirname(c.state_db), exist_ok=True)
+            self.listing_state = ListingStateStore(c.state_db, c.changes_log)
+        if c.download_images:
+            from .image_pipeline import ImageDownloader  # pulls in requests, only needed for a run
+
+            self.image_store = ImageStore(c.images_folder)
+            self.image_downloader = ImageDownloader(self.image_store, workers=c.image_workers,
+                                                    queue_size=c.image_queue_size,
+                                                    pool_size=c.image_pool_size,
+                                                    per_host_limit=c.image_per_host_limit,
+                                                    retries=c.image_retries, backoff=c.image_backoff,
+                                                    timeout=c.image_timeout, max_size=c.max_image_size,
+                                                    metrics=self.metrics)
+        self.extraction = ExtractionPool(c.extraction_workers, c.extraction_mode, c.html_parser,
+                                         metrics=self.metrics)
+        self.page_archive = PageArchive(c.page_archive, run=self.run_started_at) if c.page_archive else None
+        self.detail_fetcher = self.open_detail_fetcher() if c.fetch_details else None
+        self.journal = CheckpointJournal(c.checkpoint_journal, resume=resume)
+        # An index older than the journal was saved by an earlier run (this one was killed before
+        # saving it); the journal's listing IDs are enough to resume
+        index_current = (resume and c.listing_index and os.path.exists(c.listing_index)
+                         and os.path.getmtime(c.listing_index) >= os.path.getmtime(c.checkpoint_journal))
+        from .listing_index import ListingIndex  # numpy, only needed for a run
+
+        self.listing_index = ListingIndex(c.listing_index or None, load=index_current)
+        for city_resume in self.journal.state.values():
+            self.listing_index.update(city_resume.listing_ids)
+        if resume:
+            # Rows of pages the journal never recorded (the run died first) may be on disk already
+            self.listing_index.update(self.written_listing_ids())
+        self.output_sink = self.open_output_sink(append=resume)
+        if c.url_params_out:
+            self.url_params_sink = JsonLinesSink(c.url_params_out, append=resume, fsync_interval=c.fsync_interval)
+
+    def _close_run(self):
+        # Let queued image downloads finish; their rows are written as each one completes
+        if self.image_downloader:
+            print("\n📷 Waiting for queued image downloads to finish...")
+            self.image_downloader.close()
+            if self.config.process_images:
+                try:
+                    self.process_images(self.image_store)
+                except RuntimeError as e:
+                    print(f"  ⚠ Image processing skipped: {e}")
+            self.image_store.close()
+        self.extraction.close()
+        if self.page_archive:
+            self.page_archive.close()
+        if self.detail_fetcher:
+            print("\n🏠 Waiting for queued detail pages...")
+            self.close_detail_fetcher()
+        self.output_sink.close()
+        if self.url_params_sink:
+            self.url_params_sink.close()
+            self.url_params_sink = None
+        self.journal.close()
+        self.listing_index.save()
+        self.write_metrics()
+        self.metrics.close()
+        if self.config.clean_output:
+            self.write_clean_output()
+
+    def open_detail_fetcher(self):
+        """Detail-page stage (details.py) writing to DETAILS_OUT"""
+        from .details import DetailCache, DetailFetcher  # requests, only needed with details on
+
+        c = self.config
+        os.makedirs(os.path.dirname(c.details_cache) or ".", exist_ok=True)
+        rate_limiter = AdaptiveRateLimiter(c.detail_rate_limit, *c.rate_limit_range, increase=c.rate_increase,
+                                           backoff=c.rate_backoff, slow_seconds=c.slow_page_seconds,
+                                           on_wait=lambda s: self.metrics.record("detail_wait", s))
+        return DetailFetcher(DetailCache(c.details_cache),
+                             JsonLinesSink(c.details_out, append=True, fsync_interval=c.fsync_interval),
+                             workers=c.detail_workers, per_host_limit=c.detail_per_host_limit,
+                             rate_limiter=rate_limiter, retries=c.image_retries, backoff=c.image_backoff,
+                             timeout=c.detail_timeout, max_age_days=c.detail_max_age_days, metrics=self.metrics)
+
+    def close_detail_fetcher(self):
+        fetcher = self.detail_fetcher
+        fetcher.close()
+        fetcher.sink.close()
+        fetcher.cache.close()
+
+    def refresh_details(self, listing_ids, force=False):
+        """
+        Fetch the detail pages of `listing_ids` outside a crawl, skipping those
+        whose cached details are fresh unless `force`. Returns the number fetched.
+        """
+        self.detail_fetcher = self.open_detail_fetcher()
+        started = time.monotonic()
+        try:
+            for lid in listing_ids:
+                self.detail_fetcher.submit(lid, force=force)
+        except KeyboardInterrupt:
+            print("\n⚠ Interrupted by user — finishing the pages in flight...")
+        finally:
+            fetcher = self.detail_fetcher
+            self.close_detail_fetcher()
+            self.detail_fetcher = None
+        print(f"🏠 {fetcher.fetched} detail pages fetched, {fetcher.cached} still fresh, {fetcher.failed} failed "
+              f"in {time.monotonic() - started:.0f}s → {self.config.details_out}")
+        return fetcher.fetched
+
+    def process_images(self, store=None, prune=False):
+        """Thumbnails, perceptual hashes and the image manifest of the image store (image_processing.py)"""
+        from .image_processing import process_images  # numpy + Pillow, only needed here
+
+        c = self.config
+        own_store = store is None
+        store = store or ImageStore(c.images_folder)
+        try:
+            with self.metrics.timer("image_processing"):
+                counts = process_images(store, c.image_manifest, c.thumbs_folder, workers=c.image_process_workers,
+                                        thumb_size=c.thumb_size, min_side=c.placeholder_min_side,
+                                        max_distance=c.near_duplicate_distance,
+                                        placeholder_patterns=c.placeholder_url_patterns, prune=prune)
+        finally:
+            if own_store:
+                store.close()
+        print(f"🖼 {counts['processed']} images processed: {counts['ok']} kept, {counts['placeholder']} placeholders, "
+              f"{counts['duplicate']} near-duplicates, {counts['error']} unreadable → {c.image_manifest}")
+        if prune:
+            print(f"  🗑 {counts['pruned']} near-duplicates pruned ({counts['bytes_pruned'] / 1024 ** 2:.1f} MB)")
+        return counts
+
+    def write_metrics(self):
+        self.metrics.write(self.config.metrics_json, self.config.metrics_prom)
+
+    def written_listing_ids(self):
+        """Listing IDs in the CSV or JSON Lines output (the formats that survive a crash intact)"""
+        c = self.config
+        sources = {"csv": c.out_csv, "jsonl": c.out_jsonl}
+        for fmt, path in sources.items():
+            if fmt not in c.output_formats or not os.path.exists(path):
+                continue
+            ids = set()
+            try:
+                for row in read_rows(path):
+                    lid = listing_id(row.get("Listing_ID")) or listing_id(row.get("Listing_URL"))
+                    if lid:
+                        ids.add(lid)
+            except (ValueError, csv.Error):
+                pass  # torn last line after a crash
+            return ids
+        print("  ⚠ No CSV or JSON Lines output to resume from: rows of unfinished pages may be written twice")
+        return set()
+
+    def write_clean_output(self):
+        """Cleaning stage: typed columns from this run's output file"""
+        c = self.config
+        sources = {"csv": c.out_csv, "jsonl": c.out_jsonl, "json": c.out_json}
+        src = next((sources[fmt] for fmt in sources if fmt in c.output_formats and os.path.exists(sources[fmt])),
+                   None)
+        if src is None:
+            return
+        from .cleaning import clean_file  # pandas, only needed here
+
+        try:
+            df, rows_per_sec = clean_file(src, c.clean_output)
+        except (RuntimeError, ValueError) as e:
+            print(f"  ⚠ Cleaning {src} failed: {e}")
+            return
+        print(f"🧹 Cleaned {len(df)} rows into {c.clean_output} ({rows_per_sec:,.0f} rows/s)")
+
+    def run(self, cities=None, resume=False):
+        """
+        Scrape `cities` (default: the configured ones) and return the number of rows written.
+
+        With `resume`, cities finished by the previous run are skipped and the
+        others continue from their checkpointed page.
+        """
+        c = self.config
+        all_cities = list(cities or c.cities)
+        self._open_run(resume)
+        cities = [city for city in all_cities if not self.journal.city_state(city).done]
+        if resume:
+            print(f"↩ Resuming: {len(all_cities) - len(cities)} cities already done, {len(cities)} to go")
+        try:
+            if c.workers > 1:
+                self._run_pool(cities)
+            else:
+                self._run_serial(cities)
+        finally:
+            self._close_run()
+            self._print_summary()
+            if self.listing_state:
+                self.listing_state.close()
+                self.listing_state = None
+        return sum(self.rows_per_city.values())
+
+    def _run_pool(self, cities):
+        c = self.config
+
+        def on_task_done(task, rows):
+            self.output_sink.flush()
+            print(f"  💾 {task} done: {sum(self.rows_per_city.values())} listings written so far")
+
+        if c.pagination_mode == "url":
+            # Every page is its own task, so the pages of one city can run on several sessions
+            tasks = []
+            for city in cities:
+                resume = self.journal.city_state(city)
+                pages = [p for p in range(1, c.max_pages_per_city + 1) if p not in resume.done_pages]
+                self.city_pages[city] = CityPages(city, pages, seen=resume.listing_ids)
+                tasks += [(city, page) for page in pages]
+            pool = CrawlPool(self.create_driver, partial(self.run_in_session, self.scrape_search_page),
+                             workers=c.workers, per_city_limit=c.max_workers_per_city,
+                             task_city=lambda task: task[0],
+                             on_result=on_task_done, politeness=self.page_politeness)
+        else:
+            tasks = cities
+            pool = CrawlPool(self.create_driver, partial(self.run_in_session, self.scrape_city_with_pagination),
+                             workers=c.workers, per_city_limit=c.max_workers_per_city,
+                             on_result=on_task_done, politeness=self.city_politeness)
+        try:
+            pool.run(tasks)
+        except KeyboardInterrupt:
+            print("\n⚠ Interrupted by user — saving what we have...")
+        finally:
+            pool.stop()
+
+    def _run_serial(self, cities):
+        pending = list(cities)
+        not_before = {}  # city -> monotonic time its circuit breaker allows a retry
+        try:
+            while pending:
+                now = time.monotonic()
+                ready = [city for city in pending if not_before.get(city, 0) <= now]
+                if not ready:
+                    wait = min(not_before[city] for city in pending) - now
+                    print(f"  ⏳ Every remaining city is cooling down, waiting {wait:.0f}s")
+                    time.sleep(wait)
+                    continue
+                city = ready[0]
+                pending.remove(city)
+                try:
+                    with self.metrics.timer("city"):
+                        self.scrape_city_with_pagination(self.driver, city)
+                except RetryLater as e:
+                    not_before[city] = time.monotonic() + e.delay
+                    pending.append(city)
+                self.output_sink.flush()
+                print(f"  💾 {sum(self.rows_per_city.values())} listings written so far")
+                self.sessions.maintain(self.driver)
+
+                # Polite pause between cities
+                if pending:  # Don't sleep after the last city
+                    next_city = pending[0]
+                    if self.config.preload_next_city and not_before.get(next_city, 0) <= time.monotonic():
+                        # The next city's first page loads while we wait
+                        self.rate_limiter.wait()
+                        self.driver.preload(self.start_url(next_city)[1])
+                    sleep_time = self.city_politeness.pause()
+                    print(f"  😴 Slept for {sleep_time:.1f} seconds before next city")
+
+        except KeyboardInterrupt:
+            print("\n⚠ Interrupted by user — saving what we have...")
+
+    def _print_summary(self):
+        c = self.config
+        total_rows = sum(self.rows_per_city.values())
+        listing_state = self.listing_state
+
+        if total_rows:
+            print(f"\n{'='*60}")
+            print(f"SCRAPING COMPLETED!")
+            print(f"{'='*60}")
+            print(f"Total listings scraped: {total_rows}")
+
+            if self.image_downloader:
+                downloader = self.image_downloader
+                store_stats = self.image_store.stats()
+                print(f"Listings with a local image: {sum(self.rows_with_image.values())}")
+                print(f"Images fetched this run: {downloader.downloaded} "
+                      f"({downloader.bytes_downloaded / 1024 / 1024:.1f} MB), "
+                      f"reused from store: {downloader.reused}, failed: {downloader.failed}")
+                print(f"Image store: {store_stats['blobs']} unique files for {store_stats['urls']} URLs "
+                      f"({store_stats['bytes'] / 1024 / 1024:.1f} MB)")
+                print(f"Images saved in: {c.images_folder}")
+
+            if listing_state:
+                counts = listing_state.counts
+                print(f"Changes: {counts['insert']} new, {counts['update']} updated, "
+                      f"{counts['remove']} removed, {counts['unchanged']} unchanged (log: {c.changes_log})")
+
+            if self._sessions is not None:
+                stats = self._sessions.stats
+                print(f"Browser sessions: {stats['opened']} opened, {stats['recycled']} recycled, "
+                      f"cookie banner skipped in {stats['consent_skipped']} (state: {c.browser_state})")
+
+            outcomes = self.rate_limiter.outcomes
+            if outcomes:
+                print(f"Rate limit: ended at {self.rate_limiter.rate:.2f} pages/s; pages "
+                      f"{', '.join(f'{k}: {v}' for k, v in outcomes.most_common())}")
+
+            latency = self.page_latency.summary()
+            if latency:
+                print(f"Page load latency: mean {latency['mean']:.1f}s, p50 {latency['p50']:.1f}s, "
+                      f"max {latency['max']:.1f}s over {latency['pages']} pages")
+                if "bytes_mean" in latency:
+                    blocking = ", ".join(c.block_resources + c.block_url_patterns) or "nothing"
+                    print(f"Transfer per page: {latency['bytes_mean'] / 1024:.0f} KB over "
+                          f"{latency['requests_mean']:.0f} requests, {latency['blocked']} requests blocked "
+                          f"(blocking: {blocking})")
+
+            index = self.listing_index
+            if index.repeats:
+                print(f"Duplicates skipped: {index.repeats} sightings of already written listings, "
+                      f"{index.cross_city()} listings found in more than one city "
+                      f"(index: {len(index)} IDs, {index.nbytes / 1024:.0f} KB)")
+
+            fetcher = self.detail_fetcher
+            if fetcher:
+                print(f"Detail pages: {fetcher.fetched} fetched, {fetcher.cached} still fresh, "
+                      f"{fetcher.failed} failed → {c.details_out}")
+
+            archive = self.page_archive
+            if archive and archive.added:
+                print(f"Pages archived: {archive.added} snapshots, {archive.bytes_written / 1024 ** 2:.1f} MB "
+                      f"compressed ({archive.deduplicated} payloads already stored) in {c.page_archive}")
+
+            self.metrics.print_table()
+            if c.metrics_json or c.metrics_prom:
+                print(f"Metrics: {', '.join(p for p in (c.metrics_json, c.metrics_prom) if p)}")
+
+            print(f"Files saved:")
+            for sink in self.output_sink.sinks:
+                print(f"  📄 {sink.path}")
+
+            # City-wise breakdown
+            print(f"\nCity-wise breakdown:")
+            for city, count in self.rows_per_city.most_common():
+                print(f"  {city}: {count} listings")
+
+        elif listing_state and listing_state.counts["unchanged"]:
+            counts = listing_state.counts
+            print(f"\n✓ No new or updated listings ({counts['unchanged']} unchanged, {counts['remove']} removed)")
+        else:
+            print("\n❌ No results scraped.")
+
+        if self.failed_cities:
+            print(f"\n✗ Gave up on {len(self.failed_cities)} cities (not checkpointed as done, run again "
+                  f"with --resume): {', '.join(f'{city} ({reason})' for city, reason in self.failed_cities.items())}")
+
+    # ---------------- replay ----------------
+    def replay(self, runs=None, cities=None, out=None):
+        """
+        Rebuild output rows from the page archive instead of the site.
+
+        The pages of `runs` (default: the latest archived run) go through the
+        current extraction code again and are written to `out` (default: the
+        configured output files, which are replaced). As in a crawl, every
+        listing is written once, from the first page it was found on. Change is
+        left empty: the listing state isn't replayed. Returns the rows written.
+        """
+        c = self.config
+        archive = PageArchive(c.page_archive)
+        runs = runs or [archive.latest_run()]
+        if runs == [None]:
+            archive.close()
+            raise ValueError(f"No pages archived in {c.page_archive}")
+        image_store = None
+        if c.download_images and os.path.exists(os.path.join(c.images_folder, "index.sqlite")):
+            image_store = ImageStore(c.images_folder)
+        extraction = ExtractionPool(c.extraction_workers, c.extraction_mode, c.html_parser, metrics=self.metrics)
+        sink = open_sink(out, c.output_columns) if out else self.open_output_sink()
+
+        # Several snapshots of a page (embedded JSON, then the scrolled DOM) keep the one with most rows
+        pages = {}
+        started = time.monotonic()
+        try:
+            for snapshot, entries, _ in extraction.map(archive.captures(runs, cities)):
+                key = (snapshot.city, snapshot.page)
+                if key not in pages or len(entries) > len(pages[key][1]):
+                    pages[key] = (snapshot.fetched_at, entries)
+            written = set()
+            rows = 0
+            for (city, page), (fetched_at, entries) in pages.items():
+                for entry in entries:
+                    normalize_listing(entry)
+                    key = entry.get("Listing_ID") or entry.get("Listing_URL") or entry.get("Title")
+                    if not key or key in written:
+                        continue
+                    written.add(key)
+                    entry.update(City=city, Page=page, Scraped_At=fetched_at)
+                    if image_store and entry.get("Image_URL"):
+                        entry["Local_Image_Path"] = image_store.lookup(entry["Image_URL"]) or ""
+                    sink.write(entry)
+                    rows += 1
+        finally:
+            sink.close()
+            extraction.close()
+            archive.close()
+            if image_store:
+                image_store.close()
+        print(f"✓ Replayed {len(pages)} pages of {len(runs)} run(s) into {rows} rows "
+              f"in {time.monotonic() - started:.1f}s")
+        return rows
+
+    # ---------------- scraping ----------------
+    def write_row(self, entry):
+        with self.metrics.timer("write_row"):
+            self.output_sink.write(entry)
+        self.metrics.count("rows_written")
+        if self.listing_state:
+            # Only now is the change on disk and safe to remember (see ListingStateStore.observe)
+            self.listing_state.record(entry, entry.get("Change"))
+        with self._emit_lock:
+            self.rows_per_city[entry.get("City")] += 1
+            if entry.get("Local_Image_Path"):
+                self.rows_with_image[entry.get("City")] += 1
+
+    def emit_row(self, entry, city, page):
+        """
+        Hand a finished row to the output sinks.
+
+        Rows with an image are written once the download completes, so that
+        Local_Image_Path is filled in; everything else is written immediately.
+        Returns the pending download future, or None if the row is already written.
+        """
+        if self.config.download_images and entry.get("Image_URL") and entry.get("Listing_ID"):
+            future = self.image_downloader.submit(entry, city, page)
+            future.add_done_callback(lambda _: self.write_row(entry))
+            return future
+        self.write_row(entry)
+        return None
+
+    def create_driver(self):
+        """A new browser session; its browser opens on first use, primed with the saved cookies"""
+        return self.sessions.new_session()
+
+    def run_in_session(self, scrape_task, driver, task):
+        """Pool task wrapper: count failures against the session and recycle it when due"""
+        try:
+            with self.metrics.timer("page_task"):
+                return scrape_task(driver, task)
+        except RetryLater:
+            raise  # the failed page was already counted
+        except Exception:
+            driver.record_page(ok=False)
+            raise
+        finally:
+            self.sessions.maintain(driver)
+
+    def extract_listings_from_page(self, driver, city, page, fresh_load):
+        """
+        Extract listing rows from the current page.
+
+        The structured search data is tried first: the JSON embedded in the page
+        (only valid right after a full load, later pages are client-side navigations)
+        plus any StaysSearch responses captured since the last page. Cards in the
+        rendered DOM are parsed only when that yields nothing. Either way the
+        browser thread only snapshots the page; a worker process does the parsing.
+        """
+        c = self.config
+        if c.extraction_mode != "dom":
+            blobs = driver.drain_json_responses()
+            html = self.page_source(driver) if fresh_load else None
+            snapshot = self.snapshot_page(driver, city, page, html, blobs, fresh_load)
+            entries, _ = self.extraction.extract(snapshot, "json")
+            if entries:
+                print(f"  ✓ Found {len(entries)} listings in embedded JSON "
+                      f"({snapshot.nbytes / 1024:.0f} KB compressed snapshot)")
+                return entries
+            if c.extraction_mode == "json":
+                return []
+
+        # Scroll to make sure all lazy-loaded cards are rendered, then wait for the count to settle
+        with self.metrics.timer("wait_cards"):
+            driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+            wait_for_cards_stable(driver, c.card_ready_css, timeout=c.page_ready_timeout)
+            driver.execute_script("window.scrollTo(0, 0);")
+
+        snapshot = self.snapshot_page(driver, city, page, self.page_source(driver), fresh_load=False)
+        entries, _ = self.extraction.extract(snapshot, "dom")
+        return entries
+
+    def snapshot_page(self, driver, city, page, html, blobs=(), fresh_load=True, kind="search"):
+        """Compressed snapshot of the current page for the extraction workers, archived if PAGE_ARCHIVE is set"""
+        with self.metrics.timer("snapshot"):
+            snapshot = PageSnapshot.take(city, page, driver.current_url, html, blobs, fresh_load,
+                                         codec=self.config.snapshot_codec)
+        if self.page_archive:
+            with self.metrics.timer("archive"):
+                self.page_archive.add(snapshot, kind)
+        return snapshot
+
+    def save_error_page(self, driver, city, page):
+        """Keep a page that never showed its listings, for debugging"""
+        if self.page_archive:
+            self.snapshot_page(driver, city, page, driver.page_source, kind="error")
+            print(f"  📦 Page archived as an error page in {self.config.page_archive}")
+            return
+        with open(f"error_{city}.html", "w", encoding="utf-8") as fh:
+            fh.write(driver.page_source)
+
+    def page_source(self, driver):
+        """The page's HTML; serializing the DOM is a stage of its own"""
+        with self.metrics.timer("page_source"):
+            return driver.page_source
+
+    def report_page_latency(self, driver, city, page, started):
+        seconds = time.monotonic() - started
+        if self.rate_limiter.report("ok", seconds) == "slow":
+            print(f"  🐢 Slow page, rate limit down to {self.rate_limiter.rate:.2f} pages/s")
+        self.breaker.record_success(city)
+        self.metrics.count("pages")
+        self.metrics.record("page_load", seconds)
+        transfer = driver.take_transfer_stats()
+        self.page_latency.record(city, page, seconds, transfer)
+        print(f"  ⏱ Page {page} ready in {seconds:.1f}s, {transfer['bytes'] / 1024:.0f} KB "
+              f"over {transfer['requests']} requests ({transfer['blocked']} blocked)")
+
+    def save_page_html(self, driver, city, page):
+        """Keep a copy of the page for the offline extraction benchmark"""
+        if not self.config.save_pages_dir:
+            return
+        os.makedirs(self.config.save_pages_dir, exist_ok=True)
+        path = os.path.join(self.config.save_pages_dir, f"{city.lower()}_p{page}.html")
+        with open(path, "w", encoding="utf-8") as fh:
+            fh.write(driver.page_source)
+
+    def open_search_page(self, driver, url, previous_ids=None):
+        """
+        Load a search page and wait for its listings.
+
+        With `previous_ids` the page only counts as loaded once it shows other
+        listings than those. Returns False if no listings showed up.
+        """
+        with self.metrics.timer("navigate"):
+            driver.get(url)
+            if not driver.consent_checked:
+                # Once per browser, and not at all once the saved cookies carry the consent
+                driver.consent_done(accept_cookies_if_present(driver))
+            if not driver.wait_for_css(['div[data-testid="card-container"]',
+                                        'a[href*="/rooms/"]',
+                                        'div[itemprop="itemListElement"]'], timeout=20):
+                driver.record_page(ok=False)
+                return False
+            ready = wait_until_ready(driver, self.config.card_ready_css, previous_ids=previous_ids,
+                                     timeout=self.config.page_ready_timeout)
+            loaded = previous_ids is None or bool(ready)
+            driver.record_page(ok=loaded)
+            return loaded
+
+    def click_to_next(self, driver):
+        """
+        Click "Next" and wait for the new listings.
+
+        Returns (status, started) with status "clicked", "end" (no next button) or "timeout".
+        """
+        previous_ids = listing_ids_on_page(driver)
+
+        # Scroll to bottom to make sure pagination is visible
+        driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+
+        self.rate_limiter.wait()
+        started = time.monotonic()
+        with self.metrics.timer("navigate"):
+            if not click_next_page(driver):
+                return "end", started
+
+            # Wait until the listing set changes and the new cards have settled
+            ready = bool(wait_until_ready(driver, self.config.card_ready_css, previous_ids=previous_ids,
+                                          timeout=self.config.page_ready_timeout))
+        driver.record_page(ok=ready)
+        return ("clicked" if ready else "timeout"), started
+
+    def goto_page(self, driver, city_url, page):
+        """
+        Move the session on to `page`, the page after the current one.
+
+        In "url" mode the page is opened straight from its URL (its pagination
+        link, or planned from the offset) and "Next" is only clicked if that fails.
+        Returns (status, started) with status "loaded", "clicked", "end" or "timeout".
+        """
+        links = pagination_links(driver)
+        if links and last_linked_page(links) < page:
+            return "end", time.monotonic()
+
+        if self.config.pagination_mode == "url":
+            previous_ids = listing_ids_on_page(driver)
+            current_url = driver.current_url
+            self.rate_limiter.wait()
+            started = time.monotonic()
+            if self.open_search_page(driver, url_for_page(city_url, page, links), previous_ids):
+                return "loaded", started
+            print(f"  ⚠ Page {page} didn't load from its URL, falling back to the Next button")
+            self.rate_limiter.wait()
+            if not self.open_search_page(driver, current_url):
+                return "timeout", started
+
+        return self.click_to_next(driver)
+
+    def click_to_page(self, driver, city_url, page):
+        """Fallback for a page whose URL didn't load: open page 1 and click "Next" up to `page`"""
+        self.rate_limiter.wait()
+        if not self.open_search_page(driver, city_url):
+            return "timeout"
+        for _ in range(page - 1):
+            self.page_politeness.pause()
+            status, _ = self.click_to_next(driver)
+            if status != "clicked":
+                return status
+        return "clicked"
+
+    def process_page(self, progress, page, entries):
+        """
+        Emit the listings of one page that are new for the city and checkpoint the page.
+
+        Returns (new_listings, known_unchanged, rows_written).
+        """
+        city = progress.city
+        self.metrics.count("listings_found", len(entries))
+        new_listings_count = 0
+        known_unchanged = 0
+        rows = 0
+        page_ids = []
+        page_downloads = []
+        for entry in entries:
+            # The integer Listing_ID keeps dedup stable between JSON rows and card rows
+            params = normalize_listing(entry)
+            key = entry.get("Listing_ID") or entry.get("Listing_URL") or entry.get("Title")
+            # Every sighting is recorded; a listing is written once per run, by the first city that finds it
+            first_in_run = self.listing_index.claim(key, city, page) if isinstance(key, int) else True
+
+            # New for the city: counted even if another city wrote it, since this decides where the city ends
+            if key and progress.claim(key):
+                page_ids.append(key)
+                new_listings_count += 1
+                if not first_in_run:
+                    if self.listing_state:
+                        self.listing_state.touch(key)
+                    continue
+                entry["City"] = city
+                entry["Page"] = page
+                entry["Scraped_At"] = datetime.utcnow().isoformat()
+                if self.url_params_sink and params:
+                    self.url_params_sink.write({"Listing_ID": entry["Listing_ID"], "City": city, "Page": page,
+                                                "Scraped_At": entry["Scraped_At"], "Params": params})
+
+                if self.listing_state:
+                    change = self.listing_state.observe(entry)
+                    if change == "unchanged":
+                        known_unchanged += 1
+                        continue
+                    entry["Change"] = change
+                page_downloads.append(self.emit_row(entry, city, page))
+                rows += 1
+                if self.detail_fetcher and isinstance(key, int):
+                    # An updated listing's details may have changed too; a new one has none cached
+                    self.detail_fetcher.submit(key, force=entry.get("Change") == "update")
+
+        progress.add_rows(rows)
+
+        # Checkpoint the page once all of its rows have reached the output files
+        self.journal.record_page(city, page, page_ids, page_downloads)
+
+        print(f"  ✓ Found {len(entries)} cards, {new_listings_count} new listings")
+        if self.listing_state:
+            print(f"  ♻ {known_unchanged} already known and unchanged")
+        return new_listings_count, known_unchanged, rows
+
+    def city_failed(self, driver, city, reason):
+        """
+        A page of `city` didn't load or came back empty: slow down, and have the
+        city retried later (raises RetryLater) unless its circuit breaker gave up.
+
+        Returning means it gave up: the caller must leave the city without
+        finish_city(), so the journal keeps it unfinished for --resume and no
+        listing of it is taken for removed.
+        """
+        if looks_blocked(driver, self.config.card_ready_css):
+            reason = "blocked"
+        self.rate_limiter.report(reason)
+        delay = self.breaker.record_failure(city)
+        if delay is None:
+            print(f"  ✗ {city}: {reason}, giving up after {self.breaker.max_trips} retries "
+                  f"(rate limit {self.rate_limiter.rate:.2f} pages/s)")
+            self.failed_cities[city] = reason
+            return
+        print(f"  ⏸ {city}: {reason}, retrying in {delay:.0f}s (rate limit {self.rate_limiter.rate:.2f} pages/s)")
+        raise RetryLater(delay, reason)
+
+    def finish_city(self, city, city_rows, pages, complete):
+        """Close out a city: checkpoint it and report listings that disappeared"""
+        self.journal.finish_city(city)
+        self.write_metrics()  # a snapshot per finished city, for watching a long run
+        progress = self.city_pages.get(city)
+        # Without a single page read this run, nothing of the city was seen again: no removals to tell
+        if self.listing_state and progress and progress.pages_processed:
+            removed = self.listing_state.finish_city(city, self.run_started_at, complete,
+                                                    self.config.stale_after_days)
+            if removed:
+                print(f"  🗑 {len(removed)} listings no longer listed for {city}")
+
+        print(f"\n  🎯 Final results for {city}: {city_rows} unique listings across {pages} pages")
+
+    def start_url(self, city):
+        """(page, url) a city's serial crawl starts at: page 1, or where the previous run stopped"""
+        city_url = build_city_url_from_template(self.config.template_url, city)
+        start_page, start_url = self.journal.city_state(city).resume_page()
+        if start_page > 1 and not start_url:
+            if self.config.pagination_mode == "url":
+                start_url = page_url(city_url, start_page)
+            else:
+                start_page = 1  # page URL unknown: start over, already written listings are still skipped
+        return (start_page, start_url) if start_page > 1 else (1, city_url)
+
+    def scrape_city_with_pagination(self, driver, city):
+        """Scrape all available pages for a single city, one page after the other"""
+        city_url = build_city_url_from_template(self.config.template_url, city)
+        print(f"\n{'='*50}")
+        print(f"CITY: {city}")
+        print(f"{'='*50}")
+
+        # Pick up where a previous run stopped (nothing to resume on a fresh run)
+        resume = self.journal.city_state(city)
+        start_page, open_url = self.start_url(city)
+        if start_page > 1:
+            print(f"  ↩ Resuming at page {start_page} ({len(resume.listing_ids)} listings already saved)")
+        print("Opening:", open_url)
+
+        self.rate_limiter.wait()
+        started = time.monotonic()
+        if self.open_search_page(driver, open_url):
+            self.report_page_latency(driver, city, start_page, started)
+            self.journal.record_nav(city, start_page, driver.current_url)
+            print("  ✓ Initial listings loaded")
+        else:
+            print("  ⚠ Timeout waiting for listings")
+            self.save_error_page(driver, city, start_page)
+            self.city_failed(driver, city, "timeout")
+            return 0
+
+        # Kept across retries: listings of pages not yet checkpointed are still skipped
+        progress = self.city_pages.setdefault(city, CityPages(city, seen=resume.listing_ids))
+        page_count = start_page - 1
+        fresh_load = True  # page came from driver.get, so its embedded JSON is current
+        complete = False  # True once pagination ran out naturally (needed to detect removals)
+
+        while page_count < self.config.max_pages_per_city:
+            page_count += 1
+            print(f"\n  📄 Processing page {page_count} for {city}...")
+
+            # Get current listings
+            loaded_at = time.monotonic()
+            self.save_page_html(driver, city, page_count)
+            entries = self.extract_listings_from_page(driver, city, page_count, fresh_load=fresh_load)
+
+            if not entries:
+                print("  ⚠ No cards found on this page")
+                self.city_failed(driver, city, "empty")
+                return progress.rows_written  # gave up: the city stays unfinished
+
+            new_listings_count, known_unchanged, _ = self.process_page(progress, page_count, entries)
+            print(f"  📊 Total listings written for {city}: {progress.rows_written}")
+
+            # Check if we've reached the maximum pages or no new listings
+            if page_count >= self.config.max_pages_per_city:
+                print(f"  🛑 Reached maximum pages limit ({self.config.max_pages_per_city}) for {city}")
+                break
+
+            if new_listings_count == 0:
+                print(f"  🛑 No new listings found on page {page_count}, stopping pagination")
+                complete = True
+                break
+
+            if self.listing_state and known_unchanged / new_listings_count >= self.config.known_stop_ratio:
+                print(f"  🛑 {known_unchanged}/{new_listings_count} listings on page {page_count} "
+                      f"already known, stopping pagination")
+                break
+
+            # Try to go to next page
+            print(f"  🔄 Attempting to go to page {page_count + 1}...")
+            # Extracting this page counted towards the pause: the next request waits for whichever is longer
+            self.page_politeness.pause(elapsed=time.monotonic() - loaded_at)
+            status, started = self.goto_page(driver, city_url, page_count + 1)
+            if status == "end":
+                print("  🛑 No more pages available or next button not found")
+                complete = True
+                break
+            if status == "timeout":
+                print(f"  ⚠ Timeout waiting for page {page_count + 1} to load")
+                self.city_failed(driver, city, "timeout")
+                return progress.rows_written  # gave up: the city stays unfinished
+
+            self.report_page_latency(driver, city, page_count + 1, started)
+            self.journal.record_nav(city, page_count + 1, driver.current_url)
+            print(f"  ✓ Page {page_count + 1} loaded successfully")
+            fresh_load = status == "loaded"
+
+        self.finish_city(city, progress.rows_written, page_count, complete)
+        return progress.rows_written
+
+    def scrape_planned_page(self, driver, progress, page):
+        """Open one page of a city straight from its planned URL and emit its listings"""
+        city = progress.city
+        city_url = build_city_url_from_template(self.config.template_url, city)
+        print(f"\n  📄 Processing page {page} for {city}...")
+
+        self.rate_limiter.wait()
+        started = time.monotonic()
+        loaded = self.open_search_page(driver, page_url(city_url, page, progress.page_size))
+        fresh_load = True
+        if not loaded and page > 1:
+            print(f"  ⚠ Page {page} didn't load from its URL, clicking through from page 1")
+            status = self.click_to_page(driver, city_url, page)
+            if status == "end":
+                print(f"  🛑 {city} has no page {page}")
+                progress.stop_after(page - 1, complete=True)
+                return 0
+            loaded = status == "clicked"
+            fresh_load = False
+        if not loaded:
+            print(f"  ⚠ Timeout waiting for page {page} of {city}")
+            self.city_failed(driver, city, "timeout")
+            progress.stop_after(page - 1)
+            return 0
+
+        self.report_page_latency(driver, city, page, started)
+        self.journal.record_nav(city, page, driver.current_url)
+        links = pagination_links(driver)
+        progress.page_size = page_size_from_links(links, progress.page_size)
+
+        self.save_page_html(driver, city, page)
+        entries = self.extract_listings_from_page(driver, city, page, fresh_load=fresh_load)
+        if not entries:
+            print("  ⚠ No cards found on this page")
+            self.city_failed(driver, city, "empty")
+            progress.stop_after(page - 1)
+            return 0
+
+        new_listings_count, known_unchanged, rows = self.process_page(progress, page, entries)
+        if new_listings_count == 0:
+            print(f"  🛑 No new listings found on page {page}, {city} ends here")
+            progress.stop_after(page, complete=True)
+        elif self.listing_state and known_unchanged / new_listings_count >= self.config.known_stop_ratio:
+            print(f"  🛑 {known_unchanged}/{new_listings_count} listings on page {page} "
+                  f"already known, skipping the rest of {city}")
+            progress.stop_after(page)
+        elif links and last_linked_page(links) <= page:
+            print(f"  🛑 Page {page} is the last page of {city}")
+            progress.stop_after(page, complete=True)
+        return rows
+
+    def scrape_search_page(self, driver, task):
+        """Pool task: one (city, page) of the search results"""
+        city, page = task
+        progress = self.city_pages[city]
+        rows = 0
+        if progress.wanted(page):
+            rows = self.scrape_planned_page(driver, progress, page)
+        # A city its breaker gave up on stays unfinished, to be picked up again by --resume
+        if progress.page_done(page) and city not in self.failed_cities:
+            self.finish_city(city, progress.rows_written, progress.last_page or self.config.max_pages_per_city,
+                             progress.complete)
+        return rows
@@ -0,0 +1,272 @@
+# sessions.py
+"""
+Warm, reusable browser sessions.
+
+A `Session` is a `BrowserPage` that outlives the browser tab behind it: the
+`SessionManager` can recycle the tab (after `recycle_after` pages, or after
+`max_failures` failed loads in a row) and the next call transparently opens a
+fresh one. Cookies are kept in a small JSON state file and loaded into every new
+tab, together with whether the cookie banner was already accepted, so consent
+is handled once per state file instead of once per city.
+
+A session can also `preload(url)` in the background, e.g. the next city's
+first page during the pause between cities; `get(url)` on the same URL then
+returns as soon as that load is done.
+"""
+import json
+import os
+import threading
+import time
+from datetime import datetime
+
+# Fields a saved cookie keeps; both CDP Network.setCookies and Playwright accept these
+COOKIE_FIELDS = ("name", "value", "domain", "path", "expires", "httpOnly", "secure", "sameSite")
+
+
+def portable_cookies(cookies, now=None):
+    """Cookies that can be saved and loaded into either engine: no session or expired ones"""
+    now = time.time() if now is None else now
+    kept = []
+    for cookie in cookies:
+        expires = cookie.get("expires", -1)
+        if expires is None or expires <= now:
+            continue
+        kept.append({k: cookie[k] for k in COOKIE_FIELDS if k in cookie})
+    return kept
+
+
+class Session:
+    """
+    One logical browser session handed to the scraping code in place of a page.
+
+    All page calls are forwarded to the current tab, which is opened on first
+    use. Health is tracked per session: pages loaded since the tab was opened
+    and failed page loads in a row.
+    """
+
+    def __init__(self, manager, name):
+        self.manager = manager
+        self.name = name
+        self.page = None
+        self.pages_loaded = 0
+        self.failures = 0
+        self.opened_at = None
+        self.consent_checked = False  # cookie banner handled (or known not to be needed) in this tab
+        self._preload = None  # (url, thread, errors)
+
+    def __repr__(self):
+        return (f"Session({self.name!r}, pages_loaded={self.pages_loaded}, failures={self.failures}, "
+                f"open={self.page is not None})")
+
+    # ---------------- health ----------------
+    def record_page(self, ok):
+        """Count one page load (or next-page click) and whether its listings showed up"""
+        self.pages_loaded += 1
+        self.failures = 0 if ok else self.failures + 1
+
+    @property
+    def healthy(self):
+        return self.failures < self.manager.max_failures
+
+    def consent_done(self, accepted):
+        """The cookie banner was checked in this tab; `accepted` if it was clicked away"""
+        self.consent_checked = True
+        if accepted:
+            self.manager.remember_consent(self.page)
+
+    # ---------------- tab lifecycle ----------------
+    def _current(self):
+        self._finish_preload()
+        if self.page is None:
+            self.page = self.manager.open_page(self)
+            self.opened_at = time.monotonic()
+            self.pages_loaded = 0
+            self.failures = 0
+        return self.page
+
+    def preload(self, url):
+        """Start loading `url` in the background; a later get(url) picks up the loaded page"""
+        page = self._current()
+        errors = []
+
+        def load():
+            try:
+                page.get(url)
+            except Exception as e:
+                errors.append(e)
+
+        thread = threading.Thread(target=load, name=f"{self.name}-preload", daemon=True)
+        self._preload = (url, thread, errors)
+        thread.start()
+
+    def _finish_preload(self):
+        """Wait for a running preload; returns the URL it loaded, or None"""
+        if self._preload is None:
+            return None
+        url, thread, errors = self._preload
+        self._preload = None
+        thread.join()
+        if errors:
+            print(f"  ⚠ [{self.name}] Preloading {url} failed: {errors[0]}")
+            return None
+        return url
+
+    def recycle(self):
+        """Close the tab (saving its cookies if it was healthy); the next call opens a new one"""
+        self._finish_preload()
+        if self.page is None:
+            return
+        page, self.page = self.page, None
+        if self.healthy:
+            self.manager.save_cookies(page)
+        try:
+            page.quit()
+        except Exception:
+            pass
+        self.consent_checked = False
+
+    # ---------------- BrowserPage ----------------
+    def get(self, url):
+        if self._finish_preload() == url:
+            return
+        self._current().get(url)
+
+    @property
+    def page_source(self):
+        return self._current().page_source
+
+    @property
+    def current_url(self):
+        return self._current().current_url
+
+    def execute_script(self, script):
+        return self._current().execute_script(script)
+
+    def wait_for_css(self, selectors, timeout):
+        return self._current().wait_for_css(selectors, timeout)
+
+    def find_clickable(self, xpath, timeout):
+        return self._current().find_clickable(xpath, timeout)
+
+    def drain_json_responses(self):
+        return self._current().drain_json_responses()
+
+    def take_transfer_stats(self):
+        return self._current().take_transfer_stats()
+
+    def cookies(self):
+        return self._current().cookies()
+
+    def add_cookies(self, cookies):
+        self._current().add_cookies(cookies)
+
+    def quit(self):
+        self.recycle()
+        self.manager.forget(self)
+
+
+class SessionManager:
+    """
+    Hands out `Session`s on one engine and keeps the state they share.
+
+    The state file holds the cookies of the last healthy tab and whether the
+    cookie banner was accepted; it is written whenever a healthy tab closes.
+    """
+
+    def __init__(self, engine, state_path=None, recycle_after=50, max_failures=3):
+        self.engine = engine
+        self.state_path = state_path
+        self.recycle_after = recycle_after
+        self.max_failures = max(1, max_failures)
+        self.sessions = []
+        self.stats = {"opened": 0, "recycled": 0, "consent_skipped": 0}
+        self._cookies = []
+        self._consent = False
+        self._count = 0
+        self._lock = threading.Lock()
+        self._load_state()
+
+    def _load_state(self):
+        if not self.state_path:
+            return
+        try:
+            with open(self.state_path, encoding="utf-8") as fh:
+                state = json.load(fh)
+        except (OSError, ValueError):
+            return
+        self._cookies = portable_cookies(state.get("cookies", []))
+        # Consent only carries over together with the cookies that record it
+        self._consent = bool(state.get("consent")) and bool(self._cookies)
+
+    def _save_state(self):
+        if not self.state_path:
+            return
+        os.makedirs(os.path.dirname(self.state_path) or ".", exist_ok=True)
+        tmp_path = self.state_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as fh:
+            json.dump({"saved_at": datetime.utcnow().isoformat(), "consent": self._consent,
+                       "cookies": self._cookies}, fh, ensure_ascii=False)
+        os.replace(tmp_path, self.state_path)
+
+    def new_session(self):
+        with self._lock:
+            self._count += 1
+            session = Session(self, f"session-{self._count}")
+            self.sessions.append(session)
+        return session
+
+    def open_page(self, session):
+        """Open a tab for `session` and prime it with the saved cookies"""
+        page = self.engine.new_page()
+        with self._lock:
+            cookies, consent = list(self._cookies), self._consent
+            self.stats["opened"] += 1
+        if cookies:
+            try:
+                page.add_cookies(cookies)
+            except Exception as e:
+                print(f"  ⚠ [{session.name}] Couldn't restore cookies: {e}")
+                consent = False
+        if consent:
+            session.consent_checked = True
+            with self._lock:
+                self.stats["consent_skipped"] += 1
+        return page
+
+    def save_cookies(self, page, consent=False):
+        try:
+            cookies = portable_cookies(page.cookies())
+        except Exception:
+            return
+        with self._lock:
+            if cookies:
+                self._cookies = cookies
+            self._consent = (self._consent or consent) and bool(self._cookies)
+            self._save_state()
+
+    def remember_consent(self, page):
+        """The banner was accepted in `page`: keep its consent cookie for every later tab"""
+        self.save_cookies(page, consent=True)
+
+    def maintain(self, session):
+        """Between tasks: recycle the session's tab if it served enough pages or keeps failing"""
+        if session.page is None:
+            return
+        if session.pages_loaded >= self.recycle_after > 0 or not session.healthy:
+            reason = "unhealthy" if not session.healthy else f"{session.pages_loaded} pages"
+            print(f"  ♻ [{session.name}] Recycling browser session ({reason})")
+            session.recycle()
+            with self._lock:
+                self.stats["recycled"] += 1
+
+    def forget(self, session):
+        with self._lock:
+            if session in self.sessions:
+                self.sessions.remove(session)
+
+    def close(self):
+        """Close every open session, saving the state of the healthy ones"""
+        with self._lock:
+            sessions = list(self.sessions)
+        for session in sessions:
+            session.quit()
@@ -0,0 +1,405 @@
+# sinks.py
+"""
+Streaming, append-only output writers.
+
+Rows are written the moment they are final instead of being collected in a
+list and dumped at the end, so memory stays flat however long the crawl runs
+and a crash leaves everything written so far on disk. Every sink is
+thread-safe (rows arrive from browser workers and image-download callbacks)
+and fsyncs its file at most every `fsync_interval` seconds.
+
+`PartitionedParquetSink` writes a Parquet dataset split by City and scrape
+date for analytics; `read_dataset()` reads back just the cities or days asked for.
+"""
+import csv
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from urllib.parse import quote
+
+
+class RowSink:
+    """Base class: write(row) / flush() / close()"""
+
+    def __init__(self, path, fsync_interval=5.0):
+        self.path = path
+        self.fsync_interval = fsync_interval
+        self.rows_written = 0
+        self._lock = threading.Lock()
+        self._last_sync = time.monotonic()
+        self._fh = None
+
+    def _open(self, mode="a", newline=None):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._fh = open(self.path, mode, encoding="utf-8", newline=newline)
+
+    def _maybe_sync(self, force=False):
+        if self._fh is None:
+            return
+        now = time.monotonic()
+        if force or now - self._last_sync >= self.fsync_interval:
+            self._fh.flush()
+            os.fsync(self._fh.fileno())
+            self._last_sync = now
+
+    def write(self, row):
+        with self._lock:
+            self._write(row)
+            self.rows_written += 1
+            self._maybe_sync()
+
+    def _write(self, row):
+        raise NotImplementedError
+
+    def flush(self):
+        with self._lock:
+            self._maybe_sync(force=True)
+
+    def close(self):
+        with self._lock:
+            self._close()
+
+    def _close(self):
+        if self._fh is not None:
+            self._maybe_sync(force=True)
+            self._fh.close()
+            self._fh = None
+
+
+class CsvSink(RowSink):
+    """CSV with a fixed column order; unknown keys are dropped, missing ones left empty"""
+
+    def __init__(self, path, columns, append=False, fsync_interval=5.0):
+        super().__init__(path, fsync_interval)
+        self.columns = list(columns)
+        write_header = not (append and os.path.exists(path) and os.path.getsize(path) > 0)
+        self._open("a" if append else "w", newline="")
+        self._writer = csv.DictWriter(self._fh, fieldnames=self.columns, extrasaction="ignore")
+        if write_header:
+            self._writer.writeheader()
+
+    def _write(self, row):
+        self._writer.writerow(row)
+
+
+class JsonLinesSink(RowSink):
+    """One JSON object per line"""
+
+    def __init__(self, path, append=False, fsync_interval=5.0):
+        super().__init__(path, fsync_interval)
+        self._open("a" if append else "w")
+
+    def _write(self, row):
+        self._fh.write(json.dumps(row, ensure_ascii=False, default=str) + "\n")
+
+
+class JsonArraySink(RowSink):
+    """
+    A pretty-printed JSON array (same shape as the old json.dump output),
+    written element by element. The closing bracket is added on close().
+
+    With append=True an existing array (closed or cut short by a crash) is
+    reopened and continued.
+    """
+
+    def __init__(self, path, append=False, fsync_interval=5.0):
+        super().__init__(path, fsync_interval)
+        if append and os.path.exists(path) and os.path.getsize(path) > 0:
+            self._reopen()
+        else:
+            self._open("w")
+            self._fh.write("[")
+
+    def _reopen(self):
+        with open(self.path, "rb+") as fh:
+            fh.seek(0, os.SEEK_END)
+            end = fh.tell()
+            # Only the tail can hold the closing bracket / trailing whitespace
+            fh.seek(max(0, end - 64))
+            tail = fh.read()
+            stripped = tail.rstrip()
+            if stripped.endswith(b"]"):
+                stripped = stripped[:-1].rstrip()
+            fh.truncate(end - len(tail) + len(stripped))
+            has_rows = not stripped.endswith(b"[")
+        self._open("a")
+        # Pretend rows were written so the next one gets a leading comma
+        self.rows_written = 1 if has_rows else 0
+
+    def _write(self, row):
+        item = json.dumps(row, ensure_ascii=False, indent=2, default=str)
+        prefix = "," if self.rows_written else ""
+        self._fh.write(prefix + "\n  " + item.replace("\n", "\n  "))
+
+    def _close(self):
+        if self._fh is not None:
+            self._fh.write("\n]\n" if self.rows_written else "]\n")
+        super()._close()
+
+
+class ParquetSink(RowSink):
+    """
+    Parquet written in row groups of `row_group_size` rows (needs pyarrow).
+
+    Only one row group is buffered at a time; all columns are stored as strings.
+    """
+
+    def __init__(self, path, columns, row_group_size=5000, fsync_interval=5.0):
+        super().__init__(path, fsync_interval)
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("Parquet output needs pyarrow: pip install pyarrow")
+        self._pa = pa
+        self.columns = list(columns)
+        self.row_group_size = row_group_size
+        self._schema = pa.schema([(c, pa.string()) for c in self.columns])
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._writer = pq.ParquetWriter(path, self._schema, compression="zstd")
+        self._buffer = []
+
+    def _write(self, row):
+        self._buffer.append(row)
+        if len(self._buffer) >= self.row_group_size:
+            self._flush_group()
+
+    def _flush_group(self):
+        if not self._buffer:
+            return
+        data = {c: [None if r.get(c) in (None, "") else str(r.get(c)) for r in self._buffer]
+                for c in self.columns}
+        self._writer.write_table(self._pa.table(data, schema=self._schema))
+        self._buffer = []
+
+    def _maybe_sync(self, force=False):
+        # Parquet data only reaches the file per row group, nothing to fsync in between
+        pass
+
+    def _close(self):
+        if self._writer is not None:
+            self._flush_group()
+            self._writer.close()
+            self._writer = None
+
+
+# ---------------- partitioned dataset ----------------
+# Arrow types of the known output columns; anything else is stored as it was scraped,
+# as a string (Rating and Reviews too: "New", "4,9" are for cleaning.py to interpret).
+# "dictionary" columns hold few distinct values and are dictionary-encoded in Arrow
+# (and read back as pandas categoricals), not just in the Parquet pages.
+DATASET_TYPES = {
+    "Rating": "dictionary",
+    "Listing_ID": "uint",
+    "Page": "int",
+    "Scraped_At": "timestamp",
+    "Price": "dictionary",
+    "Change": "dictionary",
+}
+PARTITION_COLUMNS = ("City", "scrape_date")
+
+
+def _to_number(cast):
+    def convert(value):
+        try:
+            return cast(value)
+        except (TypeError, ValueError):
+            return None
+    return convert
+
+
+def _to_timestamp(value):
+    if isinstance(value, datetime):
+        return value
+    try:
+        return datetime.fromisoformat(str(value))
+    except ValueError:
+        return None
+
+
+CONVERTERS = {
+    "int": _to_number(int),
+    "uint": _to_number(int),
+    "timestamp": _to_timestamp,
+    "dictionary": str,
+    "string": str,
+}
+
+
+def partition_dir(root, city, scrape_date):
+    """Hive-style directory of one city and day: root/City=<city>/scrape_date=<YYYY-MM-DD>"""
+    return os.path.join(root, f"City={quote(city or 'unknown', safe=' ')}", f"scrape_date={scrape_date}")
+
+
+class PartitionedParquetSink:
+    """
+    A Parquet dataset partitioned by city and scrape date (needs pyarrow):
+
+        root/City=Lahore/scrape_date=2026-10-16/part-<run>.parquet
+
+    Every run adds its own part file to each partition it touches, so history
+    accumulates without rewriting anything, and a reader filtering on City or
+    scrape_date only opens the matching directories. Columns are typed (see
+    DATASET_TYPES), low-cardinality ones dictionary-encoded, all zstd-compressed.
+
+    A part file is named `_part-...` while it is written (dataset readers skip
+    names starting with "_") and renamed when the sink closes. A crashed run
+    leaves unreadable `_part` files; its rows are still in the CSV / JSON Lines
+    output and can be re-added with `python -m airbnb_scraper export`.
+    """
+
+    def __init__(self, root, columns, row_group_size=5000, compression="zstd"):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("Dataset output needs pyarrow: pip install pyarrow")
+        self._pa = pa
+        self._pq = pq
+        self.path = root
+        self.row_group_size = row_group_size
+        self.compression = compression
+        self.columns = [c for c in columns if c not in PARTITION_COLUMNS]
+        self.rows_written = 0
+        self._kinds = {c: DATASET_TYPES.get(c, "string") for c in self.columns}
+        arrow_types = {
+            "int": pa.int16(), "uint": pa.uint64(), "string": pa.string(),
+            "timestamp": pa.timestamp("us"), "dictionary": pa.dictionary(pa.int32(), pa.string()),
+        }
+        self._schema = pa.schema([(c, arrow_types[self._kinds[c]]) for c in self.columns])
+        self._part_name = f"part-{datetime.utcnow():%Y%m%dT%H%M%S}-{os.getpid()}.parquet"
+        self._partitions = {}  # (city, date) -> [writer, temp path, buffered rows]
+        self._lock = threading.Lock()
+
+    def write(self, row):
+        scraped_at = str(row.get("Scraped_At") or "")
+        key = (row.get("City") or "", scraped_at[:10] or datetime.utcnow().strftime("%Y-%m-%d"))
+        with self._lock:
+            partition = self._partitions.get(key)
+            if partition is None:
+                partition = self._partitions[key] = self._open_partition(*key)
+            partition[2].append(row)
+            if len(partition[2]) >= self.row_group_size:
+                self._flush_partition(partition)
+            self.rows_written += 1
+
+    def _open_partition(self, city, scrape_date):
+        directory = partition_dir(self.path, city, scrape_date)
+        os.makedirs(directory, exist_ok=True)
+        tmp_path = os.path.join(directory, "_" + self._part_name)
+        writer = self._pq.ParquetWriter(tmp_path, self._schema, compression=self.compression)
+        return [writer, tmp_path, []]
+
+    def _flush_partition(self, partition):
+        writer, _, rows = partition
+        if not rows:
+            return
+        data = {}
+        for c in self.columns:
+            convert = CONVERTERS[self._kinds[c]]
+            data[c] = [None if r.get(c) in (None, "") else convert(r[c]) for r in rows]
+        writer.write_table(self._pa.table(data, schema=self._schema))
+        partition[2] = []
+
+    def flush(self):
+        """
+        Nothing to do: the part files are unreadable until close() anyway, and
+        flushing after every page task would cut them into tiny row groups.
+        """
+
+    def close(self):
+        with self._lock:
+            for partition in self._partitions.values():
+                self._flush_partition(partition)
+                writer, tmp_path, _ = partition
+                writer.close()
+                os.replace(tmp_path, os.path.join(os.path.dirname(tmp_path), self._part_name))
+            self._partitions = {}
+
+
+def read_dataset(root, cities=None, dates=None, columns=None):
+    """
+    Read a partitioned dataset into a pyarrow Table, opening only the
+    partitions of `cities` / `dates` (YYYY-MM-DD strings) if given.
+    """
+    try:
+        import pyarrow.dataset as ds
+    except ImportError:
+        raise RuntimeError("Reading the dataset needs pyarrow: pip install pyarrow")
+    dataset = ds.dataset(root, format="parquet", partitioning="hive")
+    condition = None
+    if cities:
+        condition = ds.field("City").isin(list(cities))
+    if dates:
+        in_dates = ds.field("scrape_date").cast("string").isin([str(d) for d in dates])
+        condition = in_dates if condition is None else condition & in_dates
+    return dataset.to_table(columns=columns, filter=condition)
+
+
+class MultiSink:
+    """Fans every row out to several sinks"""
+
+    def __init__(self, sinks):
+        self.sinks = list(sinks)
+
+    def write(self, row):
+        for sink in self.sinks:
+            sink.write(row)
+
+    def flush(self):
+        for sink in self.sinks:
+            sink.flush()
+
+    def close(self):
+        for sink in self.sinks:
+            sink.close()
+
+
+# ---------------- by file extension ----------------
+def open_sink(path, columns, append=False):
+    """
+    A sink for `path`, chosen by its extension (.csv, .json, .jsonl, .parquet);
+    a path without extension is a partitioned dataset directory.
+    """
+    ext = os.path.splitext(path.rstrip("/\\"))[1].lower()
+    if not ext:
+        return PartitionedParquetSink(path, columns)
+    if ext == ".csv":
+        return CsvSink(path, columns, append=append)
+    if ext == ".json":
+        return JsonArraySink(path, append=append)
+    if ext == ".jsonl":
+        return JsonLinesSink(path, append=append)
+    if ext == ".parquet":
+        return ParquetSink(path, columns)
+    raise ValueError(f"Unknown output format {ext!r}, expected .csv, .json, .jsonl or .parquet")
+
+
+def read_rows(path):
+    """Yield the rows of an output file (or dataset directory) written by one of the sinks"""
+    ext = os.path.splitext(path)[1].lower()
+    if os.path.isdir(path):
+        for batch in read_dataset(path).to_batches():
+            yield from batch.to_pylist()
+    elif ext == ".csv":
+        with open(path, newline="", encoding="utf-8") as fh:
+            yield from csv.DictReader(fh)
+    elif ext == ".json":
+        with open(path, encoding="utf-8") as fh:
+            yield from json.load(fh)
+    elif ext == ".jsonl":
+        with open(path, encoding="utf-8") as fh:
+            for line in fh:
+                if line.strip():
+                    yield json.loads(line)
+    elif ext == ".parquet":
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("Reading Parquet needs pyarrow: pip install pyarrow")
+        for batch in pq.ParquetFile(path).iter_batches():
+            yield from batch.to_pylist()
+    else:
+        raise ValueError(f"Unknown input format {ext!r}, expected .csv, .json, .jsonl or .parquet")
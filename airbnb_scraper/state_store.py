@@ -0,0 +1,138 @@
+# state_store.py
+"""
+Persistent per-listing state for incremental re-crawls.
+
+Every listing ever seen is kept in SQLite, keyed by Listing_ID, with its
+first/last-seen times and a fingerprint of the fields that matter. Each run
+observes rows against that state and only inserts, updates and removals are
+reported (and appended to a JSON Lines change log), so the caller can stop
+paginating once a city's pages are mostly made of known, unchanged listings.
+"""
+import hashlib
+import json
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+
+# Fields that define a listing's content; URLs carry volatile tracking params and are left out
+FINGERPRINT_FIELDS = ("Title", "Price", "Rating", "Reviews", "Image_URL")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS listings (
+    listing_id  TEXT PRIMARY KEY,
+    city        TEXT,
+    fingerprint TEXT NOT NULL,
+    first_seen  TEXT NOT NULL,
+    last_seen   TEXT NOT NULL,
+    removed_at  TEXT,
+    data        TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS listings_city_seen ON listings (city, last_seen);
+"""
+
+
+def fingerprint(row):
+    payload = "\x1f".join(str(row.get(f) or "").strip() for f in FINGERPRINT_FIELDS)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+class ListingStateStore:
+    def __init__(self, path, changes_path=None):
+        self.path = path
+        self.changes_path = changes_path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.executescript(SCHEMA)
+        self._db.commit()
+        self.counts = {"insert": 0, "update": 0, "unchanged": 0, "remove": 0}
+
+    def _log(self, op, listing_id, city, row=None):
+        self.counts[op] += 1
+        if not self.changes_path or op == "unchanged":
+            return
+        event = {"op": op, "Listing_ID": listing_id, "City": city,
+                 "at": datetime.utcnow().isoformat(), "row": row}
+        with open(self.changes_path, "a", encoding="utf-8") as fh:
+            fh.write(json.dumps(event, ensure_ascii=False) + "\n")
+
+    def observe(self, row):
+        """
+        Compare a scraped row with the stored state; returns "insert", "update" or "unchanged".
+
+        Known listings are marked as seen right away. Inserts and updates
+        are only stored by `record()`, once the row has reached the output
+        files, so a crash in between can't leave a change that was never written
+        looking "unchanged" to the next run. Rows without a Listing_ID cannot be
+        tracked and always count as inserts.
+        """
+        listing_id = row.get("Listing_ID")
+        if not listing_id:
+            return "insert"
+        fp = fingerprint(row)
+        with self._lock:
+            prev = self._db.execute(
+                "SELECT fingerprint, removed_at FROM listings WHERE listing_id = ?", (str(listing_id),)
+            ).fetchone()
+            if prev is None:
+                return "insert"
+            # Seen now either way, so finish_city() doesn't take a listing whose row is still pending for removed
+            self._touch(listing_id)
+            # A listing coming back after being marked removed is reported as an update
+            if prev[0] != fp or prev[1] is not None:
+                return "update"
+            self._log("unchanged", str(listing_id), row.get("City"))
+        return "unchanged"
+
+    def record(self, row, op):
+        """Store an insert or update reported by observe(); call once the row is written"""
+        listing_id = row.get("Listing_ID")
+        if not listing_id or op not in ("insert", "update"):
+            return
+        city = row.get("City")
+        fp = fingerprint(row)
+        now = datetime.utcnow().isoformat()
+        data = json.dumps(row, ensure_ascii=False, default=str)
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO listings VALUES (?, ?, ?, ?, ?, NULL, ?) ON CONFLICT (listing_id) DO UPDATE SET "
+                "city = excluded.city, fingerprint = excluded.fingerprint, last_seen = excluded.last_seen, "
+                "removed_at = NULL, data = excluded.data",
+                (str(listing_id), city, fp, now, now, data))
+            self._db.commit()
+            self._log(op, str(listing_id), city, row)
+
+    def touch(self, listing_id):
+        """Mark a listing as seen now without comparing it (e.g. it was written earlier in the run)"""
+        with self._lock:
+            self._touch(listing_id)
+
+    def _touch(self, listing_id):
+        self._db.execute("UPDATE listings SET last_seen = ? WHERE listing_id = ?",
+                         (datetime.utcnow().isoformat(), str(listing_id)))
+        self._db.commit()
+
+    def finish_city(self, city, run_started, complete, stale_after_days=7):
+        """
+        Mark listings of `city` that have disappeared as removed.
+
+        If the whole city was paginated (`complete`), anything not seen since
+        `run_started` is gone. After an early stop only listings unseen for
+        `stale_after_days` are removed. Returns the removed listing IDs.
+        """
+        cutoff = run_started if complete else (
+            datetime.utcnow() - timedelta(days=stale_after_days)).isoformat()
+        now = datetime.utcnow().isoformat()
+        with self._lock:
+            ids = [r[0] for r in self._db.execute(
+                "SELECT listing_id FROM listings WHERE city = ? AND removed_at IS NULL AND last_seen < ?",
+                (city, cutoff))]
+            self._db.executemany("UPDATE listings SET removed_at = ? WHERE listing_id = ?",
+                                 [(now, i) for i in ids])
+            self._db.commit()
+            for listing_id in ids:
+                self._log("remove", listing_id, city)
+        return ids
+
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,262 @@
+# worker_pool.py
+"""Run scraping tasks across several independent browser sessions."""
+import threading
+import time
+from collections import Counter
+
+
+class AdaptiveRateLimiter:
+    """
+    Token bucket shared by all workers, whose rate follows how the site responds.
+
+    Every clean page adds `increase` page loads per second to the rate (up to
+    `max_rate`); a slow, empty or timed-out page multiplies it by `backoff` and a
+    block page by `backoff` squared (down to `min_rate`). A rate of 0 disables
+    the limiter. `on_wait(seconds)` is called with every wait, e.g. to time it.
+    """
+
+    def __init__(self, rate_per_sec, min_rate=0.1, max_rate=2.0, burst=1, increase=0.02,
+                 backoff=0.5, slow_seconds=10, on_wait=None):
+        self.start_rate = rate_per_sec if rate_per_sec and rate_per_sec > 0 else 0.0
+        self.rate = self.start_rate
+        self.min_rate = min(min_rate, self.start_rate) if self.start_rate else min_rate
+        self.max_rate = max(max_rate, self.start_rate)
+        self.burst = max(1, burst)
+        self.increase = increase
+        self.backoff = backoff
+        self.slow_seconds = slow_seconds
+        self.outcomes = Counter()
+        self.on_wait = on_wait
+        self._tokens = float(self.burst)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+        self._last = now
+
+    def wait(self):
+        """Block until the caller is allowed to start another page load"""
+        if not self.rate:
+            return
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self._tokens -= 1  # reserve a token; a negative balance is the wait
+            delay = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if delay > 0:
+            time.sleep(delay)
+        if self.on_wait:
+            self.on_wait(delay)
+
+    def report(self, outcome, seconds=None):
+        """
+        Feed back how a page load went: "ok", "empty", "timeout" or "blocked"
+        ("ok" slower than `slow_seconds` counts as "slow"). Returns the outcome recorded.
+        """
+        if outcome == "ok" and seconds is not None and seconds > self.slow_seconds:
+            outcome = "slow"
+        with self._lock:
+            self.outcomes[outcome] += 1
+            if not self.rate:
+                return outcome
+            self._refill(time.monotonic())
+            if outcome == "ok":
+                self.rate = min(self.max_rate, self.rate + self.increase)
+            else:
+                factor = self.backoff ** 2 if outcome == "blocked" else self.backoff
+                self.rate = max(self.min_rate, self.rate * factor)
+        return outcome
+
+    @property
+    def slowdown(self):
+        """How much slower than its starting rate the limiter runs (below 1 once it sped up)"""
+        return self.start_rate / self.rate if self.rate else 1.0
+
+
+class CircuitBreaker:
+    """
+    Per-city circuit breaker.
+
+    After `threshold` failed pages in a row a city's circuit opens: the city is
+    put aside for `cooldown` seconds, doubling with every further trip. After
+    `max_trips` trips the city is given up.
+    """
+
+    def __init__(self, threshold=2, cooldown=60, max_trips=3):
+        self.threshold = max(1, threshold)
+        self.cooldown = cooldown
+        self.max_trips = max_trips
+        self._failures = Counter()
+        self._trips = Counter()
+        self._lock = threading.Lock()
+
+    def record_success(self, city):
+        with self._lock:
+            self._failures[city] = 0
+
+    def record_failure(self, city):
+        """
+        Count a failed page of `city`. Returns the seconds to wait before
+        retrying the city (0 while its circuit is still closed), or None to give up.
+        """
+        with self._lock:
+            self._failures[city] += 1
+            if self._failures[city] < self.threshold:
+                return 0.0
+            self._failures[city] = 0
+            self._trips[city] += 1
+            if self._trips[city] > self.max_trips:
+                return None
+            return self.cooldown * 2 ** (self._trips[city] - 1)
+
+    def trips(self, city):
+        with self._lock:
+            return self._trips[city]
+
+
+class RetryLater(Exception):
+    """Raised by a task to have it queued again; its city's tasks wait `delay` seconds"""
+
+    def __init__(self, delay, reason=""):
+        super().__init__(reason or f"retry in {delay:.0f}s")
+        self.delay = delay
+        self.reason = reason
+
+
+class CrawlPool:
+    """
+    Pool of worker threads, each owning one browser session.
+
+    Workers take tasks from a shared queue. A task is skipped over (not dropped)
+    while its city already has `per_city_limit` tasks in flight, so several
+    city x page tasks of one city never hammer the site at the same time.
+    A task raising `RetryLater` goes back into the queue, and no task of its
+    city is handed out until the delay has passed.
+    """
+
+    def __init__(self, create_driver, scrape_task, workers=4, per_city_limit=1,
+                 task_city=None, on_result=None, politeness=None):
+        self.create_driver = create_driver
+        self.scrape_task = scrape_task
+        self.workers = max(1, workers)
+        self.per_city_limit = max(1, per_city_limit)
+        self.task_city = task_city or (lambda task: task)
+        self.on_result = on_result
+        self.politeness = politeness
+
+        self._pending = []
+        self._in_flight = {}
+        self._not_before = {}  # city -> monotonic time its tasks may run again
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._drivers = []
+        self._results = []
+
+    def _next_task(self):
+        """Pop the first pending task whose city is below its concurrency cap"""
+        with self._cond:
+            while not self._stop.is_set():
+                if not self._pending:
+                    if not any(self._in_flight.values()):
+                        return None
+                    # A task still in flight may be queued again
+                    self._cond.wait(timeout=1)
+                    continue
+                now = time.monotonic()
+                for i, task in enumerate(self._pending):
+                    city = self.task_city(task)
+                    if self._not_before.get(city, 0) > now:
+                        continue
+                    if self._in_flight.get(city, 0) < self.per_city_limit:
+                        self._in_flight[city] = self._in_flight.get(city, 0) + 1
+                        return self._pending.pop(i)
+                self._cond.wait(timeout=1)
+            return None
+
+    def _task_done(self, task, result):
+        with self._cond:
+            city = self.task_city(task)
+            self._in_flight[city] -= 1
+            self._results.append((task, result))
+            if self.on_result:
+                self.on_result(task, result)
+            self._cond.notify_all()
+
+    def _task_retry(self, task, delay):
+        with self._cond:
+            city = self.task_city(task)
+            self._in_flight[city] -= 1
+            self._not_before[city] = max(self._not_before.get(city, 0), time.monotonic() + delay)
+            self._pending.append(task)
+            self._cond.notify_all()
+
+    def _worker(self):
+        driver = None
+        try:
+            while True:
+                task = self._next_task()
+                if task is None:
+                    break
+                result = None
+                retry = None
+                try:
+                    if driver is None:
+                        driver = self.create_driver()
+                        with self._cond:
+                            self._drivers.append(driver)
+                    result = self.scrape_task(driver, task)
+                except RetryLater as e:
+                    retry = e.delay
+                except Exception as e:
+                    print(f"  ⚠ [{threading.current_thread().name}] Task {task!r} failed: {e}")
+                finally:
+                    if retry is None:
+                        self._task_done(task, result)
+                    else:
+                        self._task_retry(task, retry)
+
+                # Polite pause for this session before it picks up its next task
+                if self.politeness and not self._stop.is_set():
+                    self.politeness.pause(self._stop)
+        finally:
+            if driver is not None:
+                try:
+                    driver.quit()
+                except Exception:
+                    pass
+                with self._cond:
+                    if driver in self._drivers:
+                        self._drivers.remove(driver)
+
+    def run(self, tasks):
+        """Process all tasks and return a list of (task, result) pairs"""
+        with self._cond:
+            self._pending = list(tasks)
+        n_threads = min(self.workers, len(self._pending)) or 1
+        print(f"🚀 Starting {n_threads} browser workers for {len(self._pending)} tasks")
+
+        threads = [threading.Thread(target=self._worker, name=f"worker-{i + 1}", daemon=True)
+                   for i in range(n_threads)]
+        for t in threads:
+            t.start()
+        try:
+            for t in threads:
+                while t.is_alive():
+                    t.join(timeout=0.5)
+        except KeyboardInterrupt:
+            self.stop()
+            raise
+        return self._results
+
+    def stop(self):
+        """Stop handing out tasks and close every open browser session"""
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+            drivers = list(self._drivers)
+        for driver in drivers:
+            try:
+                driver.quit()
+            except Exception:
+                pass
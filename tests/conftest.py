@@ -0,0 +1,14 @@
+import pytest
+
+from airbnb_scraper.config import DEFAULTS, Config
+
+
+@pytest.fixture
+def make_config(tmp_path):
+    """Config factory whose output files all live under tmp_path"""
+    def make(**overrides):
+        paths = {name.lower(): str(tmp_path / value) for name, value in DEFAULTS.items()
+                 if isinstance(value, str) and value.startswith("output/")}
+        return Config(**{**paths, "download_images": False, "output_formats": ["csv"], "clean_output": "",
+                         **overrides})
+    return make
@@ -0,0 +1,102 @@
+import csv
+from concurrent.futures import Future
+
+from airbnb_scraper.checkpoint import CheckpointJournal
+from airbnb_scraper.pagination import CityPages
+from airbnb_scraper.scraper import Scraper
+
+
+def test_resume_point_after_crash(tmp_path):
+    path = str(tmp_path / "journal.jsonl")
+    journal = CheckpointJournal(path)
+    journal.record_nav("Lahore", 1, "https://www.airbnb.com/s/lahore/homes")
+    journal.record_page("Lahore", 1, [101, 102])
+    journal.record_nav("Lahore", 2, "https://www.airbnb.com/s/lahore/homes?items_offset=18")
+    journal.close()
+    with open(path, "a", encoding="utf-8") as fh:
+        fh.write('{"type": "page", "city": "Lah')  # torn by the crash
+
+    state = CheckpointJournal.load(path)["Lahore"]
+    assert not state.done
+    assert state.listing_ids == {101, 102}
+    assert state.resume_page() == (2, "https://www.airbnb.com/s/lahore/homes?items_offset=18")
+
+
+def test_resume_keeps_appending(tmp_path):
+    path = str(tmp_path / "journal.jsonl")
+    journal = CheckpointJournal(path)
+    journal.record_page("Lahore", 1, [101])
+    journal.close()
+
+    journal = CheckpointJournal(path, resume=True)
+    assert journal.city_state("Lahore").resume_page() == (2, None)
+    journal.record_page("Lahore", 2, [102])
+    journal.finish_city("Lahore")
+    journal.close()
+
+    state = CheckpointJournal.load(path)["Lahore"]
+    assert state.done
+    assert state.done_pages == {1, 2}
+    assert state.listing_ids == {101, 102}
+
+
+def test_old_journals_with_url_keys(tmp_path):
+    path = tmp_path / "journal.jsonl"
+    path.write_text('{"type": "page", "city": "Karachi", "page": 1, '
+                    '"listing_ids": ["https://www.airbnb.com/rooms/555?adults=1", "777"]}\n', encoding="utf-8")
+    assert CheckpointJournal.load(str(path))["Karachi"].listing_ids == {555, 777}
+
+
+def test_page_waits_for_its_downloads(tmp_path):
+    path = str(tmp_path / "journal.jsonl")
+    journal = CheckpointJournal(path)
+    download = Future()
+    journal.record_page("Lahore", 1, [101], futures=[download, None])
+    journal.finish_city("Lahore")
+    assert CheckpointJournal.load(path) == {}  # neither the page nor the city is on disk yet
+
+    download.set_result("img.jpg")
+    state = CheckpointJournal.load(path)["Lahore"]
+    assert state.done_pages == {1}
+    assert state.done
+    journal.close()
+
+
+def test_unknown_city_starts_at_page_one(tmp_path):
+    journal = CheckpointJournal(str(tmp_path / "journal.jsonl"), resume=True)
+    assert journal.city_state("Multan").resume_page() == (1, None)
+    journal.close()
+
+
+def test_scraper_resumes_page_without_duplicates(make_config):
+    config = make_config()
+    rows = [{"Title": "Flat", "Price": "$10", "Listing_URL": f"https://www.airbnb.com/rooms/{i}?adults=1"}
+            for i in range(100, 110)]
+
+    scraper = Scraper(config)
+    scraper._open_run(resume=False)
+    emit_row, written = scraper.emit_row, []
+
+    def crash_after_five(entry, city, page):
+        if len(written) == 5:
+            raise KeyboardInterrupt
+        written.append(entry)
+        return emit_row(entry, city, page)
+
+    scraper.emit_row = crash_after_five
+    try:
+        scraper.process_page(CityPages("Lahore"), 1, [dict(r) for r in rows])
+    except KeyboardInterrupt:
+        pass
+    scraper.output_sink.close()  # killed: no index saved, page 1 never journaled
+    scraper.journal.close()
+
+    scraper = Scraper(config)
+    scraper._open_run(resume=True)
+    seen = scraper.journal.city_state("Lahore").listing_ids
+    scraper.process_page(CityPages("Lahore", seen=seen), 1, [dict(r) for r in rows])
+    scraper._close_run()
+
+    with open(config.out_csv, newline="", encoding="utf-8") as fh:
+        ids = [row["Listing_ID"] for row in csv.DictReader(fh)]
+    assert sorted(ids) == [str(i) for i in range(100, 110)]  # each listing exactly once
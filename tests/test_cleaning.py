@@ -0,0 +1,76 @@
+import pandas as pd
+import pytest
+
+from airbnb_scraper import cleaning
+from airbnb_scraper.cleaning import clean_file, clean_frame
+
+RAW = pd.DataFrame({
+    "Title": ["Flat", "Villa", "Room", "Hut"],
+    "Price": ["$530 $454 Show price breakdown $454 monthly, originally $530 monthly", "$669 ",
+              "€95 per night", ""],
+    "Rating": ["4.87", "New", "4,9", None],
+    "Reviews": ["1,203 reviews", "", "12", None],
+    "Listing_URL": ["https://www.airbnb.com/rooms/1396369424120271572?adults=1", "https://www.airbnb.com/rooms/7",
+                    "https://www.airbnb.com/rooms/7?check_in=2025-09-01", "https://www.airbnb.com/experiences/9"],
+    "Listing_ID": ["1396369424120271572", "", "7", ""],
+    "City": ["Lahore", "Lahore", "Karachi", "Karachi"],
+    "Page": ["1", "1", "2", "x"],
+    "Scraped_At": ["2026-10-16T12:00:00.123456", "2026-10-16T12:00:01", "", None],
+    "Change": ["insert", "update", "", None],
+}, dtype="string")
+
+
+def values(series):
+    """Values of a column with missing ones as None (pd.NA doesn't compare)"""
+    return series.astype(object).where(series.notna(), None).tolist()
+
+
+@pytest.fixture(params=["arrow", "re"])
+def clean(request, monkeypatch):
+    """clean_frame with RE2 over Arrow columns, and with Python's re (pyarrow not installed)"""
+    if request.param == "arrow":
+        pytest.importorskip("pyarrow")
+    else:
+        monkeypatch.setattr(cleaning, "_regex_text", lambda text: text)
+    return clean_frame
+
+
+def test_prices(clean):
+    df = clean(RAW)
+    assert values(df["Price"]) == [454, 669, 95, None]
+    assert values(df["Price_Original"]) == [530, None, None, None]
+    assert values(df["Currency"]) == ["USD", "USD", "EUR", None]
+    assert values(df["Price_Basis"]) == ["month", None, "night", None]
+    assert df["Price_Text"][1] == "$669"
+
+
+def test_ratings_and_reviews(clean):
+    df = clean(RAW)
+    assert values(df["Rating"]) == [4.87, None, 4.9, None]
+    assert values(df["Reviews"]) == [1203, None, 12, None]
+
+
+def test_listing_ids_and_canonical_urls(clean):
+    df = clean(RAW)
+    assert str(df["Listing_ID"].dtype) == "UInt64"
+    assert values(df["Listing_ID"]) == [1396369424120271572, 7, 7, None]  # exact, no float detour
+    assert df["Listing_URL"].tolist() == ["https://www.airbnb.com/rooms/1396369424120271572",
+                                          "https://www.airbnb.com/rooms/7", "https://www.airbnb.com/rooms/7",
+                                          "https://www.airbnb.com/experiences/9"]
+    assert len(df["Listing_URL"].cat.categories) == 3
+
+
+def test_types(clean):
+    df = clean(RAW)
+    assert {c: str(df[c].dtype) for c in ("City", "Page", "Change")} == {
+        "City": "category", "Page": "Int16", "Change": "category"}
+    assert values(df["Page"]) == [1, 1, 2, None]
+    assert df["Scraped_At"].isna().tolist() == [False, False, True, True]
+
+
+def test_clean_file(tmp_path):
+    src = tmp_path / "out.csv"
+    RAW.to_csv(src, index=False)
+    df, rows_per_sec = clean_file(str(src), str(tmp_path / "clean.jsonl"))
+    assert len(df) == 4 and rows_per_sec > 0
+    assert values(df["Listing_ID"]) == [1396369424120271572, 7, 7, None]
@@ -0,0 +1,42 @@
+import pytest
+
+pytest.importorskip("pyarrow")
+
+from airbnb_scraper.sinks import PartitionedParquetSink, read_dataset, read_rows  # noqa: E402
+
+MAX_ID = 2 ** 64 - 1
+COLUMNS = ["Title", "Price", "Rating", "Listing_ID", "City", "Page", "Scraped_At"]
+
+
+def row(listing_id, city, day):
+    return {"Title": "Flat", "Price": "$10", "Rating": "New", "Listing_ID": str(listing_id), "City": city,
+            "Page": "2", "Scraped_At": f"2026-10-{day}T12:00:00"}
+
+
+@pytest.fixture
+def dataset(tmp_path):
+    root = str(tmp_path / "dataset")
+    sink = PartitionedParquetSink(root, COLUMNS, row_group_size=2)
+    for r in (row(1, "Lahore", 15), row(2, "Lahore", 16), row(3, "Karachi", 16), row(MAX_ID, "Lahore", 16)):
+        sink.write(r)
+    assert not list((tmp_path / "dataset").rglob("part-*"))  # only _part files until closed
+    sink.close()
+    return root
+
+
+def test_partitions_by_city_and_date(dataset, tmp_path):
+    root = tmp_path / "dataset"
+    parts = sorted(p.relative_to(root).parent.as_posix() for p in root.rglob("*.parquet"))
+    assert parts == ["City=Karachi/scrape_date=2026-10-16", "City=Lahore/scrape_date=2026-10-15",
+                     "City=Lahore/scrape_date=2026-10-16"]
+
+
+def test_read_only_the_partitions_asked_for(dataset):
+    table = read_dataset(dataset, cities=["Lahore"], dates=["2026-10-16"])
+    assert sorted(table.column("Listing_ID").to_pylist()) == [2, MAX_ID]
+    assert str(table.schema.field("Listing_ID").type) == "uint64"
+    assert str(table.schema.field("Page").type) == "int16"
+
+
+def test_read_rows_of_dataset(dataset):
+    assert sorted(r["Listing_ID"] for r in read_rows(dataset)) == [1, 2, 3, MAX_ID]
@@ -0,0 +1,83 @@
+import hashlib
+import json
+import os
+import random
+
+import pytest
+
+from airbnb_scraper.image_processing import near_duplicate_groups
+from airbnb_scraper.image_store import ImageStore
+
+
+def flip(h, *bits):
+    for bit in bits:
+        h ^= 1 << bit
+    return h
+
+
+def test_groups_do_not_chain():
+    a = random.Random(1).getrandbits(64)
+    b = flip(a, 0, 10, 20)  # 3 bits from a
+    c = flip(b, 30, 40, 50)  # 3 bits from b, 6 from a
+    assert near_duplicate_groups([a, b, c], 4) == [[0, 1]]
+    assert near_duplicate_groups([a, b, c], 6) == [[0, 1, 2]]
+
+
+def test_members_are_close_to_their_representative():
+    rng = random.Random(7)
+    hashes = [rng.getrandbits(64) for _ in range(500)]
+    hashes += [flip(h, *rng.sample(range(64), rng.randint(0, 5))) for h in hashes[:200]]
+    groups = near_duplicate_groups(hashes, 6)
+    assert len(groups) == 200
+    for group in groups:
+        assert group[0] == min(group)  # the first (best) image represents the group
+        assert all(bin(hashes[i] ^ hashes[group[0]]).count("1") <= 6 for i in group)
+
+
+def add(store, tmp_path, name, data):
+    tmp = tmp_path / f"{name}.part"
+    tmp.write_bytes(data)
+    blob_hash = hashlib.sha256(data).hexdigest()
+    store.add(f"https://a0.muscache.com/im/pictures/{name}.jpg", str(tmp), blob_hash, ".jpg")
+    return blob_hash
+
+
+def test_merged_blob_path_still_opens(tmp_path):
+    store = ImageStore(str(tmp_path / "images"))
+    kept = add(store, tmp_path, "large", b"large photo")
+    dropped = add(store, tmp_path, "small", b"small photo")
+    old_path = store.lookup("https://a0.muscache.com/im/pictures/small.jpg")
+
+    store.merge_blob(dropped, kept)
+    assert store.lookup("https://a0.muscache.com/im/pictures/small.jpg") == \
+        store.lookup("https://a0.muscache.com/im/pictures/large.jpg")
+    with open(old_path, "rb") as fh:  # e.g. Local_Image_Path of an earlier output
+        assert fh.read() == b"large photo"
+    assert store.stats()["blobs"] == 1
+    store.close()
+
+
+def test_prune_keeps_largest_copy(tmp_path):
+    pytest.importorskip("PIL")
+    import numpy as np
+    from PIL import Image
+
+    from airbnb_scraper.image_processing import process_images
+
+    store = ImageStore(str(tmp_path / "images"))
+    photo = (np.random.default_rng(0).random((60, 90, 3)) * 255).astype("uint8")
+    paths = {}
+    for name, size in (("large", (900, 600)), ("small", (450, 300))):
+        path = tmp_path / f"{name}.jpg"
+        Image.fromarray(photo).resize(size).save(path, "JPEG")
+        add(store, tmp_path, name, path.read_bytes())
+        paths[name] = store.lookup(f"https://a0.muscache.com/im/pictures/{name}.jpg")
+
+    manifest = str(tmp_path / "manifest.jsonl")
+    counts = process_images(store, manifest, str(tmp_path / "thumbs"), workers=0, prune=True)
+    assert (counts["ok"], counts["duplicate"], counts["pruned"]) == (1, 1, 1)
+    with open(manifest, encoding="utf-8") as fh:
+        (row,) = [json.loads(line) for line in fh]
+    assert row["Width"] == 900 and len(row["URLs"]) == 2
+    assert os.path.samefile(paths["large"], paths["small"])
+    store.close()
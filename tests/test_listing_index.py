@@ -0,0 +1,68 @@
+import csv
+
+from airbnb_scraper import listing_index
+from airbnb_scraper.listing_index import ListingIndex
+from airbnb_scraper.pagination import CityPages
+from airbnb_scraper.scraper import Scraper
+
+BIG_ID = 1396369424120271572  # today's IDs don't fit in an int64
+
+
+def test_claim_once_across_cities():
+    index = ListingIndex()
+    assert index.claim(BIG_ID, "Islamabad", 1)
+    assert not index.claim(BIG_ID, "Rawalpindi", 2)
+    assert index.claim(7, "Rawalpindi", 2)
+    assert BIG_ID in index and 8 not in index
+    assert len(index) == 2
+    assert (index.claimed, index.repeats) == (2, 1)
+    assert index.sightings(BIG_ID) == [("Islamabad", 1), ("Rawalpindi", 2)]
+    assert index.cross_city() == 1
+
+
+def test_merges_keep_membership(monkeypatch):
+    monkeypatch.setattr(listing_index, "MERGE_EVERY", 8)
+    index = ListingIndex()
+    ids = [BIG_ID - 3 * i for i in range(100)]
+    for listing_id in ids:
+        assert index.claim(listing_id, "Lahore", 1)
+    assert len(index._recent) < 8  # most IDs went into the sorted array
+    assert all(listing_id in index for listing_id in ids)
+    assert not any(listing_id + 1 in index for listing_id in ids)
+
+
+def test_update_marks_ids_without_sightings():
+    index = ListingIndex()
+    index.update([5, 6, "not-an-id"])
+    assert not index.claim(5, "Lahore", 1)
+    assert index.sightings(6) == []
+
+
+def test_save_and_load(tmp_path):
+    path = str(tmp_path / "index.npz")
+    index = ListingIndex(path)
+    index.claim(BIG_ID, "Islamabad", 3)
+    index.claim(BIG_ID, "Rawalpindi", 1)
+    index.save()
+
+    loaded = ListingIndex(path, load=True)
+    assert BIG_ID in loaded
+    assert not loaded.claim(BIG_ID, "Lahore", 1)
+    assert loaded.sightings(BIG_ID) == [("Islamabad", 3), ("Rawalpindi", 1), ("Lahore", 1)]
+    assert ListingIndex(path).claim(BIG_ID, "Lahore", 1)  # load=False: a fresh run
+
+
+def test_overlapping_cities_written_once(make_config):
+    config = make_config(incremental=False)
+    rows = lambda ids: [{"Title": "Flat", "Listing_URL": f"https://www.airbnb.com/rooms/{i}?adults=1"} for i in ids]
+    scraper = Scraper(config)
+    scraper._open_run(resume=False)
+    assert scraper.process_page(CityPages("Islamabad"), 1, rows(range(10))) == (10, 0, 10)
+    assert scraper.process_page(CityPages("Rawalpindi"), 1, rows(range(5, 15))) == (10, 0, 5)  # new to the city, 5 written
+    assert scraper.listing_index.cross_city() == 5
+    scraper._close_run()
+
+    with open(config.out_csv, newline="", encoding="utf-8") as fh:
+        written = [(row["Listing_ID"], row["City"]) for row in csv.DictReader(fh)]
+    assert sorted(written) == sorted([(str(i), "Islamabad") for i in range(10)]
+                                     + [(str(i), "Rawalpindi") for i in range(10, 15)])
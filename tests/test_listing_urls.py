@@ -0,0 +1,35 @@
+from airbnb_scraper.listing_urls import canonical_listing_url, listing_id, normalize_listing
+
+URL = ("https://www.airbnb.com/rooms/1396369424120271572?search_mode=regular_search&adults=1"
+       "&check_in=2025-09-01&source_impression_id=p3_1725")
+
+
+def test_listing_id_of_ids_and_urls():
+    assert listing_id(1396369424120271572) == 1396369424120271572
+    assert listing_id(" 42 ") == 42
+    assert listing_id(URL) == 1396369424120271572
+    assert listing_id("/rooms/plus/123?x=1") == 123
+    assert listing_id("https://www.airbnb.com/s/lahore/homes") is None
+    assert listing_id("") is None and listing_id(None) is None
+
+
+def test_normalize_listing_drops_query():
+    entry = {"Title": "Flat", "Listing_URL": URL}
+    params = normalize_listing(entry)
+    assert entry["Listing_ID"] == 1396369424120271572
+    assert entry["Listing_URL"] == canonical_listing_url(1396369424120271572) == \
+        "https://www.airbnb.com/rooms/1396369424120271572"
+    assert params == {"search_mode": "regular_search", "adults": "1", "check_in": "2025-09-01",
+                      "source_impression_id": "p3_1725"}
+
+
+def test_normalize_prefers_existing_id():
+    entry = {"Listing_ID": "7", "Listing_URL": "https://www.airbnb.com/rooms/8"}
+    assert normalize_listing(entry) == {}
+    assert entry == {"Listing_ID": 7, "Listing_URL": "https://www.airbnb.com/rooms/7"}
+
+
+def test_rows_without_id_keep_their_url():
+    entry = {"Listing_URL": "https://www.airbnb.com/experiences/99"}
+    assert normalize_listing(entry) == {}
+    assert entry == {"Listing_URL": "https://www.airbnb.com/experiences/99"}
@@ -0,0 +1,45 @@
+from urllib.parse import parse_qs, urlparse
+
+from airbnb_scraper.pagination import (CityPages, build_city_url_from_template, decode_cursor, items_offset,
+                                       page_of_url, page_size_from_links, page_url, url_for_page)
+
+SEARCH = "https://www.airbnb.com/s/karachi-/homes?adults=1&items_offset=36&cursor=abc"
+
+
+def test_page_url_plans_offset_and_cursor():
+    url = page_url(SEARCH, 3)
+    query = parse_qs(urlparse(url).query)
+    assert query["adults"] == ["1"]
+    assert query["items_offset"] == ["36"]
+    assert decode_cursor(query["cursor"][0]) == {"section_offset": 0, "items_offset": 36, "version": 1}
+    assert items_offset(url) == 36 and page_of_url(url) == 3
+
+
+def test_first_page_has_no_offset():
+    query = parse_qs(urlparse(page_url(SEARCH, 1)).query)
+    assert query == {"adults": ["1"]}
+
+
+def test_page_size_from_links():
+    links = [page_url(SEARCH, page, page_size=20) for page in (1, 2, 3)]
+    assert page_size_from_links(links) == 20
+    assert page_size_from_links([]) == 18
+    assert url_for_page(SEARCH, 3, links) == links[2]
+    assert items_offset(url_for_page(SEARCH, 5, links)) == 80
+
+
+def test_city_url_from_template():
+    assert build_city_url_from_template(SEARCH, "Islamabad").startswith("https://www.airbnb.com/s/islamabad-/homes?")
+
+
+def test_city_pages_stop_and_finish():
+    progress = CityPages("Lahore", pages=[1, 2, 3, 4])
+    assert progress.claim(101) and not progress.claim(101)
+    progress.stop_after(3)
+    progress.stop_after(2, complete=True)
+    assert (progress.last_page, progress.complete) == (2, True)
+    assert progress.wanted(2) and not progress.wanted(3)
+    progress.add_rows(5)
+    assert (progress.rows_written, progress.pages_processed) == (5, 1)
+    assert not any(progress.page_done(page) for page in (4, 1, 3))
+    assert progress.page_done(2)
@@ -0,0 +1,105 @@
+from datetime import datetime
+
+import pytest
+
+from airbnb_scraper.checkpoint import CheckpointJournal
+from airbnb_scraper.pagination import CityPages
+from airbnb_scraper.readiness import looks_blocked
+from airbnb_scraper.scraper import Scraper
+from airbnb_scraper.worker_pool import AdaptiveRateLimiter, CircuitBreaker, RetryLater
+
+
+class FakeDriver:
+    """Answers the scripts looks_blocked() runs: the card count and the visible text"""
+
+    def __init__(self, text="", cards=0, source=""):
+        self.text = text
+        self.cards = cards
+        self.page_source = source
+        self.current_url = "https://www.airbnb.com/s/lahore/homes"
+
+    def execute_script(self, script, *args):
+        return self.cards if "querySelectorAll" in script else self.text
+
+
+# ---------------- limiter and breaker ----------------
+def test_rate_follows_outcomes():
+    limiter = AdaptiveRateLimiter(1.0, min_rate=0.1, max_rate=2.0, increase=0.5, backoff=0.5, slow_seconds=10)
+    limiter.report("ok")
+    assert limiter.rate == 1.5
+    limiter.report("timeout")
+    assert limiter.rate == 0.75
+    limiter.report("blocked")  # backoff squared
+    assert limiter.rate == pytest.approx(0.1875)
+    assert limiter.report("ok", seconds=30) == "slow"
+    assert limiter.rate == pytest.approx(0.1)  # floored at min_rate
+    assert limiter.slowdown == pytest.approx(10)
+    assert limiter.outcomes == {"ok": 1, "timeout": 1, "blocked": 1, "slow": 1}
+
+
+def test_rate_zero_disables_limiter():
+    limiter = AdaptiveRateLimiter(0)
+    limiter.wait()
+    limiter.report("blocked")
+    assert limiter.rate == 0
+
+
+def test_breaker_backs_off_then_gives_up():
+    breaker = CircuitBreaker(threshold=2, cooldown=60, max_trips=2)
+    assert breaker.record_failure("Lahore") == 0.0
+    breaker.record_success("Lahore")  # a good page closes the circuit again
+    assert breaker.record_failure("Lahore") == 0.0
+    assert breaker.record_failure("Lahore") == 60
+    assert breaker.record_failure("Karachi") == 0.0  # per city
+    assert breaker.record_failure("Lahore") == 0.0
+    assert breaker.record_failure("Lahore") == 120
+    assert breaker.record_failure("Lahore") == 0.0
+    assert breaker.record_failure("Lahore") is None
+    assert breaker.trips("Lahore") == 3
+
+
+# ---------------- block pages ----------------
+def test_block_page_is_read_from_visible_text():
+    assert looks_blocked(FakeDriver("Access denied"), "[itemprop=itemListElement]")
+    # Every normal page's scripts mention captchas; only what a visitor reads counts
+    assert not looks_blocked(FakeDriver("Stays in Lahore", source='<script>"captcha":{}</script>'))
+
+
+def test_page_with_cards_is_not_blocked():
+    assert not looks_blocked(FakeDriver("Verify you are a human", cards=18), "[itemprop=itemListElement]")
+
+
+# ---------------- giving up on a city ----------------
+@pytest.fixture
+def scraper(make_config):
+    scraper = Scraper(make_config(global_rate_limit=0))
+    scraper._open_run(resume=False)
+    scraper.listing_state.record({"Listing_ID": 1, "Title": "Flat", "City": "Lahore"}, "insert")
+    scraper.run_started_at = datetime.utcnow().isoformat()  # listing 1 is from an earlier run
+    yield scraper
+    scraper._close_run()
+
+
+def test_failure_retries_city_while_breaker_is_open(scraper):
+    scraper.breaker = CircuitBreaker(threshold=1, cooldown=60, max_trips=1)
+    with pytest.raises(RetryLater):
+        scraper.city_failed(FakeDriver(), "Lahore", "timeout")
+    assert scraper.failed_cities == {}
+
+
+def test_given_up_city_stays_unfinished(scraper):
+    scraper.breaker = CircuitBreaker(threshold=1, max_trips=0)
+    scraper.open_search_page = lambda driver, url: False
+    scraper.city_pages["Lahore"] = CityPages("Lahore", pages=[1])
+
+    assert scraper.scrape_search_page(FakeDriver("Access denied"), ("Lahore", 1)) == 0
+    assert scraper.failed_cities == {"Lahore": "blocked"}
+    assert not CheckpointJournal.load(scraper.config.checkpoint_journal).get("Lahore")
+    assert scraper.listing_state.counts["remove"] == 0
+
+
+def test_city_without_pages_removes_nothing(scraper):
+    scraper.city_pages["Lahore"] = CityPages("Lahore")
+    scraper.finish_city("Lahore", 0, 0, complete=True)
+    assert CheckpointJournal.load(scraper.config.checkpoint_journal)["Lahore"].done
+    assert scraper.listing_state.counts["remove"] == 0
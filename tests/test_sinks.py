@@ -0,0 +1,60 @@
+import json
+
+import pytest
+
+from airbnb_scraper.sinks import CsvSink, JsonArraySink, MultiSink, open_sink, read_rows
+
+COLUMNS = ["Title", "Price", "Listing_ID"]
+
+
+def rows(*ids):
+    return [{"Title": f"Flat {i}", "Price": "$10", "Listing_ID": str(i)} for i in ids]
+
+
+@pytest.mark.parametrize("name", ["out.csv", "out.json", "out.jsonl"])
+def test_append_continues_the_file(tmp_path, name):
+    path = str(tmp_path / name)
+    sink = open_sink(path, COLUMNS)
+    for row in rows(1, 2):
+        sink.write(row)
+    sink.close()
+    sink = open_sink(path, COLUMNS, append=True)
+    sink.write(rows(3)[0])
+    sink.close()
+    assert list(read_rows(path)) == rows(1, 2, 3)
+
+
+def test_csv_drops_unknown_columns(tmp_path):
+    path = str(tmp_path / "out.csv")
+    sink = CsvSink(path, COLUMNS)
+    sink.write({"Title": "Flat", "Extra": "x"})
+    sink.close()
+    assert list(read_rows(path)) == [{"Title": "Flat", "Price": "", "Listing_ID": ""}]
+
+
+def test_json_array_reopened_after_crash(tmp_path):
+    path = tmp_path / "out.json"
+    sink = JsonArraySink(str(path))
+    for row in rows(1, 2):
+        sink.write(row)
+    sink.flush()  # killed before close(): no closing bracket
+    sink._fh.close()
+    assert not path.read_text(encoding="utf-8").rstrip().endswith("]")
+
+    sink = JsonArraySink(str(path), append=True)
+    sink.write(rows(3)[0])
+    sink.close()
+    assert json.loads(path.read_text(encoding="utf-8")) == rows(1, 2, 3)
+
+
+def test_multi_sink_writes_every_format(tmp_path):
+    paths = [str(tmp_path / "out.csv"), str(tmp_path / "out.jsonl")]
+    sink = MultiSink([open_sink(path, COLUMNS) for path in paths])
+    sink.write(rows(1)[0])
+    sink.close()
+    assert [list(read_rows(path)) for path in paths] == [rows(1), rows(1)]
+
+
+def test_unknown_format(tmp_path):
+    with pytest.raises(ValueError):
+        open_sink(str(tmp_path / "out.xlsx"), COLUMNS)
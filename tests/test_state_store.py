@@ -0,0 +1,64 @@
+import json
+from datetime import datetime
+
+from airbnb_scraper.state_store import ListingStateStore
+
+
+def row(listing_id, price="$100", city="Lahore"):
+    return {"Listing_ID": listing_id, "Title": "Flat", "Price": price, "City": city}
+
+
+def test_insert_unchanged_update(tmp_path):
+    store = ListingStateStore(str(tmp_path / "state.sqlite"), str(tmp_path / "changes.jsonl"))
+    assert store.observe(row(1)) == "insert"
+    store.record(row(1), "insert")
+    assert store.observe(row(1)) == "unchanged"
+    assert store.observe(row(1, price="$90")) == "update"
+    store.record(row(1, price="$90"), "update")
+    assert store.observe(row(1, price="$90")) == "unchanged"
+    assert store.counts == {"insert": 1, "update": 1, "unchanged": 2, "remove": 0}
+
+    with open(tmp_path / "changes.jsonl", encoding="utf-8") as fh:
+        assert [json.loads(line)["op"] for line in fh] == ["insert", "update"]
+    store.close()
+
+
+def test_change_is_stored_only_once_recorded(tmp_path):
+    store = ListingStateStore(str(tmp_path / "state.sqlite"))
+    store.record(row(1), "insert")
+    assert store.observe(row(1, price="$90")) == "update"
+    # The row never reached the output (crash): the next run still sees the change
+    assert store.observe(row(1, price="$90")) == "update"
+    store.close()
+
+
+def test_rows_without_id_are_always_inserts(tmp_path):
+    store = ListingStateStore(str(tmp_path / "state.sqlite"))
+    store.record(row(None), "insert")
+    assert store.observe(row(None)) == "insert"
+    store.close()
+
+
+def test_complete_city_removes_unseen_listings(tmp_path):
+    store = ListingStateStore(str(tmp_path / "state.sqlite"))
+    for listing_id in (1, 2, 3):
+        store.record(row(listing_id), "insert")
+    store.record(row(9, city="Karachi"), "insert")
+
+    run_started = datetime.utcnow().isoformat()
+    store.observe(row(1))
+    store.touch(2)
+    assert store.finish_city("Lahore", run_started, complete=True) == ["3"]
+    # A listing coming back after its removal is an update
+    assert store.observe(row(3)) == "update"
+    store.close()
+
+
+def test_early_stop_only_removes_stale_listings(tmp_path):
+    store = ListingStateStore(str(tmp_path / "state.sqlite"))
+    store.record(row(1), "insert")
+    run_started = datetime.utcnow().isoformat()
+    assert store.finish_city("Lahore", run_started, complete=False, stale_after_days=7) == []
+    assert store.finish_city("Lahore", run_started, complete=False, stale_after_days=-1) == ["1"]
+    assert store.counts["remove"] == 1
+    store.close()